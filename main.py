@@ -1,21 +1,129 @@
 """
 程序入口模块
 """
+import argparse
 import os
 import sys
 import platform
+import threading
 
 # 在 macOS 上重定向系统日志
 if platform.system() == 'Darwin':  # Darwin 是 macOS 的系统名
     # 将标准错误输出重定向到 /dev/null
     sys.stderr = open(os.devnull, 'w')
 
-import tkinter as tk
-import customtkinter as ctk
-from src.gui.main_window import ExcelMergerApp
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Excel文件合并工具")
+    parser.add_argument("--profile", action="store_true",
+                        help="在cProfile和tracemalloc下执行合并，结果保存到 ~/.excel_merger/profiles/")
+    parser.add_argument("--run-task", metavar="TASK",
+                        help="不启动界面，直接执行任务的合并；TASK为任务ID或任务配置文件（JSON）")
+    parser.add_argument("--queue", metavar="QUEUE_DB",
+                        help="共享工作队列数据库（放在各主机都能访问的共享存储上）；到期的定时任务写入队列，由工作进程执行")
+    parser.add_argument("--worker", action="store_true",
+                        help="不启动界面，作为工作进程从 --queue 指定的队列领取并执行任务")
+    parser.add_argument("--schedule", action="store_true",
+                        help="与 --worker 一起使用：同时检查本机任务数据库中到期的任务并写入队列")
+    parser.add_argument("--worker-id", metavar="NAME",
+                        help="工作进程名称，默认为 主机名-进程号")
+    args = parser.parse_args(argv)
+    if args.worker and not args.queue:
+        parser.error("--worker 需要同时指定 --queue")
+    return args
+    
+def run_worker(queue_path, schedule=False, worker_id=None):
+    """
+    不启动界面，作为工作进程执行共享队列中的任务，按 Ctrl+C 停止
+    
+    Args:
+        queue_path: 共享工作队列数据库路径
+        schedule: 是否同时把本机任务数据库中到期的任务写入队列
+        worker_id: 工作进程名称
+    
+    Returns:
+        int: 退出码
+    """
+    from src.scheduler.task_manager import TaskManager
+    from src.scheduler.work_queue import WorkQueue, QueueWorker
+    
+    queue = WorkQueue(queue_path)
+    task_manager = TaskManager(None)
+    task_manager.queue = queue
+    if schedule:
+        task_manager.load_tasks()
+        task_manager.start()
+        
+    # 在后台线程中执行任务，主线程等待 Ctrl+C；停止时取消正在执行的任务并放回队列
+    worker = QueueWorker(task_manager, queue, worker_id)
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(1)
+    except KeyboardInterrupt:
+        print("正在停止工作进程...")
+        worker.stop()
+        thread.join()
+    finally:
+        task_manager.stop()
+    return 0
+    
+def run_task(task_file, profile=False):
+    """
+    不启动界面，直接执行任务的合并
+    
+    Args:
+        task_file: 任务配置文件（JSON）路径，或任务数据库中的任务ID
+        profile: 是否在性能分析下执行
+    
+    Returns:
+        int: 退出码，0表示成功
+    """
+    from src.excel.merger import ExcelMerger
+    from src.excel.style_manager import ExcelStyleManager
+    from src.scheduler.task_config import TaskConfig
+    from src.scheduler.task_store import TaskStore
+    
+    if os.path.isfile(task_file):
+        task = TaskConfig.load_from_file(task_file)
+    else:
+        task = TaskStore().load(task_file)
+        if task is None:
+            print(f"任务不存在：{task_file}")
+    if task is None:
+        return 1
+    if profile:
+        task.merge_config['profile'] = True
+        
+    input_files, selected_sheets, file_sheets = task.merge_inputs()
+    output_file = task.new_output_file()
+    result = ExcelMerger(ExcelStyleManager()).merge_files(
+        input_files, output_file, selected_sheets, file_sheets, task.merge_config
+    )
+    if not result['success']:
+        print(f"合并失败：{result['error']}")
+        return 1
+        
+    print(f"合并完成！输出文件：{output_file}")
+    if result.get('profile'):
+        print(f"性能分析文件：{result['profile']['prof_file']}")
+        print(f"内存分配报告：{result['profile']['memory_file']}")
+        print(result['profile']['summary'])
+    return 0
 
 def main():
     """主函数"""
+    args = parse_args()
+    if args.run_task:
+        sys.exit(run_task(args.run_task, args.profile))
+    if args.worker:
+        sys.exit(run_worker(args.queue, args.schedule, args.worker_id))
+        
+    # 界面相关模块只在启动界面时导入，命令行执行任务不需要图形界面环境
+    import customtkinter as ctk
+    from src.gui.main_window import ExcelMergerApp
+    
     # 设置默认主题
     ctk.set_appearance_mode("system")
     ctk.set_default_color_theme("blue")
@@ -23,6 +131,11 @@ def main():
     # 创建主窗口
     root = ctk.CTk()
     app = ExcelMergerApp(root)
+    if args.queue:
+        from src.scheduler.work_queue import WorkQueue
+        app.task_manager.queue = WorkQueue(args.queue)
+    if args.profile:
+        app.merge_config.profile.set(True)
     root.mainloop()
 
 if __name__ == "__main__":
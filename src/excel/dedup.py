@@ -0,0 +1,221 @@
+"""
+行去重模块
+基于向量化行哈希对合并数据去重，并按内容哈希跳过完全相同的输入文件
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .lineage import LINEAGE_COLUMNS
+
+
+def file_digest(file_path, chunk_size=1024 * 1024, content=None):
+    """计算文件内容的SHA-256哈希，传入已读入内存的内容 content 时不再读取文件"""
+    if content is not None:
+        return hashlib.sha256(content).hexdigest()
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashSet:
+    def __init__(self, max_memory_items=5_000_000, spill_dir=None):
+        """
+        可溢出到磁盘的64位哈希集合
+
+        元素数量超过 max_memory_items 后，已有元素写入临时SQLite文件，
+        之后的查询和插入都在SQLite的主键索引上进行。
+
+        Args:
+            max_memory_items: 内存中最多保存的哈希数量
+            spill_dir: 溢出文件所在目录的上级目录，None表示系统临时目录
+        """
+        self.max_memory_items = max_memory_items
+        self.spill_dir = spill_dir
+        self._memory = set()
+        self._conn = None
+        self._tmp_dir = None
+
+    @property
+    def spilled(self):
+        """是否已溢出到磁盘"""
+        return self._conn is not None
+
+    def add_new(self, hashes):
+        """
+        插入一批哈希，返回每个哈希此前是否不存在
+
+        Args:
+            hashes: uint64 数组，批内不应有重复
+
+        Returns:
+            numpy.ndarray: 布尔数组，True表示该哈希是第一次出现
+        """
+        # SQLite的INTEGER是有符号64位
+        keys = np.asarray(hashes, dtype=np.uint64).view(np.int64)
+        if not self.spilled:
+            is_new = np.fromiter((k not in self._memory for k in keys.tolist()), dtype=bool, count=len(keys))
+            self._memory.update(keys[is_new].tolist())
+            if len(self._memory) > self.max_memory_items:
+                self._spill()
+            return is_new
+
+        cursor = self._conn.cursor()
+        cursor.execute("DELETE FROM batch")
+        cursor.executemany("INSERT INTO batch VALUES (?, ?)", enumerate(keys.tolist()))
+        existing = [row[0] for row in cursor.execute(
+            "SELECT b.pos FROM batch b JOIN hashes h ON h.h = b.h"
+        )]
+        cursor.execute("INSERT OR IGNORE INTO hashes SELECT h FROM batch")
+        self._conn.commit()
+        is_new = np.ones(len(keys), dtype=bool)
+        is_new[existing] = False
+        return is_new
+
+    def _spill(self):
+        """把内存中的哈希写入临时SQLite文件"""
+        self._tmp_dir = tempfile.mkdtemp(prefix="excel_merger_dedup_", dir=self.spill_dir)
+        self._conn = sqlite3.connect(os.path.join(self._tmp_dir, "hashes.db"))
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE hashes (h INTEGER PRIMARY KEY)")
+        self._conn.execute("CREATE TEMP TABLE batch (pos INTEGER, h INTEGER)")
+        self._conn.executemany("INSERT INTO hashes VALUES (?)", ((k,) for k in self._memory))
+        self._conn.commit()
+        self._memory = set()
+
+    def close(self):
+        """释放内存和临时文件"""
+        self._memory = set()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+
+class RowDeduplicator:
+    def __init__(self, mode="row", key_columns=None, keep="first", max_memory_items=5_000_000, spill_dir=None):
+        """
+        初始化行去重器
+
+        Args:
+            mode: row: 整行完全相同才算重复, key: 按关键列判断重复
+            key_columns: mode为key时使用的关键列
+            keep: first: 保留第一次出现的行, last: 保留最后一次出现的行
+            max_memory_items: 哈希集合在内存中的最大元素数，超过后溢出到磁盘
+            spill_dir: 哈希集合溢出文件所在目录的上级目录，None表示系统临时目录
+        """
+        if mode not in ("row", "key"):
+            raise ValueError(f"不支持的去重方式：{mode}")
+        if keep not in ("first", "last"):
+            raise ValueError(f"不支持的保留方式：{keep}")
+        if mode == "key" and not key_columns:
+            raise ValueError("按关键列去重时必须指定关键列")
+        self.mode = mode
+        self.key_columns = list(key_columns or [])
+        self.keep = keep
+        self.max_memory_items = max_memory_items
+        self.spill_dir = spill_dir
+        self.removed_rows = 0
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建去重器，未启用去重时返回None"""
+        mode = merge_config.get('dedup_mode', "none")
+        if not mode or mode == "none":
+            return None
+        return cls(
+            mode=mode,
+            key_columns=merge_config.get('dedup_keys'),
+            keep=merge_config.get('dedup_keep', "first"),
+            max_memory_items=int(merge_config.get('dedup_memory_items') or 5_000_000),
+            spill_dir=merge_config.get('spill_dir') or None
+        )
+
+    def hash_rows(self, df, columns=None):
+        """
+        计算每行的64位哈希
+
+        Args:
+            df: 数据框
+            columns: 参与哈希的列及顺序，None表示按去重方式自动确定
+        """
+        if columns is None:
+            columns = self.hash_columns(df)
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"去重列不存在：{', '.join(map(str, missing))}")
+        return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+    def hash_columns(self, df):
+        """参与哈希的列：关键列，或除血缘列外的所有列"""
+        if self.mode == "key":
+            return self.key_columns
+        return [col for col in df.columns if col not in LINEAGE_COLUMNS]
+
+    def dedup_frames(self, dataframes):
+        """
+        对多个数据框跨文件去重
+
+        整行去重时各数据框按第一个数据框的列顺序计算哈希。
+
+        Returns:
+            list: 去重后的数据框列表（与输入一一对应，可能为空）
+        """
+        if not dataframes:
+            return []
+        columns = self.hash_columns(dataframes[0])
+        chunks = lambda reverse=False: reversed(dataframes) if reverse else iter(dataframes)
+        return list(self.dedup_chunks(chunks, columns))
+
+    def dedup_chunks(self, chunks, columns=None):
+        """
+        流式去重
+
+        按顺序处理各数据块；保留最后一次出现时先反向读一遍，只记录每块的保留标记，再正向输出。
+
+        Args:
+            chunks: 函数 chunks(reverse=False)，返回按顺序（或反向）排列的数据块
+            columns: 参与哈希的列，None表示按每块的列自动确定
+
+        Yields:
+            DataFrame: 去重后的数据块（与输入块一一对应）
+        """
+        seen = HashSet(self.max_memory_items, self.spill_dir)
+        try:
+            if self.keep == "first":
+                for chunk in chunks():
+                    yield self._filter(chunk, self._mark(seen, chunk, columns, reverse=False))
+            else:
+                masks = [self._mark(seen, chunk, columns, reverse=True) for chunk in chunks(reverse=True)]
+                for chunk, mask in zip(chunks(), reversed(masks)):
+                    yield self._filter(chunk, mask)
+        finally:
+            seen.close()
+
+    def _mark(self, seen, chunk, columns, reverse):
+        """计算一个数据块中需要保留的行，reverse为True时从块尾向块头判断"""
+        hashes = self.hash_rows(chunk, columns)
+        if reverse:
+            hashes = hashes[::-1]
+        # 先在块内去重，再与之前数据块的哈希比较
+        first_in_batch = ~pd.Series(hashes).duplicated().to_numpy()
+        keep_mask = np.zeros(len(hashes), dtype=bool)
+        keep_mask[first_in_batch] = seen.add_new(hashes[first_in_batch])
+        if reverse:
+            keep_mask = keep_mask[::-1]
+        return keep_mask
+
+    def _filter(self, chunk, keep_mask):
+        """按保留标记过滤数据块并累计删除行数"""
+        self.removed_rows += int(len(keep_mask) - keep_mask.sum())
+        return chunk if keep_mask.all() else chunk[keep_mask]
@@ -0,0 +1,304 @@
+"""
+关键列横向合并模块
+按关键列（工号、SKU等）把多个文件连接成一张宽表，代替手工VLOOKUP
+"""
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from .sorter import NATIVE_KINDS, ExternalSorter
+
+# 内部使用的关键列编码列名
+CODE_COLUMN = '__join_code__'
+
+
+class KeyJoiner:
+    def __init__(self, keys, how="inner", memory_limit_mb=512, batch_rows=200000, spill_dir=None):
+        """
+        初始化关键列连接器
+
+        Args:
+            keys: 关键列列表
+            how: 连接方式，inner: 内连接, left: 以第一个文件为准, outer: 全连接
+            memory_limit_mb: 估算内存超过该值时改用分批连接；外部排序归并连接时为各输入排序共用的内存预算
+            batch_rows: 分批连接每批处理的行数
+            spill_dir: 外部排序的有序段暂存目录的上级目录，None表示系统临时目录
+        """
+        if not keys:
+            raise ValueError("横向合并必须指定关键列")
+        if how not in ("inner", "left", "outer"):
+            raise ValueError(f"不支持的连接方式：{how}")
+        self.keys = list(keys)
+        self.how = how
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.batch_rows = batch_rows
+        self.spill_dir = spill_dir
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建连接器"""
+        return cls(
+            keys=merge_config.get('join_keys'),
+            how=merge_config.get('join_how', "inner"),
+            memory_limit_mb=float(merge_config.get('join_memory_mb') or 512),
+            spill_dir=merge_config.get('spill_dir') or None
+        )
+
+    def join(self, named_frames):
+        """
+        连接多个数据框
+
+        Args:
+            named_frames: [(名称, DataFrame)]，名称用于给重名的非关键列加后缀
+
+        Returns:
+            DataFrame: 连接结果，关键列在前
+        """
+        frames = self.prepare(named_frames)
+        if self.estimate_bytes(frames) <= self.memory_limit:
+            return self.hash_join(frames)
+        chunks = list(self.iter_batched_join(frames))
+        if not chunks:
+            return self.hash_join([df.iloc[0:0] for df in frames])
+        return pd.concat(chunks, ignore_index=True)
+
+    def prepare(self, named_frames):
+        """检查关键列、统一关键列类型并给重名的非关键列加上文件名后缀"""
+        renames = self.renamed_columns([(name, df.columns) for name, df in named_frames])
+        frames = [df.rename(columns=rename) for (_, df), rename in zip(named_frames, renames)]
+
+        # 同一关键列在不同文件中类型不同（如数字工号和文本工号）时统一为文本
+        for key in self.keys:
+            if len({str(df[key].dtype) for df in frames}) > 1:
+                for df in frames:
+                    df[key] = self.normalize_key(df[key])
+        return frames
+
+    def renamed_columns(self, named_columns):
+        """
+        检查关键列，确定各输入中需要加文件名后缀的非关键列
+
+        Args:
+            named_columns: [(名称, 列)]
+
+        Returns:
+            list: 每个输入一个字典 {原列名: 加后缀后的列名}
+        """
+        for name, columns in named_columns:
+            missing = [key for key in self.keys if key not in columns]
+            if missing:
+                raise ValueError(f"文件 {name} 缺少关键列：{', '.join(missing)}")
+
+        # 在多个文件中重复出现的非关键列
+        counts = {}
+        for _, columns in named_columns:
+            for col in columns:
+                if col not in self.keys:
+                    counts[col] = counts.get(col, 0) + 1
+        duplicated = {col for col, count in counts.items() if count > 1}
+        return [{col: f"{col}_{name}" for col in columns if col in duplicated} for name, columns in named_columns]
+
+    @staticmethod
+    def normalize_key(series):
+        """将关键列转换为文本，整数值的浮点数（如 1001.0）转换为 1001"""
+        def to_text(value):
+            if pd.isna(value):
+                return None
+            if isinstance(value, float) and value.is_integer():
+                return str(int(value))
+            return str(value).strip()
+        return series.map(to_text).astype("string")
+
+    @staticmethod
+    def estimate_bytes(frames):
+        """估算连接所需内存：输入数据量加上哈希表和结果的开销"""
+        return sum(int(df.memory_usage(deep=True).sum()) for df in frames) * 3
+
+    def hash_join(self, frames):
+        """在内存中依次做哈希连接"""
+        result = reduce(lambda left, right: pd.merge(left, right, how=self.how, on=self.keys), frames)
+        return result[self.keys + [col for col in result.columns if col not in self.keys]]
+
+    def iter_batched_join(self, frames):
+        """
+        内存中的分批连接，按关键列区间分批产出结果
+
+        先把所有输入的关键列统一编码为整数并按编码排序，再把编码区间切成若干批，
+        每批只取各输入中对应的连续行段做连接。同一关键值的所有行必然落在同一批中，
+        所以内连接、左连接、全连接的结果与一次性连接相同。
+        输入和结果仍然全部在内存中，分批只限制每次 pd.merge 的哈希表和中间结果的大小，
+        不能处理超出内存的数据。
+
+        Yields:
+            DataFrame: 按关键列编码顺序排列的结果块
+        """
+        codes, key_table = self._encode_keys(frames)
+
+        sorted_frames = []
+        sorted_codes = []
+        for df, code in zip(frames, codes):
+            order = np.argsort(code, kind="stable")
+            body = df.drop(columns=self.keys).iloc[order].reset_index(drop=True)
+            body.insert(0, CODE_COLUMN, code[order])
+            sorted_frames.append(body)
+            sorted_codes.append(code[order])
+
+        # 按各编码的总行数切分区间，使每批大约 batch_rows 行
+        counts = sum(np.bincount(code, minlength=len(key_table)) for code in sorted_codes)
+        cumulative = np.cumsum(counts)
+        bounds = [0]
+        target = self.batch_rows
+        while bounds[-1] < len(key_table):
+            nxt = int(np.searchsorted(cumulative, target, side="left")) + 1
+            nxt = min(max(nxt, bounds[-1] + 1), len(key_table))
+            bounds.append(nxt)
+            target = cumulative[nxt - 1] + self.batch_rows
+
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            parts = []
+            for body, code in zip(sorted_frames, sorted_codes):
+                start, end = np.searchsorted(code, [lo, hi], side="left")
+                parts.append(body.iloc[start:end])
+            batch = reduce(lambda left, right: pd.merge(left, right, how=self.how, on=CODE_COLUMN), parts)
+            if batch.empty:
+                continue
+            batch = batch.sort_values(CODE_COLUMN, kind="stable")
+            keys = key_table.iloc[batch[CODE_COLUMN].to_numpy()].reset_index(drop=True)
+            yield pd.concat([keys, batch.drop(columns=CODE_COLUMN).reset_index(drop=True)], axis=1)
+
+    def sort_merge_join(self, inputs):
+        """
+        外部排序归并连接，输入和结果都以数据块流的形式处理，数据量可以超出内存
+
+        每个输入先用 ExternalSorter 按关键列外部排序（超出内存预算的部分作为有序段暂存到磁盘），
+        再按输入顺序依次做两路归并连接，上一次连接的结果流（仍按关键列排序）作为下一次连接的左侧。
+        内存中只有各输入当前的数据块和尚未读全的同一关键值的行。
+        关键列在各输入中类型不一致、或混有无法直接比较的类型时统一为文本（同 prepare）；
+        结果与 hash_join 的行相同，按关键列排序，同一关键值内保持输入中的顺序。
+
+        Args:
+            inputs: [(名称, 列, {列名: 该列在全部数据中出现过的类型集合}, 数据块迭代器)]
+
+        Returns:
+            tuple: (结果的列, 按关键列排序的结果块生成器)，关键列在前
+        """
+        renames = self.renamed_columns([(name, columns) for name, columns, _, _ in inputs])
+
+        # 需要统一为文本的关键列
+        text_keys = []
+        for key in self.keys:
+            kinds = set().union(*(kind_sets.get(key, set()) for _, _, kind_sets, _ in inputs))
+            if len(kinds) > 1 or not kinds <= NATIVE_KINDS:
+                text_keys.append(key)
+
+        def prepared(chunks, rename):
+            for chunk in chunks:
+                chunk = chunk.rename(columns=rename)
+                for key in text_keys:
+                    chunk[key] = self.normalize_key(chunk[key])
+                yield chunk
+
+        run_limit_mb = self.memory_limit / 1024 / 1024 / len(inputs)
+        streams = []
+        for (_, columns, kind_sets, chunks), rename in zip(inputs, renames):
+            sorter = ExternalSorter(
+                [{'column': key} for key in self.keys], memory_limit_mb=run_limit_mb, spill_dir=self.spill_dir
+            )
+            columns = [rename.get(col, col) for col in columns]
+            kind_sets = {rename.get(col, col): kinds for col, kinds in kind_sets.items()}
+            kind_sets.update({key: {'string'} for key in text_keys})
+            streams.append((columns, sorter.iter_sorted(prepared(chunks, rename), columns, kind_sets)))
+
+        return reduce(self._merge_join, streams)
+
+    def _merge_join(self, left, right):
+        """
+        两路归并连接两个按关键列排序的数据流
+
+        Args:
+            left / right: (列, 数据块迭代器)
+
+        Returns:
+            tuple: (结果的列, 按关键列排序的结果块生成器)
+        """
+        columns = self.keys + [
+            col for side_columns in (left[0], right[0]) for col in side_columns if col not in self.keys
+        ]
+        return columns, self._iter_merge_join(left, right)
+
+    def _iter_merge_join(self, left, right):
+        """
+        两边已读入部分的最后一个关键值中较小的那个记为边界，小于边界的关键值在两边都已读全，
+        这部分直接连接后输出；等于边界的行可能延续到下一块，留到读入下一块后再处理。
+        已读完的一边不参与确定边界，两边都读完时输出剩下的全部行。
+        """
+        streams = [iter(left[1]), iter(right[1])]
+        buffers = [pd.DataFrame(columns=left[0]), pd.DataFrame(columns=right[0])]
+        active = [True, True]
+
+        def load(side):
+            chunk = next(streams[side], None)
+            while chunk is not None and not len(chunk):
+                chunk = next(streams[side], None)
+            if chunk is None:
+                active[side] = False
+            elif len(buffers[side]):
+                buffers[side] = pd.concat([buffers[side], chunk], ignore_index=True)
+            else:
+                buffers[side] = chunk.reset_index(drop=True)
+
+        load(0)
+        load(1)
+        while True:
+            # 按关键列顺序编码，编码的大小顺序与两边数据流的排列顺序一致
+            codes, key_table = self._encode_keys(buffers, sort=True)
+            lasts = [int(code[-1]) for code, side_active in zip(codes, active) if side_active]
+            boundary = min(lasts) if lasts else len(key_table)
+
+            parts = []
+            for side, code in enumerate(codes):
+                end = int(np.searchsorted(code, boundary, side="left"))
+                body = buffers[side].iloc[:end].drop(columns=self.keys)
+                body.insert(0, CODE_COLUMN, code[:end])
+                parts.append(body)
+                buffers[side] = buffers[side].iloc[end:].reset_index(drop=True)
+            if len(parts[0]) or len(parts[1]):
+                batch = pd.merge(parts[0], parts[1], how=self.how, on=CODE_COLUMN)
+                if len(batch):
+                    batch = batch.sort_values(CODE_COLUMN, kind="stable")
+                    keys = key_table.iloc[batch[CODE_COLUMN].to_numpy()].reset_index(drop=True)
+                    yield pd.concat([keys, batch.drop(columns=CODE_COLUMN).reset_index(drop=True)], axis=1)
+
+            if not lasts:
+                return
+            for side, code in enumerate(codes):
+                if active[side] and int(code[-1]) == boundary:
+                    load(side)
+
+    def _encode_keys(self, frames, sort=False):
+        """
+        把所有输入的关键列联合编码为整数
+
+        直接按关键列取值的组合分组编号（空值也作为一个取值），不做各列编码的乘积组合，多个高基数关键列也不会溢出
+
+        Args:
+            sort: 是否按关键列取值的顺序编号（空值排在最后），否则按第一次出现的顺序编号
+
+        Returns:
+            tuple: (各输入的编码数组列表, 编码 -> 关键列取值 的DataFrame)
+        """
+        all_keys = pd.concat([df[self.keys] for df in frames], ignore_index=True)
+        codes = all_keys.groupby(self.keys, sort=sort, dropna=False).ngroup().to_numpy(dtype=np.int64)
+
+        # 每个编码对应的关键列取值（取第一次出现的行）
+        first_rows = np.zeros(int(codes.max()) + 1 if len(codes) else 0, dtype=np.int64)
+        first_rows[codes[::-1]] = np.arange(len(codes))[::-1]
+        key_table = all_keys.iloc[first_rows].reset_index(drop=True)
+
+        result = []
+        offset = 0
+        for df in frames:
+            result.append(codes[offset:offset + len(df)])
+            offset += len(df)
+        return result, key_table
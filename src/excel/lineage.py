@@ -0,0 +1,11 @@
+"""
+血缘列定义
+合并时附加到数据中、记录每行来源的列
+"""
+
+# 数据来源列：记录每行数据来自哪个文件
+SOURCE_COLUMN = '数据来源'
+# Sheet来源列：一个文件读取多个Sheet时，记录每行数据来自哪个Sheet
+SHEET_COLUMN = '来源Sheet'
+# 不参与表头比较、始终排在最后的血缘列
+LINEAGE_COLUMNS = (SHEET_COLUMN, SOURCE_COLUMN)
@@ -0,0 +1,46 @@
+"""
+合并单元格索引模块
+为合并单元格区域建立按列的区间索引，重叠检查只需二分查找，避免openpyxl逐个区域线性比较
+"""
+from bisect import bisect_right
+
+
+class RangeIndex:
+    def __init__(self):
+        """
+        初始化互不重叠的矩形区域索引
+
+        每一列上，覆盖该列的区域的行区间互不重叠，按起始行排序保存；
+        查询某列上是否有区间与给定行区间重叠时，只需检查起始行不大于查询结束行的最后一个区间。
+        """
+        self._columns = {}  # {列号: ([起始行], [结束行])}
+        self.count = 0
+
+    def overlaps(self, min_row, min_col, max_row, max_col):
+        """判断矩形区域是否与已有区域重叠"""
+        for col in range(min_col, max_col + 1):
+            entry = self._columns.get(col)
+            if not entry:
+                continue
+            starts, ends = entry
+            i = bisect_right(starts, max_row) - 1
+            if i >= 0 and ends[i] >= min_row:
+                return True
+        return False
+
+    def add(self, min_row, min_col, max_row, max_col):
+        """添加矩形区域（调用前应确认不重叠）"""
+        for col in range(min_col, max_col + 1):
+            starts, ends = self._columns.setdefault(col, ([], []))
+            # 区域大多按行递增生成，插入位置通常在末尾
+            i = bisect_right(starts, min_row)
+            starts.insert(i, min_row)
+            ends.insert(i, max_row)
+        self.count += 1
+
+    def try_add(self, min_row, min_col, max_row, max_col):
+        """不重叠时添加并返回True，否则返回False"""
+        if self.overlaps(min_row, min_col, max_row, max_col):
+            return False
+        self.add(min_row, min_col, max_row, max_col)
+        return True
@@ -3,41 +3,180 @@ Excel合并核心逻辑模块
 处理Excel文件的读取、合并等操作
 """
 import pandas as pd
+import io
+import itertools
 import os
+import re
+from collections import deque
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
 
+from .reader_engine import ReaderEngine
+from .output_formats import ColumnarWriter
+from .dedup import RowDeduplicator, file_digest
+from .joiner import KeyJoiner
+from .sorter import ExternalSorter
+from .summary import GroupSummary
+from .row_filter import RowFilter
+from .spill import SpillStore
+from .stream_writer import StreamingWorkbookWriter
+from .xlsx_package import XlsxPackager
+from .progress import MergeProgress, MergeCancelled
+from .parse_cache import PARSE_CACHE, CachedWorkbook
+from .publisher import OutputPublisher
+from .prefetch import Prefetcher
+from .pipeline import StagePipeline
+from .lineage import SOURCE_COLUMN, SHEET_COLUMN, LINEAGE_COLUMNS
+from ..utils.profiler import MergeProfiler
+
 class ExcelMerger:
-    def __init__(self, style_manager=None):
-        """初始化Excel合并器"""
+    def __init__(self, style_manager=None, reader_engine="auto"):
+        """
+        初始化Excel合并器
+        
+        Args:
+            style_manager: 样式管理器
+            reader_engine: 默认读取引擎（auto/calamine/openpyxl/pyxlsb/xlrd）
+        """
         self.style_manager = style_manager
+        self.reader_engine = ReaderEngine(reader_engine)
+        
+    def select_engine(self, file_path, merge_config=None, need_styles=False):
+        """
+        为文件选择读取引擎
+        
+        只读取值时优先使用calamine，需要样式时使用openpyxl
+        """
+        preferred = (merge_config or {}).get('reader_engine')
+        return self.reader_engine.select(file_path, need_styles=need_styles, preferred=preferred)
+        
+    def get_sheet_names(self, file_path, engine=None):
+        """获取文件的sheet名称列表"""
+        engine = engine or self.select_engine(file_path)
+        with pd.ExcelFile(file_path, engine=engine) as xl:
+            return list(xl.sheet_names)
         
-    def merge_files(self, input_files, output_file, selected_sheets, file_sheets, merge_config):
+    def merge_files(self, input_files, output_file, selected_sheets, file_sheets, merge_config,
+                    progress_callback=None, cancel_token=None):
         """
         执行Excel文件合并操作
         
         Args:
             input_files: 输入文件列表
             output_file: 输出文件路径
-            selected_sheets: 选中的sheet信息 {文件路径: sheet名称}
+            selected_sheets: 选中的sheet信息 {文件路径: sheet名称 / [sheet名称列表] / {'regex': 正则表达式}}
             file_sheets: 文件的sheet信息 {文件路径: [sheet名称列表]}
             merge_config: 合并配置参数
+            progress_callback: 进度回调，参数为进度字典（见 MergeProgress.snapshot）
+            cancel_token: CancellationToken，在文件之间和数据块之间检查，取消后删除已写出的部分输出
+            
+        merge_config['profile'] 为True时在cProfile和tracemalloc下执行（包括读取、预读等工作线程），分析结果保存到 ~/.excel_merger/profiles/；
+        已有合并正在进行性能分析时本次不做分析
+        merge_config['stage_output'] 为True时先写到本地临时目录，完成后原子地发布到 output_file；
+        merge_config['latest_alias'] 为True时发布后同时更新同目录下的 *_latest.xlsx
             
         Returns:
             dict: 包含操作结果的字典
                 - success: 是否成功
                 - error: 错误信息（如果失败）
+                - cancelled: 是否被取消
+                - rows: 写出的数据行数
+                - outputs: 附加输出文件列表（Parquet/Feather/CSV）
+                - skipped_files: 因内容与其他输入完全相同而跳过的文件
+                - duplicates_removed: 去重删除的行数
+                - spilled: 是否使用了磁盘暂存（超出内存预算）
+                - package_parts: xlsx各部件大小（启用部件大小报告时）
+                - profile: 性能分析结果 {'prof_file', 'memory_file', 'summary'}（启用性能分析时）
+                - latest: 更新后的latest副本路径（启用latest副本时）
         """
+        publisher = OutputPublisher.from_config(merge_config, output_file)
+        target_file = publisher.staged_file if publisher else output_file
+        try:
+            profiler = MergeProfiler.from_config(merge_config)
+            if profiler is None:
+                result = self._merge_files(input_files, target_file, selected_sheets, file_sheets, merge_config,
+                                           progress_callback, cancel_token)
+            else:
+                result, profile = profiler.run(
+                    self._merge_files, input_files, target_file, selected_sheets, file_sheets, merge_config,
+                    progress_callback=progress_callback, cancel_token=cancel_token
+                )
+                if profile:
+                    result['profile'] = profile
+        except Exception:
+            if publisher:
+                publisher.cleanup()
+            raise
+        return publisher.publish(result) if publisher else result
+        
+    def _merge_files(self, input_files, output_file, selected_sheets, file_sheets, merge_config,
+                     progress_callback=None, cancel_token=None):
+        """执行合并，参数和返回值同 merge_files"""
+        store = None
+        prefetcher = None
+        progress = MergeProgress(progress_callback, cancel_token, files_total=sum(f in selected_sheets for f in input_files))
+        output_started = False
         try:
             # 读取所有Excel文件的指定范围
             all_data = []
             first_file = True
             header_styles = None
             data_styles = None
+            merged_cells = None
+            sheet_names = {}  # {文件路径: 实际读取的sheet名称列表}
+            
+            # 启用去重时，内容完全相同的文件在解析前直接跳过
+            deduplicator = RowDeduplicator.from_config(merge_config)
+            sorter = ExternalSorter.from_config(merge_config)
+            summary = GroupSummary.from_config(merge_config)
+            row_filter = RowFilter.from_config(merge_config)
+            packager = XlsxPackager.from_config(merge_config)
+            seen_digests = set()
+            skipped_files = []
             
+            # 估算数据量超出内存预算时，解析结果暂存到磁盘
+            execution_mode = merge_config.get('execution_mode', "auto")
+            budget = self.memory_budget(merge_config)
+            if execution_mode == "pipeline":
+                reason = self.pipeline_unsupported(merge_config, sorter, deduplicator)
+                if reason:
+                    print(f"{reason}，改为自动选择执行方式")
+                    execution_mode = "auto"
+            spill = (
+                execution_mode == "spill" or
+                (execution_mode == "auto" and self.estimate_memory(input_files) > budget)
+            )
+            used_bytes = 0
+            
+            # 解析当前文件时在后台预读接下来的几个文件
+            prefetcher = Prefetcher.from_config(merge_config, [f for f in input_files if f in selected_sheets], budget)
+            if prefetcher:
+                prefetcher.start()
+                
+            # 流水线方式：读取、转换、写出同时进行
+            if execution_mode == "pipeline":
+                return self._merge_pipelined(
+                    input_files, output_file, selected_sheets, file_sheets, merge_config, progress, prefetcher,
+                    deduplicator, summary, row_filter, packager
+                )
+            
+            # 筛选掉了行的文件（数据区域的行位置与模板不再对应）
+            filtered_files = set()
+            progress.set_stage('read')
             for file in input_files:
                 if file in selected_sheets:
-                    df = self.read_excel_range(
+                    progress.check()
+                    content = prefetcher.take(file) if prefetcher else None
+                    if deduplicator:
+                        digest = file_digest(file, content=content)
+                        if digest in seen_digests:
+                            skipped_files.append(file)
+                            progress.file_done()
+                            continue
+                        seen_digests.add(digest)
+                        
+                    filtered_before = row_filter.removed_rows if row_filter else 0
+                    df = self.read_excel_sheets(
                         file,
                         selected_sheets[file],
                         merge_config['header_row'],
@@ -45,19 +184,29 @@ class ExcelMerger:
                         merge_config['end_row'],
                         merge_config['start_col'],
                         merge_config['end_col'],
-                        add_source=(merge_config['merge_mode'] == 'single')
+                        add_source=(merge_config['merge_mode'] == 'single'),
+                        engine=self.select_engine(file, merge_config),
+                        row_filter=row_filter,
+                        select_columns=merge_config.get('select_columns'),
+                        column_order=merge_config.get('select_columns_order', "list"),
+                        content=content
                     )
+                    if row_filter and row_filter.removed_rows > filtered_before:
+                        filtered_files.add(file)
+                    progress.file_done(len(df))
                     
                     if not df.empty:
                         all_data.append((file, df))
+                        sheet_names[file] = df.attrs['sheet_names']
                         
-                        # 从第一个文件获取样式模板
-                        if first_file and merge_config['keep_styles'] and self.style_manager:
+                        # 从第一个支持样式的文件获取样式模板
+                        if (first_file and merge_config['keep_styles'] and self.style_manager
+                                and self.select_engine(file, merge_config, need_styles=True)):
                             try:
-                                wb = load_workbook(file)
+                                wb = load_workbook(io.BytesIO(content) if content is not None else file)
                                 header_styles, data_styles, merged_cells = self.style_manager.get_column_styles(
                                     wb, 
-                                    selected_sheets[file],
+                                    df.attrs['sheet_names'][0],
                                     merge_config['header_row']
                                 )
                                 first_file = False
@@ -65,28 +214,109 @@ class ExcelMerger:
                                 print(f"获取样式时出错: {style_error}")
                                 first_file = False
                                 
-            if not all_data:
+                        # 实际读取的数据超出预算时，也切换到磁盘暂存
+                        if not spill and execution_mode == "auto":
+                            used_bytes += int(df.memory_usage(deep=True).sum())
+                            spill = used_bytes > budget
+                        if spill:
+                            if store is None:
+                                store = SpillStore(merge_config.get('spill_dir') or None)
+                            for staged_file, staged_df in all_data:
+                                store.add(staged_file, staged_df, measure_width=merge_config['keep_styles'])
+                            all_data = []
+                                
+            if not all_data and store is None:
                 return {'success': False, 'error': "没有有效的数据可以合并！"}
                 
+            if store is not None:
+                # 横向合并的列与模板不对应，不应用样式
+                styles = (header_styles, data_styles) if (merge_config['keep_styles'] and header_styles and data_styles
+                                                          and merge_config['merge_mode'] != "join") else (None, None)
+                outputs = self._write_spilled(
+                    store, output_file, file_sheets, sheet_names, merge_config, styles, deduplicator, sorter, summary,
+                    packager, progress
+                )
+                progress.set_stage('package')
+                package_parts = packager.finish(output_file) if packager else None
+                progress.set_stage('done')
+                return {
+                    'success': True,
+                    'outputs': outputs,
+                    'skipped_files': skipped_files,
+                    'duplicates_removed': deduplicator.removed_rows if deduplicator else 0,
+                    'rows': progress.rows_written,
+                    'spilled': True,
+                    'package_parts': package_parts
+                }
+                
+            # 写入xlsx的数据，用于生成附加输出格式 [(sheet名称, DataFrame)]
+            output_frames = []
+            progress.set_stage('merge')
+            progress.check()
+            # 之后被取消时删除已写出的部分文件；写出过程中只在至少写入一个sheet后检查取消请求，
+            # 因为 pd.ExcelWriter 退出时总会保存，没有sheet时保存失败会掩盖取消
+            output_started = True
+            
             # 根据合并方式处理数据
-            if merge_config['merge_mode'] == "single":
+            if merge_config['merge_mode'] == "join":
+                # 按关键列横向合并（列与模板不对应，不应用样式）
+                named_frames = [(os.path.splitext(os.path.basename(file))[0], df) for file, df in all_data]
+                merged_df = KeyJoiner.from_config(merge_config).join(named_frames)
+                if sorter:
+                    merged_df = sorter.sort(merged_df)
+                if summary:
+                    summary.update(merged_df)
+                sheet_name = merge_config['custom_sheet_name'] if merge_config['sheet_name_mode'] == "custom" else "合并结果"
+                
+                progress.set_stage('write')
+                with pd.ExcelWriter(output_file, engine='openpyxl', mode='w') as writer:
+                    if packager:
+                        packager.attach(writer.book)
+                    merged_df.to_excel(writer, sheet_name=sheet_name, index=False, float_format=None)
+                    output_frames.append((sheet_name, merged_df))
+                    progress.rows_done(len(merged_df))
+                    self.write_summary_sheet(writer, summary, merge_config)
+                    
+            elif merge_config['merge_mode'] == "single":
                 # 检查表头一致性
                 headers_consistent, message = self.check_headers_consistency([df for _, df in all_data])
                 if not headers_consistent:
                     return {'success': False, 'error': f"表头不一致：\n{message}"}
                 
+                # 跨文件去重
+                if deduplicator:
+                    deduped = deduplicator.dedup_frames([df for _, df in all_data])
+                    all_data = [(file, df) for (file, _), df in zip(all_data, deduped)]
+                    
+                # 按文件累加汇总
+                if summary:
+                    for file, df in all_data:
+                        summary.update(df, os.path.basename(file))
+                
                 # 智能合并数据
                 merged_df = self.smart_merge([df for _, df in all_data], merge_config['keep_header'])
                 
+                # 排序（数据已全部在内存中）
+                if sorter:
+                    merged_df = sorter.sort(merged_df)
+                
                 # 确定sheet名称
                 sheet_name = merge_config['custom_sheet_name'] if merge_config['sheet_name_mode'] == "custom" else "合并结果"
                 
                 # 保存合并后的文件
+                progress.set_stage('write')
                 with pd.ExcelWriter(output_file, engine='openpyxl', mode='w') as writer:
+                    if packager:
+                        packager.attach(writer.book)
                     merged_df.to_excel(writer, sheet_name=sheet_name, index=False, float_format=None)
+                    output_frames.append((sheet_name, merged_df))
+                    progress.rows_done(len(merged_df))
                     
-                    # 应用样式
+                    # 应用样式（排序后各文件的行不再连续，筛选或去重删除行后行位置与模板不再对应，
+                    # 这两种情况都不重建数据区域的合并单元格）
                     if merge_config['keep_styles'] and header_styles and data_styles and self.style_manager:
+                        progress.set_stage('style')
+                        rows_removed = filtered_files or (deduplicator and deduplicator.removed_rows)
                         wb = writer.book
                         self.style_manager.apply_column_styles(
                             wb,
@@ -94,27 +324,28 @@ class ExcelMerger:
                             header_styles,
                             data_styles,
                             merge_config,
-                            merged_cells
+                            merged_cells,
+                            blocks=[] if sorter or rows_removed else [len(df) for _, df in all_data]
                         )
+                    self.write_summary_sheet(writer, summary, merge_config)
                         
             else:
                 # 每个文件一个sheet
+                progress.set_stage('write')
                 with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+                    if packager:
+                        packager.attach(writer.book)
                     for file_path, df in all_data:
-                        # 获取sheet名称
-                        file_name = os.path.basename(file_path)
-                        if merge_config['sheet_name_mode'] == "auto":
-                            sheet_name = os.path.splitext(file_name)[0]
-                        elif merge_config['sheet_name_mode'] == "original":
-                            sheet_name = selected_sheets[file_path]
-                        else:  # custom
-                            sheet_name = file_sheets[file_path].get('custom_name', os.path.splitext(file_name)[0])
-                        
-                        # 确保sheet名称有效
-                        sheet_name = self.sanitize_sheet_name(sheet_name)
+                        sheet_name = self.output_sheet_name(file_path, sheet_names[file_path], file_sheets, merge_config)
+                        if sorter:
+                            df = sorter.sort(df)
+                        if summary:
+                            summary.update(df, os.path.basename(file_path))
                         
                         # 保存数据
                         df.to_excel(writer, sheet_name=sheet_name, index=False, float_format=None)
+                        output_frames.append((sheet_name, df))
+                        progress.rows_done(len(df))
                         
                         # 应用样式
                         if merge_config['keep_styles'] and header_styles and data_styles and self.style_manager:
@@ -125,16 +356,507 @@ class ExcelMerger:
                                 header_styles,
                                 data_styles,
                                 merge_config,
-                                merged_cells
+                                merged_cells,
+                                blocks=[] if sorter or file_path in filtered_files else [len(df)]
                             )
+                    self.write_summary_sheet(writer, summary, merge_config)
                             
-            return {'success': True}
+            # 按输出设置重新打包xlsx
+            progress.set_stage('package')
+            package_parts = packager.finish(output_file) if packager else None
+            
+            # 用同一份合并数据写出附加格式
+            outputs = []
+            if merge_config.get('output_formats'):
+                outputs = ColumnarWriter.from_config(merge_config).write(
+                    output_frames, output_file, merge_config['output_formats']
+                )
+            if summary and merge_config.get('summary_mode') == "file":
+                outputs.append(self.write_summary_file(summary, output_file))
+            progress.set_stage('done')
+                
+            return {
+                'success': True,
+                'outputs': outputs,
+                'skipped_files': skipped_files,
+                'duplicates_removed': deduplicator.removed_rows if deduplicator else 0,
+                'rows': progress.rows_written,
+                'spilled': False,
+                'package_parts': package_parts
+            }
+            
+        except MergeCancelled as e:
+            if output_started and os.path.exists(output_file):
+                os.remove(output_file)
+            return {'success': False, 'cancelled': True, 'error': str(e)}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
             
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+            if store is not None:
+                store.close()
+                
+    @staticmethod
+    def pipeline_unsupported(merge_config, sorter=None, deduplicator=None):
+        """
+        不能以流水线方式执行的原因，可以时返回None
+        
+        流水线中的数据块写出后不再保留，需要全部数据的处理（横向合并、排序、保留最后一次出现的去重、附加输出格式）不能流水线执行
+        """
+        if merge_config['merge_mode'] == "join":
+            return "横向合并不支持流水线执行"
+        if sorter:
+            return "排序不支持流水线执行"
+        if deduplicator and deduplicator.keep == "last" and merge_config['merge_mode'] == "single":
+            return "保留最后一次出现的去重不支持流水线执行"
+        if merge_config.get('output_formats'):
+            return "附加输出格式不支持流水线执行"
+        return None
+        
+    def _merge_pipelined(self, input_files, output_file, selected_sheets, file_sheets, merge_config, progress,
+                         prefetcher=None, deduplicator=None, summary=None, row_filter=None, packager=None):
+        """
+        以流水线方式执行合并
+        
+        读取线程逐个解析文件，转换线程统一列、跨文件去重并累加汇总，调用线程用流式写出器写出xlsx；
+        阶段之间的队列长度有限，写出第k个文件时读取第k+1个文件，内存中最多只有几个文件的数据。
+        进度回调只在调用线程中执行。与磁盘暂存模式相同，不重建合并单元格、不调整列宽。
+        
+        单Sheet模式下输出列由第一个有数据的文件确定，之后的文件列不一致时报错；参数和返回值同 merge_files
+        """
+        files = [file for file in input_files if file in selected_sheets]
+        single = merge_config['merge_mode'] == "single"
+        skipped_files = []
+        styles = {}  # 第一个支持样式的文件的样式模板
+        
+        def read():
+            """读取阶段：逐个解析文件，内容完全相同的文件不解析"""
+            seen_digests = set()
+            first_file = True
+            for file in files:
+                progress.check()
+                content = prefetcher.take(file) if prefetcher else None
+                if deduplicator:
+                    digest = file_digest(file, content=content)
+                    if digest in seen_digests:
+                        skipped_files.append(file)
+                        yield {'file': file, 'df': None, 'rows_read': 0}
+                        continue
+                    seen_digests.add(digest)
+                    
+                df = self.read_excel_sheets(
+                    file,
+                    selected_sheets[file],
+                    merge_config['header_row'],
+                    merge_config['start_row'],
+                    merge_config['end_row'],
+                    merge_config['start_col'],
+                    merge_config['end_col'],
+                    add_source=single,
+                    engine=self.select_engine(file, merge_config),
+                    row_filter=row_filter,
+                    select_columns=merge_config.get('select_columns'),
+                    column_order=merge_config.get('select_columns_order', "list"),
+                    content=content
+                )
+                if (first_file and not df.empty and merge_config['keep_styles'] and self.style_manager
+                        and self.select_engine(file, merge_config, need_styles=True)):
+                    first_file = False
+                    try:
+                        wb = load_workbook(io.BytesIO(content) if content is not None else file)
+                        styles['header'], styles['data'], _ = self.style_manager.get_column_styles(
+                            wb, df.attrs['sheet_names'][0], merge_config['header_row']
+                        )
+                    except Exception as style_error:
+                        print(f"获取样式时出错: {style_error}")
+                yield {'file': file, 'df': df, 'rows_read': len(df), 'sheet_names': df.attrs['sheet_names']}
+                
+        def transform(items):
+            """转换阶段：单Sheet模式下统一列并跨文件去重，累加汇总"""
+            columns = []
+            pending = deque()
+            
+            def frames(reverse=False):
+                for item in items:
+                    pending.append(item)
+                    df = item['df']
+                    if df is None or df.empty:
+                        continue
+                    if single:
+                        if not columns:
+                            # 血缘列：单Sheet模式总有数据来源列，任一文件选择多个sheet时有来源Sheet列
+                            columns.extend(col for col in df.columns if col not in LINEAGE_COLUMNS)
+                            if any(not isinstance(selected_sheets[file], str) for file in files):
+                                columns.append(SHEET_COLUMN)
+                            columns.append(SOURCE_COLUMN)
+                            first_name = os.path.basename(item['file'])
+                        else:
+                            consistent, message = self.check_columns_consistency(
+                                [(first_name, columns), (os.path.basename(item['file']), df.columns)]
+                            )
+                            if not consistent:
+                                raise Exception(f"表头不一致：\n{message}")
+                        df = df.reindex(columns=columns)
+                    yield df
+                    
+            stream = deduplicator.dedup_chunks(frames) if deduplicator and single else frames()
+            for df in stream:
+                # 没有数据的文件按原顺序先行输出
+                item = pending.popleft()
+                while item['df'] is None or item['df'].empty:
+                    yield item
+                    item = pending.popleft()
+                if summary:
+                    summary.update(df, os.path.basename(item['file']))
+                yield dict(item, df=df)
+            yield from pending
+            
+        progress.set_stage('pipeline')
+        writer = StreamingWorkbookWriter(output_file)
+        if packager:
+            packager.attach(writer.workbook)
+        try:
+            with StagePipeline(read(), [transform]) as pipeline:
+                items = iter(pipeline)
+                
+                def data_items():
+                    """逐个取得有数据的文件，并在调用线程中报告读取进度"""
+                    for item in items:
+                        progress.file_done(item['rows_read'])
+                        if item['df'] is not None and not item['df'].empty:
+                            yield item
+                            
+                def written(chunks):
+                    for chunk in chunks:
+                        yield chunk
+                        progress.rows_done(len(chunk))
+                        
+                if single:
+                    data = data_items()
+                    first = next(data, None)
+                    if first is not None:
+                        sheet_name = merge_config['custom_sheet_name'] if merge_config['sheet_name_mode'] == "custom" else "合并结果"
+                        chunks = itertools.chain([first['df']], (item['df'] for item in data))
+                        writer.write_sheet(
+                            sheet_name, list(first['df'].columns), written(chunks),
+                            header_styles=styles.get('header'), data_styles=styles.get('data')
+                        )
+                else:
+                    for item in data_items():
+                        sheet_name = self.output_sheet_name(item['file'], item['sheet_names'], file_sheets, merge_config)
+                        writer.write_sheet(
+                            sheet_name, list(item['df'].columns), written([item['df']]),
+                            header_styles=styles.get('header'), data_styles=styles.get('data')
+                        )
+                        
+            if not writer.workbook.worksheets:
+                writer.discard()
+                return {'success': False, 'error': "没有有效的数据可以合并！"}
+            self.write_summary_sheet(writer, summary, merge_config)
+            writer.save()
+        except BaseException:
+            writer.discard()
+            raise
+            
+        outputs = []
+        if summary and merge_config.get('summary_mode') == "file":
+            outputs.append(self.write_summary_file(summary, output_file))
+        progress.set_stage('package')
+        package_parts = packager.finish(output_file) if packager else None
+        progress.set_stage('done')
+        return {
+            'success': True,
+            'outputs': outputs,
+            'skipped_files': skipped_files,
+            'duplicates_removed': deduplicator.removed_rows if deduplicator else 0,
+            'rows': progress.rows_written,
+            'spilled': False,
+            'package_parts': package_parts
+        }
+        
+    def _write_spilled(self, store, output_file, file_sheets, sheet_names, merge_config, styles, deduplicator,
+                       sorter=None, summary=None, packager=None, progress=None):
+        """
+        从磁盘暂存区流式写出合并结果
+        
+        xlsx与附加格式在同一遍读取中写出，任何时候内存中只有一个数据块（排序时为每个有序段各一块）。
+        横向合并时先对暂存的各文件做外部排序归并连接，连接结果逐块暂存后再按同样的方式写出。
+        流式写出不支持重建合并单元格。每个数据块之前检查取消请求，取消或出错时删除已写出的附加文件；
+        xlsx在全部数据写完后才保存，取消或出错时不会留下部分文件。
+        
+        Args:
+            store: SpillStore
+            styles: (header_styles, data_styles)，不保留样式时为 (None, None)
+            其余参数同 merge_files
+            
+        Returns:
+            list: 附加输出文件列表
+        """
+        header_styles, data_styles = styles
+        progress = progress or MergeProgress()
+        progress.set_stage('write')
+        files = list(store.tables)
+        writer = StreamingWorkbookWriter(output_file)
+        if packager:
+            packager.attach(writer.workbook)
+        columnar = ColumnarWriter.from_config(merge_config)
+        formats = merge_config.get('output_formats') or []
+        categories = {
+            SOURCE_COLUMN: sorted({os.path.basename(file) for file in files}),
+            SHEET_COLUMN: sorted({name for file in files for name in sheet_names.get(file, [])}),
+        }
+        
+        # [(sheet名称, 列, 数据块生成函数, 参与计算类型和列宽的表)]
+        if merge_config['merge_mode'] == "join":
+            progress.set_stage('merge')
+            joined = self.join_spilled(store, files, merge_config, progress, measure_width=bool(header_styles))
+            progress.set_stage('write')
+            chunks = lambda reverse=False: store.iter_chunks(joined, reverse=reverse)
+            sheet_name = merge_config['custom_sheet_name'] if merge_config['sheet_name_mode'] == "custom" else "合并结果"
+            sheets = [(sheet_name, store.columns(joined), chunks, [joined])]
+        elif merge_config['merge_mode'] == "single":
+            columns = self.merged_columns([store.columns(file) for file in files])
+            headers_consistent, message = self.check_columns_consistency(
+                [(os.path.basename(file), store.columns(file)) for file in files]
+            )
+            if not headers_consistent:
+                raise Exception(f"表头不一致：\n{message}")
+                
+            def chunks(reverse=False, columns=columns):
+                for file in (reversed(files) if reverse else files):
+                    yield from store.iter_chunks(file, columns, reverse=reverse)
+                    
+            sheet_name = merge_config['custom_sheet_name'] if merge_config['sheet_name_mode'] == "custom" else "合并结果"
+            sheets = [(sheet_name, columns, chunks, files)]
+        else:
+            sheets = []
+            for file in files:
+                sheet_name = self.output_sheet_name(file, sheet_names[file], file_sheets, merge_config)
+                chunks = lambda reverse=False, file=file: store.iter_chunks(file, reverse=reverse)
+                sheets.append((sheet_name, store.columns(file), chunks, [file]))
+                
+        outputs = []
+        try:
+            for sheet_name, columns, chunks, tables in sheets:
+                # 去重时可能反向再读一遍，每次读取都检查取消请求
+                checked = lambda reverse=False, chunks=chunks: progress.iter_checked(chunks(reverse))
+                stream = checked()
+                if deduplicator and merge_config['merge_mode'] == "single":
+                    # 各数据块都按合并后的列读出，参与哈希的列由去重器按去重方式确定（按关键列或除血缘列外的整行）
+                    stream = deduplicator.dedup_chunks(checked)
+                if sorter:
+                    sorter.check_columns(columns)
+                    stream = sorter.iter_sorted(stream, columns, store.column_kind_sets(tables))
+                    
+                # 附加格式与xlsx共用同一个数据流
+                sinks = []
+                kinds = store.column_kinds(tables)
+                for fmt in formats:
+                    path = columnar.output_path(output_file, fmt, sheet_name if len(sheets) > 1 else None)
+                    sinks.append(columnar.open_sink(fmt, path, columns, kinds, categories))
+                    outputs.append(path)
+                    
+                # 多Sheet模式下数据块中没有数据来源列，汇总时按文件名补齐
+                source = os.path.basename(tables[0]) if merge_config['merge_mode'] == "multiple" else None
+                        
+                def tee(stream, sinks=sinks, source=source):
+                    for chunk in stream:
+                        for sink in sinks:
+                            sink.write(chunk)
+                        if summary:
+                            summary.update(chunk, source)
+                        progress.rows_done(len(chunk))
+                        yield chunk
+                        
+                try:
+                    writer.write_sheet(
+                        sheet_name, columns, tee(stream),
+                        header_styles=header_styles,
+                        data_styles=data_styles,
+                        column_widths=store.column_widths(tables, columns) if header_styles else None
+                    )
+                finally:
+                    for sink in sinks:
+                        sink.close()
+            self.write_summary_sheet(writer, summary, merge_config)
+            writer.save()
+        except BaseException:
+            # 取消或出错时结束流式写出并删除已写出的附加文件，不留下部分输出
+            writer.discard()
+            for path in outputs + [output_file]:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+            
+        if summary and merge_config.get('summary_mode') == "file":
+            outputs.append(self.write_summary_file(summary, output_file))
+        return outputs
+        
+    def join_spilled(self, store, files, merge_config, progress, measure_width=False):
+        """
+        对暂存的各文件做外部排序归并连接，连接结果逐块暂存到同一暂存区
+        
+        Args:
+            store: SpillStore
+            files: 参与连接的表（输入文件路径），按连接顺序排列
+            measure_width: 是否记录各列文本的最大长度
+            
+        Returns:
+            str: 连接结果在暂存区中的表名
+        """
+        joiner = KeyJoiner.from_config(merge_config)
+        inputs = [
+            (os.path.splitext(os.path.basename(file))[0], store.columns(file), store.column_kind_sets([file]),
+             progress.iter_checked(store.iter_chunks(file)))
+            for file in files
+        ]
+        joined = '__joined__'
+        columns, chunks = joiner.sort_merge_join(inputs)
+        for chunk in chunks:
+            store.add(joined, chunk, measure_width=measure_width)
+        if joined not in store.tables:
+            # 连接结果为空时只输出表头
+            store.add(joined, pd.DataFrame(columns=columns))
+        return joined
+        
+    def write_summary_sheet(self, writer, summary, merge_config):
+        """
+        把汇总结果写入输出工作簿的单独sheet
+        
+        Args:
+            writer: pd.ExcelWriter 或 StreamingWorkbookWriter
+        """
+        if not summary or merge_config.get('summary_mode') != "sheet":
+            return
+        result = summary.result()
+        if isinstance(writer, StreamingWorkbookWriter):
+            sheet_name = self.unique_sheet_name(merge_config.get('summary_sheet_name') or "汇总", writer.workbook.sheetnames)
+            writer.write_sheet(sheet_name, list(result.columns), [result])
+        else:
+            sheet_name = self.unique_sheet_name(merge_config.get('summary_sheet_name') or "汇总", writer.book.sheetnames)
+            result.to_excel(writer, sheet_name=sheet_name, index=False)
+            
+    @staticmethod
+    def write_summary_file(summary, output_file):
+        """把汇总结果写入与输出文件同目录的单独文件"""
+        path = os.path.splitext(output_file)[0] + "_汇总.xlsx"
+        summary.result().to_excel(path, sheet_name="汇总", index=False)
+        return path
+        
+    def unique_sheet_name(self, sheet_name, existing):
+        """生成不与已有sheet重名的有效名称"""
+        base = self.sanitize_sheet_name(sheet_name)
+        sheet_name = base
+        index = 1
+        while sheet_name in existing:
+            suffix = f"_{index}"
+            sheet_name = base[:31 - len(suffix)] + suffix
+            index += 1
+        return sheet_name
+        
+    @staticmethod
+    def memory_budget(merge_config):
+        """内存预算（字节）"""
+        return float(merge_config.get('memory_budget_mb') or 1024) * 1024 * 1024
+        
+    @staticmethod
+    def estimate_memory(input_files):
+        """
+        估算把所有输入读入内存所需的字节数
+        
+        xlsx等压缩格式解析为DataFrame后通常膨胀到文件大小的约10倍
+        """
+        total = 0
+        for file in input_files:
+            try:
+                size = os.path.getsize(file)
+            except OSError:
+                continue
+            ratio = 3 if os.path.splitext(file)[1].lower() == '.xls' else 10
+            total += size * ratio
+        return total
+        
+    def output_sheet_name(self, file_path, sheet_names, file_sheets, merge_config):
+        """多Sheet模式下某个文件输出的sheet名称"""
+        file_name = os.path.basename(file_path)
+        if merge_config['sheet_name_mode'] == "auto":
+            sheet_name = os.path.splitext(file_name)[0]
+        elif merge_config['sheet_name_mode'] == "original":
+            sheet_name = sheet_names[0]
+        else:  # custom
+            sheet_name = file_sheets[file_path].get('custom_name', os.path.splitext(file_name)[0])
+            
+        # 确保sheet名称有效
+        return self.sanitize_sheet_name(sheet_name)
+        
+    @staticmethod
+    def resolve_sheets(selection, sheet_names):
+        """
+        将sheet选择解析为实际的sheet名称列表
+        
+        Args:
+            selection: sheet名称、sheet名称列表或 {'regex': 正则表达式}
+            sheet_names: 文件中所有sheet名称
+            
+        Returns:
+            list: 按文件中顺序排列的sheet名称
+        """
+        if isinstance(selection, dict):
+            pattern = re.compile(selection['regex'])
+            return [name for name in sheet_names if pattern.search(name)]
+        if isinstance(selection, (list, tuple)):
+            return [name for name in sheet_names if name in selection]
+        return [selection] if selection in sheet_names else []
+        
+    def read_excel_sheets(self, file_path, selection, header_row, start_row=None, end_row=None,
+                          start_col=None, end_col=None, add_source=True, engine=None, row_filter=None,
+                          select_columns=None, column_order="list", content=None):
+        """
+        读取一个文件中选中的所有sheet并纵向堆叠
+        
+        文件只打开一次，所有sheet共用同一次sharedStrings/styles解析；
+        文件被同一轮调度中的多个任务共享时，从进程内的解析缓存读取，不重复解析。
+        选择多个sheet时添加来源Sheet列；实际读取的sheet名称保存在结果的 attrs['sheet_names'] 中。
+        
+        Args:
+            file_path: Excel文件路径
+            selection: sheet名称、sheet名称列表或 {'regex': 正则表达式}
+            content: 已预读到内存的文件内容（bytes），传入时从内存解析，不再读取文件
+            其余参数同 read_excel_range
+        """
+        engine = engine or self.select_engine(file_path)
+        if PARSE_CACHE.is_shared(file_path):
+            workbook = CachedWorkbook(file_path, engine, content=content)
+        else:
+            workbook = pd.ExcelFile(io.BytesIO(content) if content is not None else file_path, engine=engine)
+        with workbook as xl:
+            sheets = self.resolve_sheets(selection, xl.sheet_names)
+            if not sheets:
+                raise Exception(f"文件 {os.path.basename(file_path)} 中没有匹配 {selection} 的Sheet")
+                
+            frames = []
+            for sheet_name in sheets:
+                df = self.read_excel_range(
+                    file_path, sheet_name, header_row, start_row, end_row,
+                    start_col, end_col, add_source=False, excel_file=xl, row_filter=row_filter,
+                    select_columns=select_columns, column_order=column_order
+                )
+                if not isinstance(selection, str):
+                    df[SHEET_COLUMN] = sheet_name
+                frames.append(df)
+                
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if add_source:
+            df[SOURCE_COLUMN] = os.path.basename(file_path)
+        df.attrs['sheet_names'] = sheets
+        return df
+            
     def read_excel_range(self, file_path, sheet_name, header_row, start_row=None, end_row=None, 
-                        start_col=None, end_col=None, add_source=True):
+                        start_col=None, end_col=None, add_source=True, engine=None, excel_file=None, row_filter=None,
+                        select_columns=None, column_order="list"):
         """
         读取指定范围的Excel数据
         Args:
@@ -146,28 +868,46 @@ class ExcelMerger:
             start_col: 开始列（A, B, C...）
             end_col: 结束列（A, B, C...）
             add_source: 是否添加数据来源列
+            engine: 读取引擎，None表示按文件格式自动选择
+            excel_file: 已打开的pd.ExcelFile（或CachedWorkbook），传入时复用，不再重新打开文件
+            row_filter: RowFilter，读取后立即丢弃不满足条件的行
+            select_columns: 按表头名称选择的列，指定时忽略列范围以外的列且只读取这些列
+            column_order: list: 按 select_columns 的顺序输出, file: 按文件中的顺序输出
         """
         try:
-            # 读取整个Excel文件，不指定表头
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-            
-            # 处理列范围
-            if start_col and str(start_col).strip():
-                start_col_idx = self.col_to_num(start_col)
-            else:
-                start_col_idx = 0
-                
-            if end_col and str(end_col).strip():
-                end_col_idx = self.col_to_num(end_col) + 1
-            else:
-                end_col_idx = len(df.columns)
-            
+            def parse(**kwargs):
+                """读取sheet，不指定表头"""
+                if excel_file is not None:
+                    return excel_file.parse(sheet_name, header=None, **kwargs)
+                return pd.read_excel(file_path, sheet_name=sheet_name, header=None,
+                                     engine=engine or self.select_engine(file_path), **kwargs)
+                                     
             # 处理表头行
             header_row_idx = int(header_row) - 1 if header_row and str(header_row).strip() else 0
             
-            # 获取表头数据
-            header_df = df.iloc[header_row_idx:header_row_idx+1, start_col_idx:end_col_idx]
-            header_values = header_df.iloc[0].values
+            if select_columns:
+                # 先只读到表头行，按列名确定列位置，再只读取这些列
+                header_df = parse(nrows=header_row_idx + 1)
+                start_col_idx, end_col_idx = self.col_range(start_col, end_col, len(header_df.columns))
+                header_names = self.header_names(header_df, header_row_idx, start_col_idx, end_col_idx)
+                
+                # 筛选条件用到但未选中的列也要读取，筛选后再去掉
+                read_columns = list(select_columns)
+                if row_filter:
+                    read_columns += [col for col in row_filter.columns if col not in read_columns]
+                positions = self.resolve_columns(header_names, read_columns, file_path, sheet_name)
+                if column_order == "file":
+                    positions = sorted(positions)
+                    
+                df = parse(usecols=sorted(set(positions)))
+                columns = [header_names[pos] for pos in positions]
+            else:
+                # 读取整个sheet
+                df = parse()
+                start_col_idx, end_col_idx = self.col_range(start_col, end_col, len(df.columns))
+                header_names = self.header_names(df, header_row_idx, start_col_idx, end_col_idx)
+                positions = list(header_names)
+                columns = list(header_names.values())
             
             # 处理数据范围
             if not start_row or not str(start_row).strip():
@@ -177,32 +917,70 @@ class ExcelMerger:
             
             end_row_idx = int(end_row) if end_row and str(end_row).strip() else len(df)
             
-            # 获取数据部分
-            data_df = df.iloc[start_row_idx:end_row_idx, start_col_idx:end_col_idx]
+            # 获取数据部分（读取结果的列标签即原始列位置）
+            data_df = df.iloc[start_row_idx:end_row_idx][positions]
             
             # 设置列名
-            columns = [str(val) if pd.notna(val) else f"Column_{i+1}" 
-                      for i, val in enumerate(header_values)]
             data_df.columns = columns
             
+            # 筛选行（在添加来源列、合并和应用样式之前）
+            if row_filter:
+                data_df = row_filter.apply(data_df)
+                if select_columns:
+                    data_df = data_df[[col for col in columns if col in select_columns]]
+            
             # 添加数据来源列
             if add_source:
-                data_df['数据来源'] = os.path.basename(file_path)
+                data_df[SOURCE_COLUMN] = os.path.basename(file_path)
             
             return data_df
             
         except Exception as e:
             raise Exception(f"读取文件 {os.path.basename(file_path)} 的 {sheet_name} 时出错: {str(e)}")
             
+    def col_range(self, start_col, end_col, column_count):
+        """列范围的起止位置（0-based，不含结束位置）"""
+        start_col_idx = self.col_to_num(start_col) if start_col and str(start_col).strip() else 0
+        end_col_idx = self.col_to_num(end_col) + 1 if end_col and str(end_col).strip() else column_count
+        return start_col_idx, end_col_idx
+        
+    @staticmethod
+    def header_names(df, header_row_idx, start_col_idx, end_col_idx):
+        """
+        表头行中列范围内各列的名称，空表头命名为 Column_序号
+        
+        Returns:
+            dict: {列位置(0-based): 列名}
+        """
+        header_values = df.iloc[header_row_idx, start_col_idx:end_col_idx].values if len(df) > header_row_idx else []
+        return {start_col_idx + i: str(val) if pd.notna(val) else f"Column_{i+1}"
+                for i, val in enumerate(header_values)}
+                
+    @staticmethod
+    def resolve_columns(header_names, select_columns, file_path, sheet_name):
+        """
+        按列名查找列位置，同名列取第一个
+        
+        Returns:
+            list: 与 select_columns 顺序一致的列位置
+        """
+        positions = {}
+        for pos, name in header_names.items():
+            positions.setdefault(name, pos)
+        missing = [col for col in select_columns if col not in positions]
+        if missing:
+            raise ValueError(f"{os.path.basename(file_path)} 的 {sheet_name} 中没有列：{', '.join(missing)}")
+        return [positions[col] for col in select_columns]
+            
     def smart_merge(self, dataframes, keep_header=True):
         """智能合并数据框列表"""
         if not dataframes:
             return pd.DataFrame()
             
-        # 获取所有列名（除了'数据来源'）
+        # 获取所有列名（除了血缘列）
         all_columns = set()
         for df in dataframes:
-            all_columns.update([col for col in df.columns if col != '数据来源'])
+            all_columns.update([col for col in df.columns if col not in LINEAGE_COLUMNS])
             
         # 确保所有数据框都有相同的列
         for df in dataframes:
@@ -228,29 +1006,58 @@ class ExcelMerger:
             if other_dfs:
                 result_df = pd.concat([result_df] + other_dfs, ignore_index=True)
         
-        # 调整列顺序，确保'数据来源'列在最后
-        if '数据来源' in result_df.columns:
-            cols = [col for col in result_df.columns if col != '数据来源'] + ['数据来源']
+        # 调整列顺序，确保血缘列（来源Sheet、数据来源）在最后
+        lineage = [col for col in LINEAGE_COLUMNS if col in result_df.columns]
+        if lineage:
+            cols = [col for col in result_df.columns if col not in LINEAGE_COLUMNS] + lineage
             result_df = result_df[cols]
         
         return result_df
         
+    @staticmethod
+    def merged_columns(column_lists):
+        """
+        多个数据合并后的列顺序，与 smart_merge 一致
+        
+        以第一个数据的列为准，其他数据新增的列依次追加，血缘列排在最后
+        """
+        columns = []
+        for column_list in column_lists:
+            for col in column_list:
+                if col not in LINEAGE_COLUMNS and col not in columns:
+                    columns.append(col)
+        for col in LINEAGE_COLUMNS:
+            if any(col in column_list for column_list in column_lists):
+                columns.append(col)
+        return columns
+        
     def check_headers_consistency(self, dataframes):
         """检查所有数据框的表头是否一致"""
-        if not dataframes:
+        return self.check_columns_consistency(
+            [(df[SOURCE_COLUMN].iloc[0] if SOURCE_COLUMN in df.columns and len(df) else f"第{i + 1}个文件", df.columns)
+             for i, df in enumerate(dataframes)]
+        )
+        
+    def check_columns_consistency(self, named_columns):
+        """
+        检查各文件的列是否一致
+        
+        Args:
+            named_columns: [(文件名, 列名列表)]
+        """
+        if not named_columns:
             return False, "没有数据可供检查"
             
-        # 获取第一个数据框的列（不包括'数据来源'列）
-        base_columns = set(col for col in dataframes[0].columns if col != '数据来源')
+        # 获取第一个文件的列（不包括血缘列）
+        base_columns = set(col for col in named_columns[0][1] if col not in LINEAGE_COLUMNS)
         
-        # 检查其他数据框的列是否与第一个相同
+        # 检查其他文件的列是否与第一个相同
         inconsistent_files = []
-        for i, df in enumerate(dataframes[1:], 1):
-            current_columns = set(col for col in df.columns if col != '数据来源')
+        for file_name, columns in named_columns[1:]:
+            current_columns = set(col for col in columns if col not in LINEAGE_COLUMNS)
             if current_columns != base_columns:
-                file_name = df['数据来源'].iloc[0]
                 diff_cols = base_columns.symmetric_difference(current_columns)
-                inconsistent_files.append(f"文件 {file_name} 的列不一致，差异列：{', '.join(diff_cols)}")
+                inconsistent_files.append(f"文件 {file_name} 的列不一致，差异列：{', '.join(map(str, diff_cols))}")
                 
         if inconsistent_files:
             return False, "\n".join(inconsistent_files)
@@ -0,0 +1,180 @@
+"""
+列式输出模块
+将合并结果在同一次运行中额外写出为Parquet、Feather(Arrow IPC)和CSV文件
+"""
+import os
+import pandas as pd
+
+from .lineage import LINEAGE_COLUMNS
+from .spill import frame_kinds
+
+# 输出格式 -> 文件扩展名
+OUTPUT_FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv',
+}
+
+# 以字典编码写出的列（重复值很多的来源信息列）
+DICTIONARY_COLUMNS = LINEAGE_COLUMNS
+
+
+class ColumnarWriter:
+    def __init__(self, parquet_compression="zstd", csv_chunksize=100000):
+        """
+        初始化列式输出器
+
+        Args:
+            parquet_compression: Parquet压缩算法（zstd/snappy/gzip/none）
+            csv_chunksize: CSV分块写出的行数
+        """
+        self.parquet_compression = parquet_compression
+        self.csv_chunksize = csv_chunksize
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建输出器"""
+        return cls(
+            parquet_compression=merge_config.get('parquet_compression', "zstd"),
+            csv_chunksize=int(merge_config.get('csv_chunksize') or 100000)
+        )
+
+    @staticmethod
+    def output_path(output_file, fmt, sheet_name=None):
+        """附加文件路径：与xlsx同目录同名，多个sheet时加上sheet名称"""
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式：{fmt}")
+        base = os.path.splitext(output_file)[0]
+        if sheet_name is not None:
+            base = f"{base}_{sheet_name}"
+        return base + OUTPUT_FORMATS[fmt]
+
+    def write(self, frames, output_file, formats):
+        """
+        写出所有附加格式
+
+        Args:
+            frames: [(sheet名称, DataFrame)]，只有一个时直接使用输出文件名
+            output_file: xlsx输出文件路径，附加文件与它同目录同名
+            formats: 需要写出的格式列表
+
+        Returns:
+            list: 已写出的文件路径
+        """
+        written = []
+        for fmt in formats:
+            for sheet_name, df in frames:
+                path = self.output_path(output_file, fmt, sheet_name if len(frames) > 1 else None)
+                sink = self.open_sink(fmt, path, list(df.columns), frame_kinds(df))
+                sink.write(df)
+                sink.close()
+                written.append(path)
+        return written
+
+    def open_sink(self, fmt, path, columns, kinds, categories=None):
+        """
+        打开一个可逐块写入的附加格式文件
+
+        Args:
+            fmt: 输出格式
+            path: 文件路径
+            columns: 输出列
+            kinds: {列名: 数据类型}，用于在写第一块之前确定整个文件的schema
+            categories: {字典编码列: 所有取值}，保证各块使用同一个字典
+        """
+        if fmt == 'csv':
+            return CsvSink(path, self.csv_chunksize)
+        return ArrowSink(fmt, path, self.schema_for(columns, kinds, categories),
+                         categories, self.parquet_compression)
+
+    @staticmethod
+    def schema_for(columns, kinds, categories=None):
+        """根据各列的数据类型生成Arrow schema"""
+        import pyarrow as pa
+
+        kind_types = {
+            'integer': pa.int64(),
+            'floating': pa.float64(),
+            'mixed-integer-float': pa.float64(),
+            'decimal': pa.float64(),
+            'boolean': pa.bool_(),
+            'datetime64': pa.timestamp('us'),
+            'datetime': pa.timestamp('us'),
+            'date': pa.date32(),
+            'timedelta64': pa.duration('us'),
+            'timedelta': pa.duration('us'),
+        }
+        fields = []
+        for col in columns:
+            if col in DICTIONARY_COLUMNS:
+                field_type = pa.dictionary(pa.int32(), pa.string())
+            else:
+                field_type = kind_types.get(kinds.get(col), pa.string())
+            fields.append(pa.field(str(col), field_type))
+        return pa.schema(fields)
+
+    @staticmethod
+    def to_arrow(df, schema, categories=None):
+        """
+        按schema将DataFrame转换为Arrow表
+
+        来源信息列转换为字典编码；Excel中常见的混合类型列无法直接转换时按字符串写出
+        """
+        import pyarrow as pa
+
+        arrays = []
+        for col, field in zip(df.columns, schema):
+            series = df[col]
+            if col in DICTIONARY_COLUMNS:
+                values = (categories or {}).get(col)
+                series = pd.Categorical(series.astype("string"), categories=values) if values else series.astype("category")
+            try:
+                array = pa.array(series, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                array = pa.array(series.map(lambda v: None if pd.isna(v) else str(v)), type=pa.string())
+            if array.type != field.type:
+                array = array.cast(field.type, safe=False)
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class ArrowSink:
+    def __init__(self, fmt, path, schema, categories=None, compression="zstd"):
+        """逐块写入Parquet或Feather(Arrow IPC)文件"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = schema
+        self.categories = categories
+        if fmt == 'parquet':
+            compression = None if compression in (None, "", "none") else compression
+            self.writer = pq.ParquetWriter(path, schema, compression=compression)
+        else:
+            # Feather v2 即 Arrow IPC 文件格式
+            self.writer = pa.ipc.new_file(path, schema)
+
+    def write(self, df):
+        """写入一块数据"""
+        if len(df):
+            self.writer.write_table(ColumnarWriter.to_arrow(df, self.schema, self.categories))
+
+    def close(self):
+        """完成写入"""
+        self.writer.close()
+
+
+class CsvSink:
+    def __init__(self, path, chunksize=100000):
+        """逐块写入CSV文件（带BOM，Excel可直接打开）"""
+        self.file = open(path, 'w', encoding="utf-8-sig", newline="")
+        self.chunksize = chunksize
+        self.header_written = False
+
+    def write(self, df):
+        """写入一块数据"""
+        df.to_csv(self.file, index=False, header=not self.header_written, chunksize=self.chunksize)
+        self.header_written = True
+
+    def close(self):
+        """完成写入"""
+        self.file.close()
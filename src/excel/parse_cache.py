@@ -0,0 +1,137 @@
+"""
+解析缓存模块
+同一轮调度中多个任务读取同一个输入文件时，进程内共享每个sheet的一次解析结果；
+缓存按 (文件, sheet, 修改时间, 引擎) 区分，按文件引用计数，最后一个使用该文件的任务结束后释放
+"""
+import io
+import os
+import threading
+
+
+class _Entry:
+    """一个缓存项：第一个请求的线程负责解析，其余线程等待并使用同一结果"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.value = None
+
+
+class ParseCache:
+    def __init__(self):
+        """初始化解析缓存，只缓存已通过 retain() 登记为共享的文件"""
+        self._lock = threading.Lock()
+        self._users = {}    # {文件: 使用该文件的任务数}
+        self._entries = {}  # {(文件, sheet, 修改时间, 引擎): _Entry}
+
+    @staticmethod
+    def _file_key(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def retain(self, file_paths):
+        """登记一个任务将要读取的文件"""
+        with self._lock:
+            for file_path in file_paths:
+                key = self._file_key(file_path)
+                self._users[key] = self._users.get(key, 0) + 1
+
+    def release(self, file_paths):
+        """任务结束，文件不再有任务使用时丢弃其所有解析结果"""
+        with self._lock:
+            for file_path in file_paths:
+                key = self._file_key(file_path)
+                count = self._users.get(key, 0) - 1
+                if count > 0:
+                    self._users[key] = count
+                    continue
+                self._users.pop(key, None)
+                for entry_key in [k for k in self._entries if k[0] == key]:
+                    del self._entries[entry_key]
+
+    def is_shared(self, file_path):
+        """文件是否已登记为共享"""
+        with self._lock:
+            return self._file_key(file_path) in self._users
+
+    def get(self, file_path, sheet_name, engine, load):
+        """
+        获取sheet的解析结果
+
+        文件已登记时，同一 (文件, sheet, 修改时间, 引擎) 只解析一次，同时请求的线程等待第一次解析完成；
+        文件未登记时直接解析，不缓存
+
+        Args:
+            sheet_name: sheet名称，None表示sheet名称列表
+            load: 解析函数，无参数
+        """
+        key = self._file_key(file_path)
+        with self._lock:
+            entry = None
+            if key in self._users:
+                entry = self._entries.setdefault((key, sheet_name, os.stat(key).st_mtime_ns, engine), _Entry())
+        if entry is None:
+            return load()
+        with entry.lock:
+            if not entry.loaded:
+                entry.value = load()
+                entry.loaded = True
+            return entry.value
+
+
+# 进程内共享的解析缓存
+PARSE_CACHE = ParseCache()
+
+
+class CachedWorkbook:
+    def __init__(self, file_path, engine, cache=PARSE_CACHE, content=None):
+        """
+        与 pd.ExcelFile 用法相同的只读工作簿，sheet名称和sheet内容从解析缓存获取
+
+        只有缓存中缺少的内容才打开文件解析；缓存的是不指定表头的整个sheet，
+        nrows、usecols 在缓存结果上截取，返回的数据不能原地修改
+
+        Args:
+            file_path: Excel文件路径
+            engine: 读取引擎
+            cache: ParseCache
+            content: 已预读到内存的文件内容（bytes），需要解析时从内存读取
+        """
+        self.file_path = file_path
+        self.engine = engine
+        self.cache = cache
+        self.content = content
+        self._excel_file = None
+
+    def _open(self):
+        """打开文件（只打开一次）"""
+        if self._excel_file is None:
+            import pandas as pd
+            source = io.BytesIO(self.content) if self.content is not None else self.file_path
+            self._excel_file = pd.ExcelFile(source, engine=self.engine)
+        return self._excel_file
+
+    @property
+    def sheet_names(self):
+        return self.cache.get(self.file_path, None, self.engine, lambda: list(self._open().sheet_names))
+
+    def parse(self, sheet_name, header=None, nrows=None, usecols=None):
+        """读取sheet（不指定表头），只支持 header=None"""
+        df = self.cache.get(
+            self.file_path, sheet_name, self.engine, lambda: self._open().parse(sheet_name, header=None)
+        )
+        if nrows is not None:
+            df = df.iloc[:nrows]
+        if usecols is not None:
+            df = df[list(usecols)]
+        return df
+
+    def close(self):
+        if self._excel_file is not None:
+            self._excel_file.close()
+            self._excel_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,115 @@
+"""
+流水线模块
+把合并拆分为读取、转换、写出等阶段，每个阶段在自己的线程中执行，阶段之间用有界队列连接：
+下游处理不过来时上游阻塞等待（背压），同时在内存中的数据块数量有上限
+"""
+import queue
+import threading
+
+from ..utils.profiler import profile_thread
+
+# 阶段之间的队列长度
+QUEUE_SIZE = 2
+
+# 数据流结束标记
+_END = object()
+
+
+class _Failure:
+    """上游阶段出错，把异常传递给下游"""
+    def __init__(self, error):
+        self.error = error
+
+
+class StagePipeline:
+    def __init__(self, source, stages=(), queue_size=QUEUE_SIZE):
+        """
+        初始化流水线
+
+        迭代流水线即在调用线程中取得最后一个阶段的输出（写出阶段在调用线程中执行）；
+        任一阶段出错时，异常在调用线程中重新抛出；提前结束迭代或出错时调用 close() 停止所有阶段
+
+        Args:
+            source: 可迭代对象，在读取线程中迭代
+            stages: 转换阶段列表，每个阶段为函数 stage(上游数据的迭代器)，返回输出数据的迭代器，在各自的线程中执行
+            queue_size: 阶段之间的队列长度
+        """
+        self.source = source
+        self.stages = list(stages)
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(len(self.stages) + 1)]
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """启动各阶段的线程"""
+        produce = profile_thread(self._produce)
+        self._threads = [threading.Thread(target=produce, args=(iter(self.source), self._queues[0]), daemon=True)]
+        for stage, inbox, outbox in zip(self.stages, self._queues, self._queues[1:]):
+            self._threads.append(threading.Thread(
+                target=produce, args=(lambda stage=stage, inbox=inbox: stage(self._drain(inbox)), outbox),
+                daemon=True
+            ))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _put(self, outbox, item):
+        """放入队列，队列已满时等待；流水线已停止时返回False"""
+        while not self._stopped.is_set():
+            try:
+                outbox.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, inbox):
+        """逐个取出上游阶段的输出，上游出错时抛出同样的异常"""
+        while True:
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def _produce(self, items, outbox):
+        """执行一个阶段，把输出放入下游队列，结束时放入结束标记，出错时放入异常"""
+        try:
+            if callable(items):
+                items = items()
+            for item in items:
+                if not self._put(outbox, item):
+                    return
+            self._put(outbox, _END)
+        except BaseException as e:
+            self._put(outbox, _Failure(e))
+
+    def __iter__(self):
+        outbox = self._queues[-1]
+        while True:
+            item = outbox.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def close(self):
+        """停止所有阶段并等待线程结束"""
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
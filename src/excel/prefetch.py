@@ -0,0 +1,124 @@
+"""
+预读模块
+解析当前文件的同时，在后台线程中把接下来的几个输入文件各以一次大块顺序读取读入内存，
+解析时直接从内存读取，网络共享的读取延迟被解析时间掩盖
+"""
+import os
+import threading
+
+from ..utils.profiler import profile_thread
+
+
+class Prefetcher:
+    def __init__(self, file_paths, depth=2, max_bytes=256 * 1024 * 1024):
+        """
+        初始化预读器
+
+        按 file_paths 的顺序预读，最多领先正在解析的文件 depth 个文件；
+        已预读但还未取走的内容合计不超过 max_bytes，单个文件超过 max_bytes 时不预读，解析时直接读取文件
+
+        Args:
+            file_paths: 将要按顺序解析的文件
+            depth: 预读的文件数
+            max_bytes: 预读内容占用内存的上限（字节）
+        """
+        self.file_paths = list(file_paths)
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self._buffers = {}       # {序号: 文件内容 bytes，未预读时为None}
+        self._buffered_bytes = 0
+        self._current = -1       # 最近取走（正在解析）的文件的序号
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, merge_config, file_paths, memory_budget):
+        """根据合并配置创建预读器，预读文件数为0时返回None"""
+        depth = int(merge_config.get('prefetch_files', 2) or 0)
+        if depth <= 0 or not file_paths:
+            return None
+        # 预读内容最多占用内存预算的四分之一
+        return cls(file_paths, depth=depth, max_bytes=int(memory_budget // 4))
+
+    def start(self):
+        """启动后台预读线程"""
+        self._thread = threading.Thread(target=profile_thread(self._run), daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        for index, file_path in enumerate(self.file_paths):
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = None
+            with self._cond:
+                # 等待正在解析的文件接近本文件，且内存中有空间；正在等待本文件时立即读取
+                self._cond.wait_for(lambda: self._closed or index <= self._current or (
+                    index - self._current <= self.depth and
+                    (size is None or self._buffered_bytes == 0 or self._buffered_bytes + size <= self.max_bytes)
+                ))
+                if self._closed:
+                    return
+                if index < self._current:
+                    continue
+            data = self._read(file_path) if size is not None and size <= self.max_bytes else None
+            with self._cond:
+                if index >= self._current:
+                    self._buffers[index] = data
+                    self._buffered_bytes += len(data) if data else 0
+                self._cond.notify_all()
+
+    @staticmethod
+    def _read(file_path):
+        """一次顺序读入整个文件，失败时返回None（解析时再直接读取文件，报告实际的错误）"""
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def take(self, file_path):
+        """
+        取出文件的内容，等待预读完成
+
+        跳过的文件（如去重时跳过的文件）的预读内容在此时丢弃
+
+        Returns:
+            bytes: 文件内容，文件未被预读时返回None
+        """
+        with self._cond:
+            try:
+                index = self.file_paths.index(file_path, self._current + 1)
+            except ValueError:
+                return None
+            for skipped in [i for i in self._buffers if i < index]:
+                self._release(skipped)
+            self._current = index
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: index in self._buffers or self._closed)
+            return self._release(index) if index in self._buffers else None
+
+    def _release(self, index):
+        data = self._buffers.pop(index)
+        self._buffered_bytes -= len(data) if data else 0
+        return data
+
+    def close(self):
+        """停止预读并丢弃未取走的内容"""
+        with self._cond:
+            self._closed = True
+            self._buffers.clear()
+            self._buffered_bytes = 0
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,141 @@
+"""
+进度与取消模块
+合并过程中按阶段报告进度（文件数、读取和写出的行数、预计剩余时间），并在文件之间和数据块循环中检查取消请求
+"""
+import threading
+import time
+
+# 合并阶段
+STAGES = {
+    'read': '读取',
+    'pipeline': '读取并写出',
+    'merge': '合并',
+    'write': '写出',
+    'style': '样式',
+    'package': '打包',
+    'done': '完成',
+}
+
+
+class MergeCancelled(Exception):
+    """合并被取消"""
+
+
+class CancellationToken:
+    def __init__(self):
+        """可在其他线程中调用 cancel() 取消正在进行的合并"""
+        self._event = threading.Event()
+
+    def cancel(self):
+        """请求取消"""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+
+class MergeProgress:
+    def __init__(self, callback=None, cancel_token=None, files_total=0, min_interval=0.2):
+        """
+        初始化进度报告器
+
+        Args:
+            callback: 进度回调 callback(progress)，progress 为字典，见 snapshot()
+            cancel_token: CancellationToken，None表示不可取消
+            files_total: 输入文件总数
+            min_interval: 两次回调的最小间隔（秒），阶段切换时总是回调
+        """
+        self.callback = callback
+        self.cancel_token = cancel_token
+        self.files_total = files_total
+        self.min_interval = min_interval
+        self.stage = 'read'
+        self.files_done = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def check(self):
+        """已请求取消时抛出 MergeCancelled"""
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise MergeCancelled("合并已取消")
+
+    def set_stage(self, stage):
+        """切换阶段"""
+        self.stage = stage
+        self.report(force=True)
+
+    def file_done(self, rows=0):
+        """完成一个输入文件的读取"""
+        self.files_done += 1
+        self.rows_read += rows
+        self.check()
+        self.report()
+
+    def rows_done(self, rows):
+        """写出一批数据行"""
+        self.rows_written += rows
+        self.check()
+        self.report()
+
+    def iter_checked(self, chunks):
+        """逐块迭代数据，每块之前检查取消请求"""
+        for chunk in chunks:
+            self.check()
+            yield chunk
+
+    def fraction(self):
+        """
+        已完成的比例
+
+        读取和写出各占一半：读取按文件数计算，写出按已写出行数占已读取行数的比例计算
+        """
+        if self.stage == 'done':
+            return 1.0
+        read = self.files_done / self.files_total if self.files_total else 1.0
+        written = min(self.rows_written / self.rows_read, 1.0) if self.rows_read else 0.0
+        return (read + written) / 2
+
+    def snapshot(self):
+        """
+        当前进度
+
+        Returns:
+            dict:
+                - stage: 当前阶段（read/merge/write/style/package/done）
+                - stage_name: 阶段名称
+                - files_done / files_total: 已读取的文件数 / 文件总数
+                - rows_read / rows_written: 已读取 / 已写出的数据行数
+                - elapsed: 已用时间（秒）
+                - eta: 预计剩余时间（秒），无法估计时为None
+        """
+        elapsed = time.monotonic() - self.started
+        fraction = self.fraction()
+        return {
+            'stage': self.stage,
+            'stage_name': STAGES.get(self.stage, self.stage),
+            'files_done': self.files_done,
+            'files_total': self.files_total,
+            'rows_read': self.rows_read,
+            'rows_written': self.rows_written,
+            'elapsed': elapsed,
+            'eta': elapsed * (1 - fraction) / fraction if fraction > 0 else None,
+        }
+
+    def report(self, force=False):
+        """调用进度回调，距上次回调不足 min_interval 时跳过；回调中抛出 MergeCancelled 也会取消合并"""
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < self.min_interval:
+            return
+        self._last_report = now
+        try:
+            self.callback(self.snapshot())
+        except MergeCancelled:
+            raise
+        except Exception as e:
+            print(f"进度回调出错: {e}")
@@ -0,0 +1,112 @@
+"""
+输出发布模块
+合并结果先写到本地临时目录，完成后再以一次大块顺序复制加原子重命名发布到输出目录（通常是网络共享），
+读取方不会打开写了一半的文件；发布时可以同时更新一个固定名称的"latest"副本
+"""
+import os
+import re
+import shutil
+import tempfile
+
+# 发布时复制文件使用的缓冲区大小
+COPY_BUFFER_SIZE = 16 * 1024 * 1024
+
+# 输出文件名末尾的时间戳（_20240101_080000）
+TIMESTAMP_SUFFIX = re.compile(r"_\d{8}_\d{6}$")
+
+
+class OutputPublisher:
+    def __init__(self, output_file, latest_alias=False, staging_root=None):
+        """
+        初始化输出发布器
+
+        Args:
+            output_file: 最终的输出文件路径
+            latest_alias: 发布后是否更新同目录下的"latest"副本
+            staging_root: 暂存目录的父目录，None表示系统临时目录
+        """
+        self.output_file = os.path.abspath(output_file)
+        self.latest_alias = latest_alias
+        self.staging_dir = tempfile.mkdtemp(prefix="excel_merger_stage_", dir=staging_root)
+        self.staged_file = os.path.join(self.staging_dir, os.path.basename(self.output_file))
+
+    @classmethod
+    def from_config(cls, merge_config, output_file):
+        """根据合并配置创建发布器，未启用本地暂存时返回None"""
+        if not merge_config.get('stage_output', False):
+            return None
+        return cls(output_file, latest_alias=merge_config.get('latest_alias', False))
+
+    def alias_path(self):
+        """latest副本的路径：去掉输出文件名末尾的时间戳后加上 _latest"""
+        base, ext = os.path.splitext(self.output_file)
+        return f"{TIMESTAMP_SUFFIX.sub('', base)}_latest{ext}"
+
+    @staticmethod
+    def _replace(source, target, move=False):
+        """
+        把文件原子地放到目标位置
+
+        与目标目录位于同一文件系统时直接重命名；否则先以大块顺序复制到目标目录中的隐藏临时文件并写入磁盘，
+        再重命名为目标文件名，目标文件要么是旧版本，要么是完整的新版本
+        """
+        target_dir = os.path.dirname(target)
+        os.makedirs(target_dir, exist_ok=True)
+        if move and os.stat(source).st_dev == os.stat(target_dir).st_dev:
+            os.replace(source, target)
+            return
+        partial = os.path.join(target_dir, f".{os.path.basename(target)}.{os.getpid()}.partial")
+        try:
+            with open(source, 'rb') as src, open(partial, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(partial, target)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        if move:
+            os.remove(source)
+
+    def publish(self, result):
+        """
+        发布合并结果
+
+        先发布附加输出和latest副本，最后发布xlsx，xlsx出现时其余输出已经就绪；结果中的 outputs 改为发布后的路径，
+        更新了latest副本时结果中增加 latest。latest副本被占用（如正在Excel中打开）时只给出警告。
+
+        Args:
+            result: merge_files 的结果
+
+        Returns:
+            dict: 更新后的结果，发布失败时 success 为False
+        """
+        try:
+            if not result.get('success'):
+                return result
+            target_dir = os.path.dirname(self.output_file)
+            outputs = []
+            for staged in result.get('outputs') or []:
+                target = os.path.join(target_dir, os.path.basename(staged))
+                self._replace(staged, target, move=True)
+                outputs.append(target)
+            result['outputs'] = outputs
+
+            # latest副本从本地暂存文件复制，不再从输出目录读回刚发布的文件
+            if self.latest_alias:
+                try:
+                    self._replace(self.staged_file, self.alias_path())
+                    result['latest'] = self.alias_path()
+                except OSError as e:
+                    print(f"更新latest副本失败：{str(e)}")
+            self._replace(self.staged_file, self.output_file, move=True)
+            return result
+        except Exception as e:
+            return {'success': False, 'error': f"发布输出文件失败：{str(e)}"}
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        """删除暂存目录"""
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
@@ -0,0 +1,83 @@
+"""
+读取引擎模块
+根据文件格式以及是否需要样式，为每个文件选择合适的pandas读取引擎
+"""
+import importlib.util
+import os
+
+# 引擎名称 -> 引擎依赖的Python模块
+ENGINE_MODULES = {
+    'calamine': 'python_calamine',  # Rust实现，只读取值，速度最快
+    'openpyxl': 'openpyxl',         # 完整保真，支持样式
+    'pyxlsb': 'pyxlsb',             # 二进制 .xlsb
+    'xlrd': 'xlrd',                 # 旧版 .xls
+}
+
+# 各文件格式可用的引擎（按优先级排列）
+FORMAT_ENGINES = {
+    '.xlsx': ['calamine', 'openpyxl'],
+    '.xlsm': ['calamine', 'openpyxl'],
+    '.xlsb': ['calamine', 'pyxlsb'],
+    '.xls': ['calamine', 'xlrd'],
+}
+
+# openpyxl能读取样式的文件格式
+STYLE_FORMATS = ('.xlsx', '.xlsm')
+
+# 文件选择对话框使用的扩展名过滤
+SUPPORTED_PATTERNS = "*.xlsx *.xlsm *.xlsb *.xls"
+
+
+class ReaderEngine:
+    def __init__(self, preferred="auto"):
+        """
+        初始化读取引擎选择器
+
+        Args:
+            preferred: 首选引擎，auto表示按格式自动选择
+        """
+        self.preferred = preferred
+        self._available = {}  # 缓存引擎是否已安装
+
+    def is_available(self, engine):
+        """检查引擎依赖是否已安装"""
+        if engine not in self._available:
+            module = ENGINE_MODULES.get(engine)
+            self._available[engine] = bool(module) and importlib.util.find_spec(module) is not None
+        return self._available[engine]
+
+    def select(self, file_path, need_styles=False, preferred=None):
+        """
+        为文件选择读取引擎
+
+        Args:
+            file_path: Excel文件路径
+            need_styles: 是否需要读取样式（需要时只能使用openpyxl）
+            preferred: 本次读取的首选引擎，None表示使用初始化时的设置
+
+        Returns:
+            str: pandas可用的引擎名称；需要样式但格式不支持时返回None
+        """
+        ext = os.path.splitext(file_path)[1].lower()
+
+        if need_styles:
+            if ext in STYLE_FORMATS and self.is_available('openpyxl'):
+                return 'openpyxl'
+            return None
+
+        candidates = FORMAT_ENGINES.get(ext, ['openpyxl'])
+        preferred = preferred or self.preferred
+        if preferred and preferred != "auto" and preferred in candidates and self.is_available(preferred):
+            return preferred
+
+        for engine in candidates:
+            if self.is_available(engine):
+                return engine
+
+        modules = "、".join(ENGINE_MODULES[e] for e in candidates)
+        raise ValueError(f"没有可用的引擎读取 {ext} 文件，请安装以下任一依赖：{modules}")
+
+    @staticmethod
+    def supports_styles(file_path):
+        """判断文件格式是否支持读取样式"""
+        return os.path.splitext(file_path)[1].lower() in STYLE_FORMATS
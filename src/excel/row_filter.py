@@ -0,0 +1,168 @@
+"""
+行筛选模块
+在读取阶段按条件向量化筛选行，不满足条件的行在合并、排序和写出之前就被丢弃
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .spill import NUMERIC_KINDS
+
+# 支持的比较运算
+OPERATORS = ('==', '!=', '>', '>=', '<', '<=', 'in', 'not_in', 'contains', 'empty', 'not_empty', 'period')
+
+# 日期期间（相对于运行当天）
+PERIODS = ('today', 'this_week', 'this_month', 'last_month', 'this_year')
+
+DATE_KINDS = {'datetime64', 'datetime', 'date'}
+
+
+class RowFilter:
+    def __init__(self, conditions, combine="and"):
+        """
+        初始化行筛选器
+
+        Args:
+            conditions: 条件列表 [{'column': 列名, 'op': 运算符, 'value': 比较值}]
+                in/not_in 的比较值为列表；period 的比较值为 today/this_week/this_month/last_month/this_year；
+                empty/not_empty 不需要比较值
+            combine: and: 满足所有条件, or: 满足任一条件
+        """
+        if not conditions:
+            raise ValueError("筛选时必须指定条件")
+        if combine not in ("and", "or"):
+            raise ValueError(f"不支持的条件组合方式：{combine}")
+        for condition in conditions:
+            if condition.get('op') not in OPERATORS:
+                raise ValueError(f"不支持的筛选运算：{condition.get('op')}")
+            if condition['op'] == 'period' and condition.get('value') not in PERIODS:
+                raise ValueError(f"不支持的日期期间：{condition.get('value')}")
+        self.conditions = list(conditions)
+        self.combine = combine
+        self.removed_rows = 0
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建筛选器，未设置筛选条件时返回None"""
+        conditions = merge_config.get('filters')
+        if not conditions:
+            return None
+        return cls(conditions, merge_config.get('filter_combine', "and"))
+
+    @property
+    def columns(self):
+        """条件用到的列"""
+        return list(dict.fromkeys(c['column'] for c in self.conditions))
+
+    def apply(self, df):
+        """返回满足条件的行"""
+        if not len(df):
+            return df
+        mask = self.mask(df)
+        if mask.all():
+            return df
+        self.removed_rows += int(len(mask) - mask.sum())
+        return df[mask]
+
+    def mask(self, df):
+        """
+        计算每行是否满足条件
+
+        Returns:
+            numpy.ndarray: 布尔数组
+        """
+        missing = [c['column'] for c in self.conditions if c['column'] not in df.columns]
+        if missing:
+            raise ValueError(f"筛选列不存在：{', '.join(map(str, missing))}")
+
+        masks = [self._condition_mask(df[c['column']], c['op'], c.get('value')) for c in self.conditions]
+        if self.combine == "and":
+            return np.logical_and.reduce(masks)
+        return np.logical_or.reduce(masks)
+
+    def _condition_mask(self, series, op, value):
+        """单个条件的布尔数组，空值不满足除 empty 以外的任何条件"""
+        if op == 'empty':
+            return self._is_empty(series)
+        if op == 'not_empty':
+            return ~self._is_empty(series)
+        if op == 'period':
+            start, end = self.period_range(value)
+            dates = pd.to_datetime(series, errors="coerce")
+            return ((dates >= start) & (dates < end)).to_numpy(dtype=bool)
+        if op == 'contains':
+            text = self._as_text(series)
+            return text.str.contains(str(value), regex=False).fillna(False).to_numpy(dtype=bool)
+        if op in ('in', 'not_in'):
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            column, values = self._coerce(series, list(values))
+            result = column.isin(values).to_numpy(dtype=bool)
+            if op == 'not_in':
+                # 数字列中夹杂的文本（如"N/A"）不等于任何数字
+                result = ~result & series.notna().to_numpy(dtype=bool)
+            return result
+
+        column, (value,) = self._coerce(series, [value])
+        if value is None or pd.isna(value):
+            return np.zeros(len(series), dtype=bool)
+        compare = {
+            '==': column.__eq__, '!=': column.__ne__,
+            '>': column.__gt__, '>=': column.__ge__,
+            '<': column.__lt__, '<=': column.__le__,
+        }[op]
+        present = series.notna() if op == '!=' else column.notna()
+        return (compare(value) & present).fillna(False).to_numpy(dtype=bool)
+
+    @staticmethod
+    def _is_empty(series):
+        """空值或空白文本"""
+        text = series.astype(object).where(series.notna(), None)
+        return text.map(lambda v: v is None or (isinstance(v, str) and not v.strip())).to_numpy(dtype=bool)
+
+    @staticmethod
+    def _as_text(series):
+        """转换为文本，空值保持为空"""
+        return series.map(lambda v: None if pd.isna(v) else str(v).strip()).astype("string")
+
+    def _coerce(self, series, values):
+        """
+        把列和比较值转换为同一种类型
+
+        Excel读取的数据多为object类型：数字列（可能夹杂文本）按数值比较，日期列按日期比较，其余按文本比较
+        """
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind in NUMERIC_KINDS or kind == 'mixed-integer':
+            numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+            if numbers.notna().all():
+                return pd.to_numeric(series, errors="coerce"), list(numbers)
+        if kind in DATE_KINDS:
+            dates = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+            if dates.notna().all():
+                return pd.to_datetime(series, errors="coerce"), list(dates)
+        return self._as_text(series), [None if v is None else str(v).strip() for v in values]
+
+    @staticmethod
+    def period_range(period, today=None):
+        """
+        日期期间的起止时间
+
+        Returns:
+            tuple: (开始时间, 结束时间)，包含开始时间，不包含结束时间
+        """
+        today = pd.Timestamp(today or datetime.date.today()).normalize()
+        if period == 'today':
+            return today, today + pd.Timedelta(days=1)
+        if period == 'this_week':
+            start = today - pd.Timedelta(days=today.weekday())
+            return start, start + pd.Timedelta(days=7)
+        if period == 'this_month':
+            start = today.replace(day=1)
+            return start, start + pd.DateOffset(months=1)
+        if period == 'last_month':
+            end = today.replace(day=1)
+            return end - pd.DateOffset(months=1), end
+        if period == 'this_year':
+            start = today.replace(month=1, day=1)
+            return start, start + pd.DateOffset(years=1)
+        raise ValueError(f"不支持的日期期间：{period}")
@@ -0,0 +1,186 @@
+"""
+排序模块
+按用户指定的多个列对合并结果排序，数据量超出内存预算时使用外部归并排序
+"""
+import numpy as np
+import pandas as pd
+
+from .spill import NUMERIC_KINDS, SpillStore
+
+# 内部使用的行序号列，作为最后一个排序键保证排序稳定
+SEQ_COLUMN = '__sort_seq__'
+
+# 可以直接比较大小的数据类型，其余类型（如数字与文本混合）按文本排序
+NATIVE_KINDS = NUMERIC_KINDS | {
+    'string', 'boolean', 'datetime64', 'datetime', 'date', 'timedelta64', 'timedelta'
+}
+
+
+class ExternalSorter:
+    def __init__(self, keys, memory_limit_mb=1024, spill_dir=None, merge_chunk_rows=10000):
+        """
+        初始化排序器
+
+        Args:
+            keys: 排序键列表 [{'column': 列名, 'ascending': 是否升序}]
+            memory_limit_mb: 内存预算，超过预算的数据切分为多个有序段暂存到磁盘
+            spill_dir: 有序段暂存目录的上级目录，None表示系统临时目录
+            merge_chunk_rows: 归并时每个有序段每次读入的行数
+        """
+        if not keys:
+            raise ValueError("排序时必须指定排序列")
+        self.columns = [key['column'] for key in keys]
+        self.ascending = [bool(key.get('ascending', True)) for key in keys]
+        self.run_bytes = memory_limit_mb * 1024 * 1024 / 4
+        self.spill_dir = spill_dir
+        self.merge_chunk_rows = merge_chunk_rows
+        self.text_columns = set()
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建排序器，未设置排序列时返回None"""
+        keys = merge_config.get('sort_keys')
+        if not keys:
+            return None
+        return cls(
+            keys=keys,
+            memory_limit_mb=float(merge_config.get('memory_budget_mb') or 1024),
+            spill_dir=merge_config.get('spill_dir') or None
+        )
+
+    def check_columns(self, columns):
+        """检查排序列是否存在"""
+        missing = [col for col in self.columns if col not in columns]
+        if missing:
+            raise ValueError(f"排序列不存在：{', '.join(map(str, missing))}")
+
+    def set_kinds(self, kind_sets):
+        """
+        根据各排序列在全部数据中的类型集合，确定需要按文本比较的列
+
+        排序开始前必须确定，否则先后生成的有序段比较规则不一致
+        """
+        self.text_columns = set()
+        for col in self.columns:
+            kinds = kind_sets.get(col, set())
+            if len(kinds) > 1 and kinds <= NUMERIC_KINDS:
+                continue
+            if len(kinds) > 1 or (kinds and not kinds <= NATIVE_KINDS):
+                self.text_columns.add(col)
+
+    def sort(self, df):
+        """在内存中排序"""
+        self.check_columns(df.columns)
+        self.set_kinds({col: self._kinds(df[col]) for col in self.columns})
+        df = df.assign(**{SEQ_COLUMN: np.arange(len(df))})
+        return self._sort_frame(df).drop(columns=SEQ_COLUMN).reset_index(drop=True)
+
+    def iter_sorted(self, chunks, columns, kind_sets):
+        """
+        对数据流排序
+
+        数据依次读入内存，累计超过内存预算的1/4时排序后作为一个有序段暂存到磁盘；
+        全部数据都在预算内时直接在内存中排序。最后对所有有序段做多路归并，
+        任何时候内存中只有每个有序段的一小块。
+
+        Args:
+            chunks: 可迭代的数据块
+            columns: 数据块的列
+            kind_sets: {列名: 该列在全部数据中出现过的类型集合}
+
+        Yields:
+            DataFrame: 按排序键排列的数据块
+        """
+        self.check_columns(columns)
+        self.set_kinds(kind_sets)
+        store = None
+        try:
+            buffer = []
+            buffer_bytes = 0
+            runs = []
+            seq = 0
+            for chunk in chunks:
+                if not len(chunk):
+                    continue
+                chunk = chunk.assign(**{SEQ_COLUMN: np.arange(seq, seq + len(chunk))})
+                seq += len(chunk)
+                buffer.append(chunk)
+                buffer_bytes += int(chunk.memory_usage(deep=True).sum())
+                if buffer_bytes > self.run_bytes:
+                    if store is None:
+                        store = SpillStore(self.spill_dir, chunk_rows=self.merge_chunk_rows)
+                    runs.append(len(runs))
+                    store.add(runs[-1], self._sort_frame(pd.concat(buffer, ignore_index=True)))
+                    buffer = []
+                    buffer_bytes = 0
+
+            if not runs:
+                if buffer:
+                    yield self._sort_frame(pd.concat(buffer, ignore_index=True)).drop(columns=SEQ_COLUMN)
+                return
+            if buffer:
+                runs.append(len(runs))
+                store.add(runs[-1], self._sort_frame(pd.concat(buffer, ignore_index=True)))
+                buffer = []
+            for chunk in self._merge_runs(store, runs):
+                yield chunk.drop(columns=SEQ_COLUMN)
+        finally:
+            if store is not None:
+                store.close()
+
+    def _merge_runs(self, store, runs):
+        """
+        多路归并有序段
+
+        记录每个有序段已读入部分的最后一行，其中最小的一行之前（含）的所有已读入行都可以输出：
+        各有序段尚未读入的行都不小于该段已读入的最后一行，因而不小于这一行。
+        序号列使所有行互不相等，归并结果与一次性稳定排序完全相同。
+        """
+        readers = {run: store.iter_chunks(run) for run in runs}
+        pending = []
+        last_rows = {}
+
+        def load(run):
+            chunk = next(readers[run], None)
+            if chunk is None:
+                last_rows.pop(run, None)
+            else:
+                pending.append(chunk)
+                last_rows[run] = chunk.iloc[[-1]].set_axis([run])
+
+        for run in runs:
+            load(run)
+        while last_rows:
+            frontier = self._sort_frame(pd.concat(list(last_rows.values()))).index[0]
+            frontier_seq = last_rows[frontier][SEQ_COLUMN].iloc[0]
+            combined = self._sort_frame(pd.concat(pending, ignore_index=True))
+            pos = int(np.flatnonzero(combined[SEQ_COLUMN].to_numpy() == frontier_seq)[0]) + 1
+            yield combined.iloc[:pos]
+            pending[:] = [combined.iloc[pos:]]
+            load(frontier)
+        if pending:
+            rest = self._sort_frame(pd.concat(pending, ignore_index=True))
+            if len(rest):
+                yield rest
+
+    def _sort_frame(self, df):
+        """按排序键和序号列排序，空值排在最后"""
+        return df.sort_values(
+            by=self.columns + [SEQ_COLUMN],
+            ascending=self.ascending + [True],
+            kind="stable",
+            na_position="last",
+            key=self._sort_key
+        )
+
+    def _sort_key(self, series):
+        """按文本比较的列转换为字符串，空值保持为空"""
+        if series.name in self.text_columns:
+            return series.map(lambda v: None if pd.isna(v) else str(v)).astype("string")
+        return series
+
+    @staticmethod
+    def _kinds(series):
+        """单列的类型集合"""
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        return set() if kind == 'empty' else {kind}
@@ -0,0 +1,158 @@
+"""
+磁盘暂存模块
+数据量超过内存预算时，把解析后的数据分块暂存到本地临时目录，之后再逐块流式读出
+"""
+import os
+import pickle
+import shutil
+import tempfile
+
+import pandas as pd
+
+# 可以互相提升为浮点数的数据类型
+NUMERIC_KINDS = {'integer', 'floating', 'mixed-integer-float', 'decimal'}
+
+
+def resolve_kind(kinds):
+    """把一列在多个数据块中的类型集合归并为一个类型"""
+    if not kinds:
+        return 'empty'
+    if len(kinds) == 1:
+        return next(iter(kinds))
+    return 'floating' if kinds <= NUMERIC_KINDS else 'string'
+
+
+def frame_kinds(df):
+    """计算单个数据框各列的数据类型"""
+    kinds = {}
+    for col in df.columns:
+        kind = pd.api.types.infer_dtype(df[col], skipna=True)
+        kinds[col] = set() if kind == 'empty' else {kind}
+    return {col: resolve_kind(col_kinds) for col, col_kinds in kinds.items()}
+
+
+class SpillStore:
+    def __init__(self, spill_dir=None, chunk_rows=50000):
+        """
+        初始化磁盘暂存区
+
+        数据块以pickle格式保存，能够原样保留Excel中常见的混合类型列（如数字列中夹杂"N/A"），
+        读回后写入xlsx时不会把数字变成文本。
+
+        Args:
+            spill_dir: 暂存目录的上级目录，None表示系统临时目录
+            chunk_rows: 每个数据块的最大行数
+        """
+        self.chunk_rows = chunk_rows
+        self.root = tempfile.mkdtemp(prefix="excel_merger_spill_", dir=spill_dir)
+        self.tables = {}  # {表名: {'chunks': [路径], 'rows': 行数, 'columns': [列名], 'kinds': {列名: {类型}}}}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, table, df, measure_width=False):
+        """
+        把数据框追加到指定表
+
+        Args:
+            table: 表名（通常为输入文件路径）
+            df: 要暂存的数据框
+            measure_width: 是否记录各列文本的最大长度（流式写出时用于预先设置列宽）
+        """
+        if table not in self.tables:
+            self.tables[table] = {'id': len(self.tables), 'chunks': [], 'rows': 0, 'columns': [], 'kinds': {}, 'widths': {}}
+        info = self.tables[table]
+        for col in df.columns:
+            if col not in info['columns']:
+                info['columns'].append(col)
+
+        for start in range(0, len(df), self.chunk_rows):
+            chunk = df.iloc[start:start + self.chunk_rows]
+            for col in chunk.columns:
+                kind = pd.api.types.infer_dtype(chunk[col], skipna=True)
+                if kind != 'empty':
+                    info['kinds'].setdefault(col, set()).add(kind)
+                if measure_width:
+                    lengths = chunk[col].dropna().astype(str).str.len()
+                    width = int(lengths.max()) if len(lengths) else 0
+                    info['widths'][col] = max(info['widths'].get(col, 0), width)
+            path = os.path.join(self.root, f"{info['id']}_{len(info['chunks'])}.pkl")
+            with open(path, 'wb') as f:
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+            info['chunks'].append(path)
+            info['rows'] += len(chunk)
+
+    def iter_chunks(self, table, columns=None, reverse=False):
+        """
+        逐块读出表中的数据
+
+        Args:
+            table: 表名
+            columns: 输出的列及顺序，缺少的列补空值；None表示保持原样
+            reverse: 是否从最后一块开始读
+        """
+        chunks = self.tables[table]['chunks']
+        for path in (reversed(chunks) if reverse else chunks):
+            with open(path, 'rb') as f:
+                chunk = pickle.load(f)
+            if columns is not None:
+                chunk = chunk.reindex(columns=columns)
+            yield chunk
+
+    def row_count(self, table=None):
+        """表的行数，table为None时返回所有表的总行数"""
+        if table is not None:
+            return self.tables[table]['rows']
+        return sum(info['rows'] for info in self.tables.values())
+
+    def columns(self, table):
+        """表中出现过的所有列"""
+        return list(self.tables[table]['columns'])
+
+    def column_widths(self, tables, columns):
+        """
+        按 ExcelStyleManager._adjust_column_width 的规则计算列宽
+
+        Returns:
+            dict: {列号(1-based): 宽度}
+        """
+        widths = {}
+        for idx, col in enumerate(columns, 1):
+            max_length = len(str(col))
+            for table in tables:
+                max_length = max(max_length, self.tables[table]['widths'].get(col, 0))
+            widths[idx] = max_length + 2
+        return widths
+
+    def column_kind_sets(self, tables=None):
+        """
+        各列在所有数据块中出现过的数据类型（pandas infer_dtype 的结果）
+
+        Returns:
+            dict: {列名: {类型}}
+        """
+        kinds = {}
+        for table in (tables or self.tables):
+            info = self.tables[table]
+            for col in info['columns']:
+                kinds.setdefault(col, set()).update(info['kinds'].get(col, set()))
+        return kinds
+
+    def column_kinds(self, tables=None):
+        """
+        汇总各列在所有数据块中的数据类型
+
+        Returns:
+            dict: {列名: 类型}，数字类型混用时为 'floating'，其余类型不一致的列为 'string'，全部为空值的列为 'empty'
+        """
+        return {col: resolve_kind(col_kinds) for col, col_kinds in self.column_kind_sets(tables).items()}
+
+    def close(self):
+        """删除所有暂存文件"""
+        if self.root:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root = None
+            self.tables = {}
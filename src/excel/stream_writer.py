@@ -0,0 +1,104 @@
+"""
+流式xlsx写出模块
+使用openpyxl的write_only模式逐块写出数据，内存占用与数据总量无关
+"""
+import os
+from copy import copy
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+from .style_manager import ExcelStyleManager
+
+
+class StreamingWorkbookWriter:
+    def __init__(self, output_file):
+        """
+        初始化流式写出器
+
+        Args:
+            output_file: 输出文件路径
+        """
+        self.output_file = output_file
+        self.workbook = Workbook(write_only=True)
+
+    def write_sheet(self, sheet_name, columns, chunks, header_styles=None, data_styles=None, column_widths=None):
+        """
+        写出一个sheet
+
+        Args:
+            sheet_name: sheet名称
+            columns: 列名列表（作为表头写在第一行）
+            chunks: 可迭代的数据块，每块的列与columns一致
+            header_styles: 表头样式 {列号(1-based): 样式字典}
+            data_styles: 数据样式 {列号(1-based): 样式字典}
+            column_widths: 列宽 {列号(1-based): 宽度}，必须在写入数据前设置
+
+        Returns:
+            int: 写出的数据行数
+        """
+        sheet = self.workbook.create_sheet(title=sheet_name)
+        for col, width in (column_widths or {}).items():
+            sheet.column_dimensions[get_column_letter(col)].width = width
+
+        header = []
+        for col, name in enumerate(columns, 1):
+            cell = WriteOnlyCell(sheet, value=name)
+            if header_styles and col in header_styles:
+                self._apply_style(cell, header_styles[col])
+            header.append(cell)
+        sheet.append(header)
+
+        # 每列的样式只登记一次，列宽设置带上该列样式，单元格直接复制样式索引
+        styled_cols = []
+        for i in range(len(columns)):
+            if data_styles and i + 1 in data_styles:
+                prototype = WriteOnlyCell(sheet)
+                self._apply_style(prototype, data_styles[i + 1])
+                sheet.column_dimensions[get_column_letter(i + 1)]._style = copy(prototype._style)
+                styled_cols.append((i, prototype._style, data_styles[i + 1]))
+                
+        rows = 0
+        for chunk in chunks:
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                if styled_cols:
+                    row = list(row)
+                    for i, array, style in styled_cols:
+                        cell = WriteOnlyCell(sheet, value=row[i])
+                        cell._style = ExcelStyleManager.cell_style_array(array, style, cell)
+                        row[i] = cell
+                sheet.append(row)
+            rows += len(chunk)
+            
+        if data_styles:
+            ExcelStyleManager.apply_banding(sheet, data_styles, 2, rows + 1)
+        return rows
+
+    def save(self):
+        """保存文件"""
+        self.workbook.save(self.output_file)
+
+    def discard(self):
+        """放弃写出：结束各sheet的数据流并删除其临时文件，不生成输出文件"""
+        for sheet in self.workbook.worksheets:
+            if not sheet.closed:
+                sheet.close()
+            if sheet._writer is not None and isinstance(sheet._writer.out, str) and os.path.exists(sheet._writer.out):
+                os.remove(sheet._writer.out)
+
+    @staticmethod
+    def _apply_style(cell, style):
+        """
+        应用样式模板，与 ExcelStyleManager._apply_cell_style 的规则一致
+
+        模板中的样式对象已是副本，这里直接共用，避免为每个单元格再复制一次
+        """
+        if isinstance(style.get('value'), (int, float)):
+            cell.number_format = style['number_format']
+        cell.font = style['font']
+        cell.fill = style['fill']
+        cell.border = style['border']
+        cell.alignment = style['alignment']
+        cell.protection = style['protection']
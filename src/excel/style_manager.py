@@ -2,9 +2,15 @@
 Excel样式管理模块
 处理Excel文件样式的保存和应用
 """
+from openpyxl.cell import Cell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.merge import MergedCellRange
 from copy import copy
 
+from .merged_ranges import RangeIndex
+
 class ExcelStyleManager:
     def __init__(self):
         """初始化样式管理器"""
@@ -60,6 +66,12 @@ class ExcelStyleManager:
                         'protection': copy(cell.protection),
                         'value': cell.value,  # 保存原始值，用于判断数据类型
                     }
+                    
+                    # 第二个数据行的填充与第一行不同时视为隔行底纹
+                    if data_row_num + 1 <= sheet.max_row:
+                        band_fill = sheet[f"{col_letter}{data_row_num + 1}"].fill
+                        if band_fill != cell.fill:
+                            data_styles[col]['band_fill'] = copy(band_fill)
             
             return header_styles, data_styles, merged_cells
             
@@ -67,7 +79,8 @@ class ExcelStyleManager:
             print(f"获取样式时出错: {str(e)}")
             return None, None, None
             
-    def apply_column_styles(self, workbook, sheet_name, header_styles, data_styles, merge_config, merged_cells=None):
+    def apply_column_styles(self, workbook, sheet_name, header_styles, data_styles, merge_config, merged_cells=None,
+                            blocks=None):
         """
         应用列样式到指定sheet
         
@@ -78,19 +91,22 @@ class ExcelStyleManager:
             data_styles: 数据样式字典
             merge_config: 合并配置
             merged_cells: 合并单元格信息
+            blocks: 数据区域中依次堆叠的各来源数据块的行数，None表示整个数据区域为一块，
+                空列表表示行顺序已打乱（如排序后），不重建数据区域的合并单元格
         """
         try:
             sheet = workbook[sheet_name]
             
             if merge_config['keep_styles']:
+                header_row = int(merge_config['header_row'])
+                
                 # 应用合并单元格
                 if merged_cells:
-                    for merged_range in merged_cells:
-                        # 调整合并范围以适应新的位置
-                        sheet.merge_cells(str(merged_range))
+                    if blocks is None:
+                        blocks = [max(sheet.max_row - header_row, 0)]
+                    self.apply_merged_cells(sheet, merged_cells, header_row, blocks)
                 
                 # 应用表头样式
-                header_row = int(merge_config['header_row'])
                 for col in range(1, sheet.max_column + 1):
                     if col in header_styles:
                         col_letter = get_column_letter(col)
@@ -98,12 +114,15 @@ class ExcelStyleManager:
                         self._apply_cell_style(cell, header_styles[col])
                 
                 # 应用数据区域样式
-                for row in range(header_row + 1, sheet.max_row + 1):
-                    for col in range(1, sheet.max_column + 1):
-                        if col in data_styles:
-                            col_letter = get_column_letter(col)
-                            cell = sheet[f"{col_letter}{row}"]
-                            self._apply_cell_style(cell, data_styles[col])
+                if merge_config.get('style_mode', "column") == "column":
+                    self._apply_column_level_styles(sheet, data_styles, header_row)
+                else:
+                    for row in range(header_row + 1, sheet.max_row + 1):
+                        for col in range(1, sheet.max_column + 1):
+                            if col in data_styles:
+                                col_letter = get_column_letter(col)
+                                cell = sheet[f"{col_letter}{row}"]
+                                self._apply_cell_style(cell, data_styles[col])
                 
                 # 调整列宽
                 self._adjust_column_width(sheet)
@@ -112,6 +131,133 @@ class ExcelStyleManager:
             print(f"应用样式时出错: {str(e)}")
             raise
             
+    def plan_merged_cells(self, merged_cells, header_row, blocks, index=None):
+        """
+        计算输出sheet中的合并单元格区域
+        
+        表头区域（结束行不超过表头行）的合并单元格保持原位置；数据区域的合并单元格按相对于数据首行的位置，
+        在每个来源数据块中重复一次，超出数据块的部分跳过。与已有区域重叠的区域跳过。
+        
+        Args:
+            merged_cells: 模板中的合并单元格区域
+            header_row: 表头行号（1-based）
+            blocks: 各来源数据块的行数
+            index: 已有区域的RangeIndex
+            
+        Returns:
+            list: [(min_row, min_col, max_row, max_col)]
+        """
+        index = index or RangeIndex()
+        header_ranges = []
+        data_patterns = []
+        for merged_range in merged_cells:
+            bounds = (merged_range.min_row, merged_range.min_col, merged_range.max_row, merged_range.max_col)
+            if merged_range.min_row <= header_row:
+                header_ranges.append(bounds)
+            else:
+                data_patterns.append(bounds)
+        data_patterns.sort()
+        
+        planned = []
+        for bounds in header_ranges:
+            if index.try_add(*bounds):
+                planned.append(bounds)
+                
+        block_start = header_row + 1
+        for block_rows in blocks:
+            for min_row, min_col, max_row, max_col in data_patterns:
+                offset = min_row - (header_row + 1)
+                height = max_row - min_row
+                if offset + height >= block_rows:
+                    continue
+                bounds = (block_start + offset, min_col, block_start + offset + height, max_col)
+                if index.try_add(*bounds):
+                    planned.append(bounds)
+            block_start += block_rows
+        return planned
+        
+    def apply_merged_cells(self, sheet, merged_cells, header_row, blocks):
+        """
+        在sheet中重建合并单元格
+        
+        重叠检查由RangeIndex完成，这里直接登记区域，不再使用 sheet.merge_cells
+        （其重复检查需要与所有已有区域逐个比较，区域数量多时为平方复杂度）
+        """
+        index = RangeIndex()
+        for existing in sheet.merged_cells.ranges:
+            index.add(existing.min_row, existing.min_col, existing.max_row, existing.max_col)
+            
+        for min_row, min_col, max_row, max_col in self.plan_merged_cells(merged_cells, header_row, blocks, index):
+            merged_range = MergedCellRange(sheet, f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}")
+            sheet.merged_cells.ranges.add(merged_range)
+            sheet._clean_merge_range(merged_range)
+            
+    def style_array(self, sheet, style):
+        """
+        把样式模板登记到sheet所属工作簿的样式表中，返回对应的样式索引数组
+        
+        同一列的所有单元格共用这一组索引，之后每个单元格只需复制9个整数，不再逐个查找字体、填充等样式对象
+        """
+        cell = Cell(sheet)
+        self._apply_cell_style(cell, style)
+        return cell._style
+        
+    def _apply_column_level_styles(self, sheet, data_styles, header_row):
+        """
+        按列应用数据区域样式
+        
+        每列只登记一次样式：列宽设置（<col>）带上该列的样式，数据单元格直接使用同一个样式索引；
+        隔行底纹用一条条件格式覆盖整个数据区域，而不是逐行设置填充。
+        没有写入值的单元格不会被创建，显示时直接使用列样式
+        """
+        first_row, last_row = header_row + 1, sheet.max_row
+        arrays = {}
+        for col, style in data_styles.items():
+            arrays[col] = self.style_array(sheet, style)
+            sheet.column_dimensions[get_column_letter(col)]._style = copy(arrays[col])
+            
+        for (row, col), cell in sheet._cells.items():
+            if row >= first_row and col in arrays:
+                cell._style = self.cell_style_array(arrays[col], data_styles[col], cell)
+        self.apply_banding(sheet, data_styles, first_row, last_row)
+        
+    @staticmethod
+    def cell_style_array(array, style, cell):
+        """
+        单元格使用的样式索引数组（副本）
+        
+        与 _apply_cell_style 的规则一致：模板原始值为数字时使用模板的数字格式，
+        否则保留单元格已有的数字格式（如写入日期时设置的日期格式）；没有样式的单元格（如文本）使用常规格式
+        """
+        result = copy(array)
+        if not isinstance(style.get('value'), (int, float)):
+            result.numFmtId = cell._style.numFmtId if cell._style is not None else 0
+        return result
+        
+    @staticmethod
+    def apply_banding(sheet, data_styles, first_row, last_row):
+        """用条件格式重现隔行底纹，相邻且底纹相同的列合并为一条规则"""
+        if last_row <= first_row:
+            return
+        runs = []  # [(起始列, 结束列, 填充)]
+        for col in sorted(data_styles):
+            fill = data_styles[col].get('band_fill')
+            if fill is None:
+                continue
+            if runs and runs[-1][1] == col - 1 and runs[-1][2] == fill:
+                runs[-1] = (runs[-1][0], col, fill)
+            else:
+                runs.append((col, col, fill))
+                
+        for start_col, end_col, fill in runs:
+            # 条件格式中的纯色填充使用背景色
+            color = fill.fgColor if fill.fill_type == "solid" else fill.bgColor
+            band = PatternFill(fill_type=fill.fill_type or "solid", fgColor=copy(color), bgColor=copy(color))
+            cell_range = f"{get_column_letter(start_col)}{first_row}:{get_column_letter(end_col)}{last_row}"
+            sheet.conditional_formatting.add(
+                cell_range, FormulaRule(formula=[f"MOD(ROW()-{first_row},2)=1"], fill=band)
+            )
+            
     def _apply_cell_style(self, cell, style):
         """应用单元格样式"""
         try:
@@ -0,0 +1,146 @@
+"""
+汇总模块
+在数据流经合并过程时增量计算分组汇总（计数、求和、最小值、最大值、平均值），不需要再读一遍合并结果
+"""
+import numpy as np
+import pandas as pd
+
+from .lineage import SOURCE_COLUMN, LINEAGE_COLUMNS
+from .spill import NUMERIC_KINDS
+
+# 内部使用的行数列
+ROWS_COLUMN = '__rows__'
+
+# 统计方式 -> 输出列名后缀
+STAT_LABELS = {
+    'count': '计数',
+    'sum': '求和',
+    'min': '最小值',
+    'max': '最大值',
+    'mean': '平均值',
+}
+
+# 部分结果合并时使用的聚合方式（平均值由求和与计数得出）
+PARTIAL_AGGS = {'count': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'}
+
+
+class GroupSummary:
+    def __init__(self, group_columns=None, value_columns=None, stats=None):
+        """
+        初始化分组汇总
+
+        Args:
+            group_columns: 分组列，默认按数据来源分组
+            value_columns: 统计的数值列，为空时使用所有值均为数字的列
+            stats: 统计方式列表，可选 count/sum/min/max/mean，默认全部
+        """
+        self.group_columns = list(group_columns or [SOURCE_COLUMN])
+        self.value_columns = list(value_columns or [])
+        self.stats = list(stats or STAT_LABELS)
+        unknown = [stat for stat in self.stats if stat not in STAT_LABELS]
+        if unknown:
+            raise ValueError(f"不支持的统计方式：{', '.join(unknown)}")
+        self.state = None  # 各分组的部分结果，列为 (列名, count/sum/min/max)
+        self.seen_columns = []  # 出现过的统计列，保持首次出现的顺序
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建汇总器，未启用汇总时返回None"""
+        if merge_config.get('summary_mode', "none") in (None, "", "none"):
+            return None
+        return cls(
+            group_columns=merge_config.get('summary_groups'),
+            value_columns=merge_config.get('summary_values'),
+            stats=merge_config.get('summary_stats')
+        )
+
+    def update(self, df, source=None):
+        """
+        累加一块数据
+
+        Args:
+            df: 数据块
+            source: 数据块所属的文件名，用于补齐缺少的数据来源列
+        """
+        if not len(df):
+            return
+        if SOURCE_COLUMN in self.group_columns and SOURCE_COLUMN not in df.columns:
+            df = df.assign(**{SOURCE_COLUMN: source})
+        missing = [col for col in self.group_columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"汇总分组列不存在：{', '.join(map(str, missing))}")
+
+        if self.value_columns:
+            values = self.value_columns
+        else:
+            # 之前的数据块中识别出的数值列在之后的数据块中继续统计
+            for col in df.columns:
+                if (col not in self.seen_columns and col not in self.group_columns
+                        and col not in LINEAGE_COLUMNS and self.is_numeric(df[col])):
+                    self.seen_columns.append(col)
+            values = self.seen_columns
+        for col in values:
+            if col not in self.seen_columns:
+                self.seen_columns.append(col)
+
+        # Excel数值列中夹杂的文本（如"N/A"）不参与统计
+        data = df[self.group_columns].copy()
+        for col in values:
+            data[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+        data[ROWS_COLUMN] = 1
+
+        grouped = data.groupby(self.group_columns, dropna=False, sort=False)
+        partial = pd.DataFrame({(ROWS_COLUMN, 'count'): grouped.size()})
+        if values:
+            partial = pd.concat([partial, grouped[values].agg(list(PARTIAL_AGGS))], axis=1)
+
+        if self.state is None:
+            self.state = partial
+            return
+        combined = pd.concat([self.state, partial])
+        aggs = {col: PARTIAL_AGGS[col[1]] for col in combined.columns}
+        levels = list(range(len(self.group_columns)))
+        self.state = combined.groupby(level=levels, dropna=False, sort=False).agg(aggs)
+
+    @staticmethod
+    def is_numeric(series):
+        """
+        判断是否为数值列
+
+        读取的Excel数据多为object类型，按实际取值判断；夹杂少量文本（如"N/A"或重复的表头）的列，
+        多数值为数字时也视为数值列
+        """
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind in NUMERIC_KINDS:
+            return True
+        if kind in ('mixed', 'mixed-integer'):
+            values = series.dropna()
+            return pd.to_numeric(values, errors="coerce").notna().sum() * 2 > len(values)
+        return False
+
+    def result(self):
+        """
+        汇总结果
+
+        Returns:
+            DataFrame: 分组列、行数，以及每个统计列的各项统计值
+        """
+        columns = self.group_columns + ['行数'] + [
+            f"{col}_{STAT_LABELS[stat]}" for col in self.seen_columns for stat in self.stats
+        ]
+        if self.state is None:
+            return pd.DataFrame(columns=columns)
+
+        result = pd.DataFrame(index=self.state.index)
+        result['行数'] = self.state[(ROWS_COLUMN, 'count')].astype("int64")
+        for col in self.seen_columns:
+            for stat in self.stats:
+                if stat == 'mean':
+                    count = self.state[(col, 'count')]
+                    values = self.state[(col, 'sum')] / count.where(count > 0)
+                else:
+                    values = self.state[(col, stat)]
+                    if stat == 'sum':
+                        values = values.where(self.state[(col, 'count')] > 0)
+                result[f"{col}_{STAT_LABELS[stat]}"] = values
+        return result.reset_index()[columns]
@@ -0,0 +1,329 @@
+"""
+xlsx文件包模块
+控制输出文件的压缩级别，保存后重新打包：精简样式表、把血缘列等重复文本改为共享字符串，并统计各部件大小
+"""
+import codecs
+import datetime
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from xml.etree import ElementTree as ET
+
+from openpyxl.writer.excel import ExcelWriter
+
+from .lineage import LINEAGE_COLUMNS
+
+# 压缩方式 -> (zip压缩算法, 压缩级别)，default与openpyxl默认一致
+COMPRESSION_LEVELS = {
+    'default': (zipfile.ZIP_DEFLATED, 6),
+    'fast': (zipfile.ZIP_DEFLATED, 1),
+    'max': (zipfile.ZIP_DEFLATED, 9),
+    'stored': (zipfile.ZIP_STORED, None),
+}
+
+# 改为共享字符串的范围：none: 不改, lineage: 来源Sheet/数据来源列, all: 所有文本
+SHARED_STRING_MODES = ('none', 'lineage', 'all')
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+STYLES_PART = "xl/styles.xml"
+CONTENT_TYPES_PART = "[Content_Types].xml"
+WORKBOOK_RELS_PART = "xl/_rels/workbook.xml.rels"
+SHARED_STRINGS_PART = "xl/sharedStrings.xml"
+SHARED_STRINGS_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+SHARED_STRINGS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+
+# 工作表中引用样式编号的元素：单元格、行和列
+ELEMENT_PATTERN = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)|<row\b([^>]*)>|<col\b([^>]*?)/>', re.S)
+STYLE_ATTR_PATTERN = re.compile(r'(\s(?:s|style)=")(\d+)(")')
+CELL_REF_PATTERN = re.compile(r'\sr="([A-Z]+)(\d+)"')
+INLINE_STRING_PATTERN = re.compile(r'<is><t(?: xml:space="preserve")?>(.*?)</t></is>', re.S)
+
+# 重写工作表时每次读入的字节数
+READ_BLOCK = 4 * 1024 * 1024
+
+
+class XlsxPackager:
+    def __init__(self, compression="default", minimal_styles=False, shared_strings="none", size_report=False):
+        """
+        初始化xlsx打包器
+
+        Args:
+            compression: default: 标准压缩, fast: 快速压缩, max: 最大压缩, stored: 不压缩（适合中间文件）
+            minimal_styles: 是否只保留工作表中用到的样式
+            shared_strings: none/lineage/all，见 SHARED_STRING_MODES
+            size_report: 是否输出各部件大小
+        """
+        if compression not in COMPRESSION_LEVELS:
+            raise ValueError(f"不支持的压缩方式：{compression}")
+        if shared_strings not in SHARED_STRING_MODES:
+            raise ValueError(f"不支持的共享字符串范围：{shared_strings}")
+        self.compression = compression
+        self.minimal_styles = minimal_styles
+        self.shared_strings = shared_strings
+        self.size_report = size_report
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建打包器，全部保持openpyxl默认行为时返回None"""
+        compression = merge_config.get('xlsx_compression') or "default"
+        minimal_styles = bool(merge_config.get('xlsx_minimal_styles', False))
+        shared_strings = merge_config.get('xlsx_shared_strings') or "none"
+        size_report = bool(merge_config.get('xlsx_size_report', False))
+        if compression == "default" and not minimal_styles and shared_strings == "none" and not size_report:
+            return None
+        return cls(compression, minimal_styles, shared_strings, size_report)
+
+    @property
+    def rewrites(self):
+        """保存后是否需要改写文件内容"""
+        return self.minimal_styles or self.shared_strings != "none"
+
+    def attach(self, workbook):
+        """
+        让工作簿保存时不压缩，压缩留到重新打包时一次完成
+
+        pandas.ExcelWriter 退出时调用 workbook.save，这里替换该工作簿实例的保存方法
+        """
+        workbook.save = lambda filename: self.save_stored(workbook, filename)
+
+    @staticmethod
+    def save_stored(workbook, filename):
+        """与 openpyxl 的 save_workbook 相同，但各部件不压缩"""
+        if workbook.write_only and not workbook.worksheets:
+            workbook.create_sheet()
+        archive = zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        workbook.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+        ExcelWriter(workbook, archive).save()
+
+    def finish(self, output_file):
+        """
+        已保存（不压缩）的输出文件按设置重新打包
+
+        Returns:
+            list: 启用部件大小报告时为各部件大小，否则为None
+        """
+        if self.rewrites or self.compression != "stored":
+            self.repack(output_file)
+        if not self.size_report:
+            return None
+        parts = self.part_sizes(output_file)
+        print(self.format_report(output_file, parts))
+        return parts
+
+    def repack(self, output_file):
+        """重新打包：工作表逐块改写，样式表和共享字符串在所有工作表处理完之后写出"""
+        compress_type, level = COMPRESSION_LEVELS[self.compression]
+        fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(os.path.abspath(output_file)))
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(output_file) as zin, \
+                    zipfile.ZipFile(tmp_path, 'w', compress_type, allowZip64=True, compresslevel=level) as zout:
+                names = zin.namelist()
+                styles_xml = zin.read(STYLES_PART) if STYLES_PART in names else None
+                state = {
+                    'style_ids': {0: 0} if self.minimal_styles and styles_xml else None,  # {原样式编号: 新编号}
+                    'style_count': self.count_cell_xfs(styles_xml) if styles_xml else 0,
+                    'strings': {} if self.shared_strings != "none" and SHARED_STRINGS_PART not in names else None,
+                    'string_refs': 0,
+                }
+                deferred = {STYLES_PART, CONTENT_TYPES_PART, WORKBOOK_RELS_PART}
+
+                for name in names:
+                    if name in deferred:
+                        continue
+                    if name.startswith("xl/worksheets/") and name.endswith(".xml") and self.rewrites:
+                        self._rewrite_sheet(zin, zout, name, state)
+                    else:
+                        with zin.open(name) as src, zout.open(name, 'w', force_zip64=True) as dst:
+                            shutil.copyfileobj(src, dst)
+
+                if styles_xml is not None:
+                    if state['style_ids'] is not None:
+                        styles_xml = self.minimize_styles(styles_xml, state['style_ids'])
+                    zout.writestr(STYLES_PART, styles_xml)
+
+                content_types = zin.read(CONTENT_TYPES_PART)
+                rels = zin.read(WORKBOOK_RELS_PART)
+                if state['strings']:
+                    zout.writestr(SHARED_STRINGS_PART, self.shared_strings_xml(state['strings'], state['string_refs']))
+                    content_types = content_types.replace(
+                        b"</Types>",
+                        f'<Override PartName="/{SHARED_STRINGS_PART}" ContentType="{SHARED_STRINGS_TYPE}" /></Types>'.encode()
+                    )
+                    rels = rels.replace(
+                        b"</Relationships>",
+                        f'<Relationship Type="{SHARED_STRINGS_REL}" Target="sharedStrings.xml" '
+                        f'Id="rIdSharedStrings" /></Relationships>'.encode()
+                    )
+                zout.writestr(WORKBOOK_RELS_PART, rels)
+                zout.writestr(CONTENT_TYPES_PART, content_types)
+            os.replace(tmp_path, output_file)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _rewrite_sheet(self, zin, zout, name, state):
+        """
+        逐块改写一个工作表：重新编号样式，把文本单元格改为引用共享字符串
+
+        数据块在行结束处切分，保证每个单元格完整地落在同一块中
+        """
+        style_ids, strings = state['style_ids'], state['strings']
+        lineage_cols = set()  # 表头为血缘列的列标
+
+        def restyle(attrs):
+            if style_ids is None or 's' not in attrs:
+                return attrs
+
+            def renumber(match):
+                old = int(match.group(2))
+                # 样式表中不存在的编号按默认样式处理
+                new = style_ids.setdefault(old, len(style_ids)) if old < state['style_count'] else 0
+                return f"{match.group(1)}{new}{match.group(3)}"
+
+            return STYLE_ATTR_PATTERN.sub(renumber, attrs)
+
+        def replace(match):
+            attrs, content, row_attrs, col_attrs = match.groups()
+            if row_attrs is not None:
+                return f"<row{restyle(row_attrs)}>"
+            if col_attrs is not None:
+                return f"<col{restyle(col_attrs)}/>"
+
+            attrs = restyle(attrs)
+            if content is None:
+                return f"<c{attrs}/>"
+            if strings is not None and 't="inlineStr"' in attrs:
+                text = INLINE_STRING_PATTERN.fullmatch(content)
+                ref = CELL_REF_PATTERN.search(attrs)
+                if text and ref:
+                    col, row = ref.groups()
+                    if row == "1" and text.group(1) in LINEAGE_COLUMNS:
+                        lineage_cols.add(col)
+                    elif self.shared_strings == "all" or col in lineage_cols:
+                        index = strings.setdefault(text.group(1), len(strings))
+                        state['string_refs'] += 1
+                        attrs = attrs.replace('t="inlineStr"', 't="s"')
+                        return f"<c{attrs}><v>{index}</v></c>"
+            return f"<c{attrs}>{content}</c>"
+
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with zin.open(name) as src, zout.open(name, 'w', force_zip64=True) as dst:
+            pending = ""
+            while True:
+                block = src.read(READ_BLOCK)
+                text = pending + decoder.decode(block, final=not block)
+                if block:
+                    cut = text.rfind("</row>")
+                    if cut < 0:
+                        pending = text
+                        continue
+                    cut += len("</row>")
+                    text, pending = text[:cut], text[cut:]
+                dst.write(ELEMENT_PATTERN.sub(replace, text).encode("utf-8"))
+                if not block:
+                    break
+
+    @staticmethod
+    def count_cell_xfs(styles_xml):
+        """样式表中单元格格式（cellXfs）的数量"""
+        cell_xfs = ET.fromstring(styles_xml).find(f"{{{MAIN_NS}}}cellXfs")
+        return 0 if cell_xfs is None else len(cell_xfs)
+
+    @staticmethod
+    def minimize_styles(styles_xml, style_ids):
+        """
+        重建样式表：只保留用到的单元格格式，以及它们和命名样式引用的字体、填充、边框和数字格式
+
+        Args:
+            styles_xml: 原样式表
+            style_ids: {原单元格格式编号: 新编号}
+
+        Returns:
+            bytes: 新样式表
+        """
+        ET.register_namespace('', MAIN_NS)
+        root = ET.fromstring(styles_xml)
+        tag = lambda name: f"{{{MAIN_NS}}}{name}"
+
+        cell_xfs = root.find(tag('cellXfs'))
+        if cell_xfs is None:
+            return styles_xml
+        xfs = list(cell_xfs)
+        for xf in xfs:
+            cell_xfs.remove(xf)
+        for old, _ in sorted(style_ids.items(), key=lambda item: item[1]):
+            cell_xfs.append(xfs[old])
+        cell_xfs.set('count', str(len(cell_xfs)))
+
+        style_xfs = root.find(tag('cellStyleXfs'))
+        referencing = list(cell_xfs) + (list(style_xfs) if style_xfs is not None else [])
+
+        # 第一个字体和边框、前两个填充（none和gray125）是Excel要求保留的
+        for container_name, attr, reserved in (('fonts', 'fontId', 1), ('fills', 'fillId', 2), ('borders', 'borderId', 1)):
+            container = root.find(tag(container_name))
+            if container is None:
+                continue
+            items = list(container)
+            used = set(range(min(reserved, len(items))))
+            used.update(int(xf.get(attr, 0)) for xf in referencing)
+            new_ids = {old: new for new, old in enumerate(sorted(i for i in used if i < len(items)))}
+            for i, item in enumerate(items):
+                if i not in new_ids:
+                    container.remove(item)
+            container.set('count', str(len(new_ids)))
+            for xf in referencing:
+                if xf.get(attr) is not None:
+                    xf.set(attr, str(new_ids.get(int(xf.get(attr)), 0)))
+
+        num_fmts = root.find(tag('numFmts'))
+        if num_fmts is not None:
+            used = {xf.get('numFmtId') for xf in referencing}
+            for fmt in list(num_fmts):
+                if fmt.get('numFmtId') not in used:
+                    num_fmts.remove(fmt)
+            if len(num_fmts):
+                num_fmts.set('count', str(len(num_fmts)))
+            else:
+                root.remove(num_fmts)
+
+        return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+    @staticmethod
+    def shared_strings_xml(strings, refs):
+        """
+        共享字符串表
+
+        Args:
+            strings: {已转义的文本: 编号}，按编号顺序插入
+            refs: 引用次数
+        """
+        items = "".join(f'<si><t xml:space="preserve">{text}</t></si>' for text in strings)
+        return (f'<?xml version="1.0" encoding="UTF-8"?>'
+                f'<sst xmlns="{MAIN_NS}" count="{refs}" uniqueCount="{len(strings)}">{items}</sst>')
+
+    @staticmethod
+    def part_sizes(output_file):
+        """
+        xlsx各部件的大小
+
+        Returns:
+            list: [{'part': 部件名, 'size': 原始字节数, 'compressed': 压缩后字节数}]，按压缩后大小从大到小排列
+        """
+        with zipfile.ZipFile(output_file) as archive:
+            parts = [
+                {'part': info.filename, 'size': info.file_size, 'compressed': info.compress_size}
+                for info in archive.infolist()
+            ]
+        return sorted(parts, key=lambda part: part['compressed'], reverse=True)
+
+    @staticmethod
+    def format_report(output_file, parts):
+        """部件大小报告文本"""
+        total = sum(part['compressed'] for part in parts)
+        lines = [f"{os.path.basename(output_file)} 共 {total / 1024:.1f} KB："]
+        for part in parts:
+            lines.append(f"  {part['part']}: {part['size'] / 1024:.1f} KB -> {part['compressed'] / 1024:.1f} KB")
+        return "\n".join(lines)
@@ -27,6 +27,13 @@ class ExcelStyle(ctk.CTkFrame):
         option_frame.pack(fill=tk.X, padx=5, pady=2)
         ctk.CTkCheckBox(option_frame, text="保留Excel原有样式", variable=self.app.merge_config.keep_styles,
                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=20)
+        
+        mode_frame = ctk.CTkFrame(style_frame)
+        mode_frame.pack(fill=tk.X, padx=5, pady=2)
+        ctk.CTkLabel(mode_frame, text="样式写入方式：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=20)
+        for text, value in (("按列（快）", "column"), ("逐个单元格", "cell")):
+            ctk.CTkRadioButton(mode_frame, text=text, variable=self.app.merge_config.style_mode,
+                           value=value, **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=10)
             
         # 添加说明文本
         note_frame = ctk.CTkFrame(self)
@@ -36,7 +43,8 @@ class ExcelStyle(ctk.CTkFrame):
             "样式设置说明：",
             "1. 勾选'保留Excel原有样式'将完整保留原Excel文件的所有样式设置",
             "2. 包括：字体、颜色、边框、对齐方式、数字格式等",
-            "3. 不勾选则只保留原始数据，不保留任何样式"
+            "3. 不勾选则只保留原始数据，不保留任何样式",
+            "4. 按列写入时每列只注册一个样式，隔行底纹用条件格式实现，大文件明显更快"
         ]
         
         for note in notes:
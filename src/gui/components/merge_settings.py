@@ -34,6 +34,9 @@ class MergeSettings(ctk.CTkFrame):
         ctk.CTkRadioButton(merge_mode_frame, text="每个文件单独一个Sheet", variable=self.app.merge_config.merge_mode, 
                        value="multiple", command=self.app.file_handler.on_merge_mode_change,
                        **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=20)
+        ctk.CTkRadioButton(merge_mode_frame, text="按关键列横向合并", variable=self.app.merge_config.merge_mode, 
+                       value="join", command=self.app.file_handler.on_merge_mode_change,
+                       **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=20)
         
         # Sheet名称设置（只在单sheet模式下显示）
         self.single_sheet_frame = ctk.CTkFrame(merge_settings_frame)
@@ -54,6 +57,16 @@ class MergeSettings(ctk.CTkFrame):
                        value="custom", command=self.app.file_handler.on_sheet_name_mode_change,
                        **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=20)
         
+        # 横向合并模式下的设置
+        self.join_frame = ctk.CTkFrame(merge_settings_frame)
+        ctk.CTkLabel(self.join_frame, text="关键列：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(self.join_frame, textvariable=self.app.merge_config.join_keys,
+                    width=200, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(self.join_frame, text="连接方式：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        for text, value in (("内连接", "inner"), ("左连接", "left"), ("全连接", "outer")):
+            ctk.CTkRadioButton(self.join_frame, text=text, variable=self.app.merge_config.join_how,
+                           value=value, **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=10)
+        
         # 数据区间选择
         range_frame = ctk.CTkFrame(self)
         range_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -84,6 +97,16 @@ class MergeSettings(ctk.CTkFrame):
                     width=100, **self.app.style_config.entry_style)
         self.entries['end_col'].pack(side=tk.LEFT, padx=5)
         
+        # 按表头名称选择列
+        select_col_frame = ctk.CTkFrame(range_frame)
+        select_col_frame.pack(fill=tk.X, padx=5, pady=5)
+        ctk.CTkLabel(select_col_frame, text="选择列：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(select_col_frame, textvariable=self.app.merge_config.select_columns,
+                    width=300, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        for text, value in (("按填写顺序", "list"), ("按文件顺序", "file")):
+            ctk.CTkRadioButton(select_col_frame, text=text, variable=self.app.merge_config.select_columns_order,
+                           value=value, **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=10)
+        
         ctk.CTkLabel(range_frame, text="注：列请使用Excel列标（如：A、B、C...）", **self.app.style_config.label_style).pack(padx=5, pady=5)
         
         # 表头设置
@@ -101,6 +124,119 @@ class MergeSettings(ctk.CTkFrame):
         ctk.CTkCheckBox(header_settings, text="保留表头", variable=self.app.merge_config.keep_header,
                        **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=20) 
         
+        # 读取引擎设置
+        engine_frame = ctk.CTkFrame(self)
+        engine_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(engine_frame, text="读取引擎：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkOptionMenu(engine_frame, values=["auto", "calamine", "openpyxl", "pyxlsb", "xlrd"],
+                         variable=self.app.merge_config.reader_engine, width=150,
+                         **self.app.style_config.combobox_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(engine_frame, text="（auto：按文件格式自动选择，只读取数据时优先使用calamine）",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        
+        # 附加输出格式
+        output_format_frame = ctk.CTkFrame(self)
+        output_format_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(output_format_frame, text="附加输出：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkCheckBox(output_format_frame, text="Parquet", variable=self.app.merge_config.output_parquet,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkOptionMenu(output_format_frame, values=["zstd", "snappy", "gzip", "none"],
+                         variable=self.app.merge_config.parquet_compression, width=100,
+                         **self.app.style_config.combobox_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkCheckBox(output_format_frame, text="Feather", variable=self.app.merge_config.output_feather,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkCheckBox(output_format_frame, text="CSV", variable=self.app.merge_config.output_csv,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        
+        # xlsx文件包设置
+        package_frame = ctk.CTkFrame(self)
+        package_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(package_frame, text="xlsx压缩：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkOptionMenu(package_frame, values=["default", "fast", "max", "stored"],
+                         variable=self.app.merge_config.xlsx_compression, width=100,
+                         **self.app.style_config.combobox_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(package_frame, text="共享字符串：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkOptionMenu(package_frame, values=["lineage", "all", "none"],
+                         variable=self.app.merge_config.xlsx_shared_strings, width=100,
+                         **self.app.style_config.combobox_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkCheckBox(package_frame, text="精简样式表", variable=self.app.merge_config.xlsx_minimal_styles,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkCheckBox(package_frame, text="部件大小报告", variable=self.app.merge_config.xlsx_size_report,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        
+        # 输出发布设置
+        publish_frame = ctk.CTkFrame(self)
+        publish_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkCheckBox(publish_frame, text="本地暂存后发布", variable=self.app.merge_config.stage_output,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkCheckBox(publish_frame, text="更新latest副本", variable=self.app.merge_config.latest_alias,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkLabel(publish_frame, text="（先写到本地临时目录，完成后一次复制到输出目录，不会读到写了一半的文件）",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        
+        # 去重设置
+        dedup_frame = ctk.CTkFrame(self)
+        dedup_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(dedup_frame, text="去重：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        for text, value in (("不去重", "none"), ("整行去重", "row"), ("按关键列去重", "key")):
+            ctk.CTkRadioButton(dedup_frame, text=text, variable=self.app.merge_config.dedup_mode,
+                           value=value, **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkLabel(dedup_frame, text="关键列：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(dedup_frame, textvariable=self.app.merge_config.dedup_keys,
+                    width=150, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkOptionMenu(dedup_frame, values=["first", "last"], variable=self.app.merge_config.dedup_keep,
+                         width=80, **self.app.style_config.combobox_style).pack(side=tk.LEFT, padx=5)
+        
+        # 筛选设置
+        filter_frame = ctk.CTkFrame(self)
+        filter_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(filter_frame, text="筛选条件：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(filter_frame, textvariable=self.app.merge_config.filters,
+                    width=300, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkOptionMenu(filter_frame, values=["and", "or"], variable=self.app.merge_config.filter_combine,
+                         width=80, **self.app.style_config.combobox_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(filter_frame, text="（多个用分号分隔，如：状态 == 完成; 日期 期间 本月）",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        
+        # 排序设置
+        sort_frame = ctk.CTkFrame(self)
+        sort_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(sort_frame, text="排序列：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(sort_frame, textvariable=self.app.merge_config.sort_keys,
+                    width=250, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(sort_frame, text="（多个用逗号分隔，列名后加\":降序\"表示降序，如：日期:降序, 地区）",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        
+        # 汇总设置
+        summary_frame = ctk.CTkFrame(self)
+        summary_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(summary_frame, text="汇总：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        for text, value in (("不汇总", "none"), ("汇总Sheet", "sheet"), ("汇总文件", "file")):
+            ctk.CTkRadioButton(summary_frame, text=text, variable=self.app.merge_config.summary_mode,
+                           value=value, **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkLabel(summary_frame, text="分组列：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(summary_frame, textvariable=self.app.merge_config.summary_groups,
+                    width=120, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(summary_frame, text="统计列：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(summary_frame, textvariable=self.app.merge_config.summary_values,
+                    width=120, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        
+        # 执行方式
+        execution_frame = ctk.CTkFrame(self)
+        execution_frame.pack(fill=tk.X, padx=10, pady=5)
+        ctk.CTkLabel(execution_frame, text="执行方式：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        for text, value in (("自动", "auto"), ("内存", "memory"), ("磁盘暂存", "spill"), ("流水线", "pipeline")):
+            ctk.CTkRadioButton(execution_frame, text=text, variable=self.app.merge_config.execution_mode,
+                           value=value, **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=10)
+        ctk.CTkLabel(execution_frame, text="内存预算(MB)：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(execution_frame, textvariable=self.app.merge_config.memory_budget_mb,
+                    width=80, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(execution_frame, text="预读文件数：", **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkEntry(execution_frame, textvariable=self.app.merge_config.prefetch_files,
+                    width=50, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkCheckBox(execution_frame, text="性能分析", variable=self.app.merge_config.profile,
+                       **self.app.style_config.checkbox_style).pack(side=tk.LEFT, padx=10)
+        
     def enable_all_entries(self):
         """启用所有输入框"""
         for entry in self.entries.values():
@@ -124,7 +260,7 @@ class MergeSettings(ctk.CTkFrame):
                         file_path = self.app.file_handler.get_file_path_from_item(selection[0])
                         if file_path and file_path in self.app.file_handler.selected_sheets:
                             # 重新读取数据
-                            df = self.app.excel_merger.read_excel_range(
+                            df = self.app.excel_merger.read_excel_sheets(
                                 file_path,
                                 self.app.file_handler.selected_sheets[file_path],
                                 self.app.merge_config.header_row.get(),
@@ -8,6 +8,8 @@ import customtkinter as ctk
 from datetime import datetime
 
 from ...scheduler.task_config import TaskConfig
+from ...scheduler.run_history import STATUSES
+from ...scheduler.task_graph import TaskGraph
 
 class ScheduleSettings(ctk.CTkFrame):
     def __init__(self, parent, app, **kwargs):
@@ -61,6 +63,8 @@ class ScheduleSettings(ctk.CTkFrame):
                      **self.app.style_config.button_style).pack(side=tk.LEFT, padx=5)
         ctk.CTkButton(btn_frame, text="删除任务", command=self.delete_task,
                      **self.app.style_config.button_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkButton(btn_frame, text="运行历史", command=self.show_history,
+                     **self.app.style_config.button_style).pack(side=tk.LEFT, padx=5)
         
         # 右侧任务详情
         right_frame = ctk.CTkFrame(content_frame)
@@ -93,6 +97,70 @@ class ScheduleSettings(ctk.CTkFrame):
         ctk.CTkLabel(time_frame, text="（24小时制，如：08:30）",
                     **self.app.style_config.label_style).pack(side=tk.LEFT)
         
+        # 调度方式
+        type_frame = ctk.CTkFrame(info_frame)
+        type_frame.pack(fill=tk.X, pady=2)
+        ctk.CTkLabel(type_frame, text="调度方式：", width=80,
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        self.schedule_type_var = tk.StringVar(value="daily")
+        for text, value in (("每天定时", "daily"), ("Cron表达式", "cron"), ("固定间隔", "interval"),
+                            ("上游完成后", "dependency")):
+            ctk.CTkRadioButton(type_frame, text=text, variable=self.schedule_type_var, value=value,
+                              **self.app.style_config.radio_style).pack(side=tk.LEFT, padx=5)
+        
+        cron_frame = ctk.CTkFrame(info_frame)
+        cron_frame.pack(fill=tk.X, pady=2)
+        ctk.CTkLabel(cron_frame, text="Cron表达式：", width=80,
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        self.cron_var = tk.StringVar()
+        ctk.CTkEntry(cron_frame, textvariable=self.cron_var,
+                    width=150, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(cron_frame, text="（分 时 日 月 周，如：30 8 * * 1-5）",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        
+        interval_frame = ctk.CTkFrame(info_frame)
+        interval_frame.pack(fill=tk.X, pady=2)
+        ctk.CTkLabel(interval_frame, text="执行间隔：", width=80,
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        self.interval_var = tk.StringVar(value="60")
+        ctk.CTkEntry(interval_frame, textvariable=self.interval_var,
+                    width=60, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(interval_frame, text="分钟",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        
+        # 错峰设置
+        stagger_frame = ctk.CTkFrame(info_frame)
+        stagger_frame.pack(fill=tk.X, pady=2)
+        ctk.CTkLabel(stagger_frame, text="随机延迟：", width=80,
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        self.jitter_var = tk.StringVar(value="2")
+        ctk.CTkEntry(stagger_frame, textvariable=self.jitter_var,
+                    width=50, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(stagger_frame, text="分钟以内，与使用同一存储的任务至少相隔",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        self.stagger_var = tk.StringVar(value="3")
+        ctk.CTkEntry(stagger_frame, textvariable=self.stagger_var,
+                    width=50, **self.app.style_config.entry_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkLabel(stagger_frame, text="分钟",
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        
+        # 上游任务（其输出作为本任务的输入）
+        deps_frame = ctk.CTkFrame(info_frame)
+        deps_frame.pack(fill=tk.X, pady=2)
+        ctk.CTkLabel(deps_frame, text="上游任务：", width=80,
+                    **self.app.style_config.label_style).pack(side=tk.LEFT)
+        self.depends_on = []
+        self.depends_on_var = tk.StringVar(value="无")
+        ctk.CTkLabel(deps_frame, textvariable=self.depends_on_var,
+                    **self.app.style_config.label_style).pack(side=tk.LEFT, padx=5)
+        ctk.CTkButton(deps_frame, text="选择", width=60, command=self.select_dependencies,
+                     **self.app.style_config.button_style).pack(side=tk.RIGHT, padx=5)
+        
+        # 之后几次的计划执行时间
+        self.upcoming_var = tk.StringVar()
+        ctk.CTkLabel(info_frame, textvariable=self.upcoming_var, justify=tk.LEFT,
+                    **self.app.style_config.label_style).pack(anchor=tk.W, pady=2)
+        
         # 任务状态
         status_frame = ctk.CTkFrame(info_frame)
         status_frame.pack(fill=tk.X, pady=2)
@@ -116,7 +184,7 @@ class ScheduleSettings(ctk.CTkFrame):
         notes = [
             "定时任务说明：",
             "1. 时间格式为24小时制，如：08:30、14:00、23:45",
-            "2. 任务将在每天指定时间自动执行合并操作",
+            "2. 任务可以每天定时、按Cron表达式、按固定间隔或在上游任务完成后执行；实际执行时间会加上随机延迟，并与使用同一存储的任务错开",
             "3. 请确保在启用任务前已正确设置所有合并参数",
             "4. 定时任务运行时请勿关闭软件",
             "5. 可以随时启用/禁用任务"
@@ -131,18 +199,18 @@ class ScheduleSettings(ctk.CTkFrame):
         for item in self.task_tree.get_children():
             self.task_tree.delete(item)
             
-        # 添加任务
-        for task in self.app.task_manager.get_all_tasks():
-            status = "启用" if task.enabled else "禁用"
+        # 添加任务（只读取概要，选中任务时才加载完整配置）
+        for task in self.app.task_manager.get_task_summaries():
+            status = "启用" if task['enabled'] else "禁用"
             values = (
-                task.task_name,
-                task.schedule_time,
+                task['task_name'],
+                task['schedule_text'] or task['schedule_time'],
                 status,
-                task.last_run or "从未执行",
-                task.next_run or "未设置"
+                task['last_run'] or "从未执行",
+                task['next_run'] or "未设置"
             )
             # 确保task_id作为tag被正确设置
-            self.task_tree.insert("", tk.END, values=values, tags=(task.task_id,))
+            self.task_tree.insert("", tk.END, values=values, tags=(task['task_id'],))
             
     def create_task(self):
         """创建新任务"""
@@ -195,16 +263,15 @@ class ScheduleSettings(ctk.CTkFrame):
             
             # 设置任务配置
             task.merge_config = self.app.merge_config.get_merge_config()
-            task.input_files = [(f, s) for f, s in zip(
-                self.app.file_handler.input_files,
-                self.app.file_handler.selected_sheets.values()
-            )]
+            task.input_files = [(f, self.app.file_handler.selected_sheets[f])
+                                for f in self.app.file_handler.input_files
+                                if f in self.app.file_handler.selected_sheets]
             task.output_path = self.app.output_path
             task.output_filename = self.app.output_filename_var.get()
             
             # 如果启用，设置下次执行时间
             if task.enabled:
-                task.update_next_run()
+                self.app.task_manager.schedule_next_run(task)
             
             # 添加任务
             self.app.task_manager.add_task(task)
@@ -257,10 +324,36 @@ class ScheduleSettings(ctk.CTkFrame):
             
         # 验证时间格式
         time_str = self.time_var.get()
+        if self.schedule_type_var.get() == "daily":
+            try:
+                datetime.strptime(time_str, "%H:%M")
+            except ValueError:
+                messagebox.showerror("错误", "请输入正确的时间格式（HH:MM）")
+                return
+                
+        # 验证调度设置（先在副本上检查，无效时不修改任务）
+        schedule = {
+            'depends_on': list(self.depends_on),
+            'schedule_type': self.schedule_type_var.get(),
+            'schedule_time': time_str,
+            'cron': self.cron_var.get().strip(),
+            'interval_minutes': self.interval_var.get().strip(),
+            'jitter_minutes': self.jitter_var.get().strip() or 0,
+            'stagger_minutes': self.stagger_var.get().strip() or 0,
+        }
         try:
-            datetime.strptime(time_str, "%H:%M")
-        except ValueError:
-            messagebox.showerror("错误", "请输入正确的时间格式（HH:MM）")
+            probe = TaskConfig.from_dict({**self.current_task.to_dict(), **schedule})
+            probe.validate_schedule()
+        except ValueError as e:
+            messagebox.showerror("错误", f"调度设置无效：{str(e)}")
+            return
+            
+        # 检查依赖循环
+        dependencies = self.app.task_manager.store.dependencies()
+        dependencies[probe.task_id] = probe.depends_on
+        cycle = TaskGraph(dependencies).find_cycle()
+        if cycle:
+            messagebox.showerror("错误", f"任务依赖存在循环：{' → '.join(self.task_name(t) for t in cycle)}")
             return
             
         # 验证任务名称
@@ -270,18 +363,24 @@ class ScheduleSettings(ctk.CTkFrame):
             
         # 更新任务信息
         self.current_task.task_name = self.name_var.get()
+        self.current_task.schedule_type = probe.schedule_type
         self.current_task.schedule_time = time_str
-        old_enabled = self.current_task.enabled
+        self.current_task.cron = probe.cron
+        self.current_task.interval_minutes = int(probe.interval_minutes)
+        self.current_task.jitter_minutes = int(probe.jitter_minutes)
+        self.current_task.stagger_minutes = int(probe.stagger_minutes)
+        self.current_task.depends_on = probe.depends_on
         new_enabled = self.enabled_var.get()
         self.current_task.enabled = new_enabled
         
-        # 如果从禁用变为启用，更新下次执行时间
-        if not old_enabled and new_enabled:
-            self.current_task.update_next_run()
+        # 启用的任务按新的调度设置更新下次执行时间
+        if new_enabled:
+            self.app.task_manager.schedule_next_run(self.current_task)
         
         # 更新任务
         self.app.task_manager.update_task(self.current_task)
         self.refresh_task_list()
+        self.show_upcoming(self.current_task)
         messagebox.showinfo("成功", "任务更新成功！")
         
     def toggle_task(self):
@@ -293,7 +392,7 @@ class ScheduleSettings(ctk.CTkFrame):
             if old_enabled != new_enabled:
                 self.current_task.enabled = new_enabled
                 if new_enabled:
-                    self.current_task.update_next_run()
+                    self.app.task_manager.schedule_next_run(self.current_task)
                 else:
                     self.current_task.next_run = None
                 
@@ -316,11 +415,171 @@ class ScheduleSettings(ctk.CTkFrame):
             self.current_task = task
             self.name_var.set(task.task_name)
             self.time_var.set(task.schedule_time)
+            self.schedule_type_var.set(task.schedule_type)
+            self.cron_var.set(task.cron)
+            self.interval_var.set(str(task.interval_minutes))
+            self.jitter_var.set(str(task.jitter_minutes))
+            self.stagger_var.set(str(task.stagger_minutes))
+            self.set_dependencies(task.depends_on)
             self.enabled_var.set(task.enabled)
+            self.show_upcoming(task)
             
+    def task_name(self, task_id):
+        """任务名称，任务不存在时返回任务ID"""
+        task = self.app.task_manager.get_task(task_id)
+        return task.task_name if task and task.task_name else task_id
+        
+    def set_dependencies(self, task_ids):
+        """设置界面上显示的上游任务（保存任务时生效）"""
+        self.depends_on = list(task_ids)
+        self.depends_on_var.set("、".join(self.task_name(t) for t in self.depends_on) or "无")
+        
+    def select_dependencies(self):
+        """选择上游任务：上游任务的输出作为本任务的输入，上游任务完成后立即执行本任务"""
+        if not self.current_task:
+            messagebox.showwarning("警告", "请先选择要编辑的任务！")
+            return
+            
+        candidates = [s for s in self.app.task_manager.get_task_summaries()
+                      if s['task_id'] != self.current_task.task_id]
+        if not candidates:
+            messagebox.showinfo("提示", "没有可以作为上游的其他任务！")
+            return
+            
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("选择上游任务")
+        dialog.geometry("360x400")
+        dialog.transient(self)
+        dialog.grab_set()
+        
+        ctk.CTkLabel(dialog, text="上游任务的最新输出将作为本任务的输入（可多选）：").pack(padx=10, pady=5)
+        task_list = tk.Listbox(dialog, selectmode=tk.MULTIPLE)
+        task_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        for i, summary in enumerate(candidates):
+            task_list.insert(tk.END, summary['task_name'] or summary['task_id'])
+            if summary['task_id'] in self.depends_on:
+                task_list.selection_set(i)
+                
+        def confirm_selection():
+            self.set_dependencies([candidates[i]['task_id'] for i in task_list.curselection()])
+            dialog.destroy()
+            
+        btn_frame = ctk.CTkFrame(dialog)
+        btn_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=10)
+        ctk.CTkButton(btn_frame, text="确认", command=confirm_selection).pack(side=tk.LEFT, padx=10, expand=True)
+        ctk.CTkButton(btn_frame, text="取消", command=dialog.destroy).pack(side=tk.LEFT, padx=10, expand=True)
+        
+    def show_upcoming(self, task):
+        """显示之后几次的计划执行时间（不含随机延迟和错峰）"""
+        if task.schedule_type == "dependency":
+            self.upcoming_var.set("计划执行：上游任务完成后立即执行")
+            return
+        try:
+            times = task.upcoming_runs(3)
+        except ValueError as e:
+            self.upcoming_var.set(f"调度设置无效：{str(e)}")
+            return
+        text = "、".join(t.strftime("%m-%d %H:%M") for t in times)
+        if task.enabled and task.next_run:
+            text += f"\n下次实际执行（含随机延迟和错峰）：{task.next_run[:16]}"
+        self.upcoming_var.set(f"计划执行：{text}")
+            
+    def show_history(self):
+        """显示运行历史：各任务的耗时趋势（耗时逐渐变长的任务标红）和所选任务最近的执行记录"""
+        try:
+            history = self.app.task_manager.history
+            trends = history.duration_trends()
+        except Exception as e:
+            messagebox.showerror("错误", f"读取运行历史失败：{str(e)}")
+            return
+            
+        window = ctk.CTkToplevel(self)
+        window.title("运行历史")
+        window.geometry("900x600")
+        window.transient(self)
+        
+        # 耗时趋势
+        ctk.CTkLabel(window, text="耗时趋势（最近5次成功执行与此前10次的平均耗时比较）",
+                    **self.app.style_config.label_style).pack(anchor=tk.W, padx=10, pady=5)
+        trend_columns = ("任务名称", "统计次数", "最近平均耗时", "此前平均耗时", "变化", "最近平均行数", "失败次数", "提示")
+        trend_tree = ttk.Treeview(window, columns=trend_columns, show="headings", height=8)
+        for col in trend_columns:
+            trend_tree.heading(col, text=col)
+            trend_tree.column(col, width=100)
+        trend_tree.tag_configure("creeping", foreground="red")
+        trend_tree.pack(fill=tk.X, padx=10)
+        
+        def seconds(value):
+            return f"{value:.1f} 秒" if value is not None else "-"
+            
+        for trend in trends:
+            values = (
+                trend['task_name'] or trend['task_id'],
+                trend['runs'],
+                seconds(trend['recent_duration']),
+                seconds(trend['baseline_duration']),
+                f"{trend['ratio']:.2f} 倍" if trend['ratio'] else "-",
+                f"{trend['recent_rows']:.0f}" if trend['recent_rows'] is not None else "-",
+                trend['failures'],
+                "耗时逐渐变长" if trend['creeping'] else ""
+            )
+            tags = (trend['task_id'], "creeping") if trend['creeping'] else (trend['task_id'],)
+            trend_tree.insert("", tk.END, values=values, tags=tags)
+            
+        # 执行记录
+        ctk.CTkLabel(window, text="执行记录（选中上方任务查看该任务的记录）",
+                    **self.app.style_config.label_style).pack(anchor=tk.W, padx=10, pady=5)
+        run_columns = ("任务名称", "开始时间", "耗时", "行数", "输入大小", "输出大小", "进程峰值内存", "结果", "错误")
+        run_tree = ttk.Treeview(window, columns=run_columns, show="headings")
+        for col in run_columns:
+            run_tree.heading(col, text=col)
+            run_tree.column(col, width=90)
+        run_tree.column("开始时间", width=140)
+        run_tree.column("进程峰值内存", width=120)
+        run_tree.column("错误", width=200)
+        run_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        
+        def megabytes(value):
+            return f"{value / 1024 / 1024:.1f} MB" if value is not None else "-"
+            
+        def peak_memory(run):
+            # 峰值内存按进程采样，执行期间有其他任务同时运行时包含这些任务占用的内存
+            return megabytes(run['peak_memory']) + (" (含并行任务)" if run['overlapped'] and run['peak_memory'] else "")
+            
+        def show_runs(task_id=None):
+            for item in run_tree.get_children():
+                run_tree.delete(item)
+            for run in history.recent_runs(task_id):
+                run_tree.insert("", tk.END, values=(
+                    run['task_name'] or run['task_id'],
+                    run['started_at'],
+                    seconds(run['duration']),
+                    run['rows'] if run['rows'] is not None else "-",
+                    megabytes(run['input_bytes']),
+                    megabytes(run['output_bytes']),
+                    peak_memory(run),
+                    STATUSES.get(run['status'], run['status']),
+                    run['error'] or ""
+                ))
+                
+        def on_trend_selected(event):
+            selection = trend_tree.selection()
+            if selection:
+                show_runs(trend_tree.item(selection[0])['tags'][0])
+                
+        trend_tree.bind('<<TreeviewSelect>>', on_trend_selected)
+        show_runs()
+        
     def clear_task_detail(self):
         """清空任务详情"""
         self.current_task = None
         self.name_var.set("")
         self.time_var.set("")
+        self.schedule_type_var.set("daily")
+        self.cron_var.set("")
+        self.interval_var.set("60")
+        self.jitter_var.set("2")
+        self.stagger_var.set("3")
+        self.set_dependencies([])
+        self.upcoming_var.set("")
         self.enabled_var.set(False) 
\ No newline at end of file
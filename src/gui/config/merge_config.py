@@ -2,21 +2,28 @@
 合并配置模块
 处理Excel合并相关的配置管理
 """
+import re
 import tkinter as tk
 
 class MergeConfig:
     def __init__(self):
         """初始化合并配置"""
         # 合并模式
-        self.merge_mode = tk.StringVar(value="single")  # single: 合并到单个sheet, multiple: 每个文件一个sheet
+        self.merge_mode = tk.StringVar(value="single")  # single: 合并到单个sheet, multiple: 每个文件一个sheet, join: 按关键列横向合并
         self.sheet_name_mode = tk.StringVar(value="auto")  # auto: 使用文件名, original: 使用原sheet名, custom: 使用自定义名称
         self.custom_sheet_name = tk.StringVar(value="Sheet1")  # 自定义sheet名称
         
+        # 横向合并设置
+        self.join_keys = tk.StringVar(value="")  # 关键列，多个用逗号分隔
+        self.join_how = tk.StringVar(value="inner")  # inner: 内连接, left: 左连接, outer: 全连接
+        
         # 数据范围
         self.start_row = tk.StringVar(value="1")
         self.end_row = tk.StringVar(value="")
         self.start_col = tk.StringVar(value="A")
         self.end_col = tk.StringVar(value="")
+        self.select_columns = tk.StringVar(value="")  # 按表头名称选择的列，多个用逗号分隔，为空时读取列范围内所有列
+        self.select_columns_order = tk.StringVar(value="list")  # list: 按填写顺序输出, file: 按文件中的顺序输出
         
         # 表头设置
         self.header_row = tk.StringVar(value="1")  # 表头行号
@@ -24,6 +31,49 @@ class MergeConfig:
         
         # 样式设置（简化为单个选项）
         self.keep_styles = tk.BooleanVar(value=True)  # 是否保留所有样式
+        self.style_mode = tk.StringVar(value="column")  # column: 按列设置样式, cell: 逐个单元格设置样式
+        
+        # 读取引擎
+        self.reader_engine = tk.StringVar(value="auto")  # auto: 按文件格式自动选择, calamine/openpyxl/pyxlsb/xlrd: 指定引擎
+        
+        # 附加输出格式（与xlsx同时写出）
+        self.output_parquet = tk.BooleanVar(value=False)
+        self.output_feather = tk.BooleanVar(value=False)
+        self.output_csv = tk.BooleanVar(value=False)
+        self.parquet_compression = tk.StringVar(value="zstd")
+        
+        # xlsx文件包设置
+        self.xlsx_compression = tk.StringVar(value="default")  # default: 标准压缩, fast: 快速压缩, max: 最大压缩, stored: 不压缩
+        self.xlsx_minimal_styles = tk.BooleanVar(value=False)  # 只保留用到的样式
+        self.xlsx_shared_strings = tk.StringVar(value="none")  # none: 不使用, lineage: 来源列, all: 所有文本
+        self.xlsx_size_report = tk.BooleanVar(value=False)  # 输出各部件大小
+        
+        # 输出发布设置
+        self.stage_output = tk.BooleanVar(value=False)  # 先写到本地临时目录，完成后原子地发布到输出目录
+        self.latest_alias = tk.BooleanVar(value=False)  # 发布后更新 *_latest.xlsx 副本
+        
+        # 去重设置
+        self.dedup_mode = tk.StringVar(value="none")  # none: 不去重, row: 整行去重, key: 按关键列去重
+        self.dedup_keys = tk.StringVar(value="")  # 关键列，多个用逗号分隔
+        self.dedup_keep = tk.StringVar(value="first")  # first: 保留第一次出现, last: 保留最后一次出现
+        
+        # 筛选设置
+        self.filters = tk.StringVar(value="")  # 筛选条件，多个用分号分隔，如：状态 == 完成; 日期 期间 本月
+        self.filter_combine = tk.StringVar(value="and")  # and: 满足所有条件, or: 满足任一条件
+        
+        # 排序设置
+        self.sort_keys = tk.StringVar(value="")  # 排序列，多个用逗号分隔，列名后加":降序"表示降序
+        
+        # 汇总设置
+        self.summary_mode = tk.StringVar(value="none")  # none: 不汇总, sheet: 输出到单独的sheet, file: 输出到单独的文件
+        self.summary_groups = tk.StringVar(value="数据来源")  # 分组列，多个用逗号分隔
+        self.summary_values = tk.StringVar(value="")  # 统计列，为空时统计所有数值列
+        
+        # 执行方式
+        self.execution_mode = tk.StringVar(value="auto")  # auto: 超出内存预算时暂存到磁盘, memory: 全部在内存中, spill: 始终暂存到磁盘, pipeline: 读取与写出流水线执行
+        self.memory_budget_mb = tk.StringVar(value="1024")  # 内存预算(MB)
+        self.prefetch_files = tk.StringVar(value="2")  # 解析当前文件时预读的后续文件数，0表示不预读
+        self.profile = tk.BooleanVar(value=False)  # 性能分析：记录耗时热点和各阶段内存分配
         
     def get_merge_config(self):
         """获取合并配置"""
@@ -31,11 +81,107 @@ class MergeConfig:
             'merge_mode': self.merge_mode.get(),
             'sheet_name_mode': self.sheet_name_mode.get(),
             'custom_sheet_name': self.custom_sheet_name.get(),
+            'join_keys': self.split_columns(self.join_keys.get()),
+            'join_how': self.join_how.get(),
             'start_row': self.start_row.get(),
             'end_row': self.end_row.get(),
             'start_col': self.start_col.get(),
             'end_col': self.end_col.get(),
+            'select_columns': self.split_columns(self.select_columns.get()),
+            'select_columns_order': self.select_columns_order.get(),
             'header_row': self.header_row.get(),
             'keep_header': self.keep_header.get(),
-            'keep_styles': self.keep_styles.get()
-        } 
\ No newline at end of file
+            'keep_styles': self.keep_styles.get(),
+            'style_mode': self.style_mode.get(),
+            'reader_engine': self.reader_engine.get(),
+            'output_formats': self.get_output_formats(),
+            'parquet_compression': self.parquet_compression.get(),
+            'csv_chunksize': 100000,
+            'xlsx_compression': self.xlsx_compression.get(),
+            'xlsx_minimal_styles': self.xlsx_minimal_styles.get(),
+            'xlsx_shared_strings': self.xlsx_shared_strings.get(),
+            'xlsx_size_report': self.xlsx_size_report.get(),
+            'stage_output': self.stage_output.get(),
+            'latest_alias': self.latest_alias.get(),
+            'dedup_mode': self.dedup_mode.get(),
+            'dedup_keys': self.split_columns(self.dedup_keys.get()),
+            'dedup_keep': self.dedup_keep.get(),
+            'filters': self.parse_filters(self.filters.get()),
+            'filter_combine': self.filter_combine.get(),
+            'sort_keys': self.parse_sort_keys(self.sort_keys.get()),
+            'summary_mode': self.summary_mode.get(),
+            'summary_groups': self.split_columns(self.summary_groups.get()),
+            'summary_values': self.split_columns(self.summary_values.get()),
+            'execution_mode': self.execution_mode.get(),
+            'memory_budget_mb': self.memory_budget_mb.get(),
+            'prefetch_files': self.prefetch_files.get(),
+            'profile': self.profile.get()
+        }
+        
+    @staticmethod
+    def split_columns(text):
+        """将逗号分隔的列名拆分为列表"""
+        return [col.strip() for col in text.replace('，', ',').split(',') if col.strip()]
+        
+    @staticmethod
+    def parse_sort_keys(text):
+        """
+        解析排序列文本，例如 "日期:降序, 地区"
+        
+        Returns:
+            list: [{'column': 列名, 'ascending': 是否升序}]
+        """
+        keys = []
+        for item in MergeConfig.split_columns(text.replace('：', ':')):
+            column, _, order = item.rpartition(':')
+            order = order.strip().lower()
+            if column and order in ("降序", "desc", "升序", "asc"):
+                keys.append({'column': column.strip(), 'ascending': order in ("升序", "asc")})
+            else:
+                keys.append({'column': item, 'ascending': True})
+        return keys
+        
+    @staticmethod
+    def parse_filters(text):
+        """
+        解析筛选条件文本
+        
+        每个条件为 "列名 运算符 值"，多个条件用分号分隔。运算符：
+        ==、!=、>、>=、<、<=、包含、属于、不属于（值用|分隔）、为空、不为空、期间（今天/本周/本月/上月/本年）
+        例如 "状态 == 完成; 日期 期间 本月"
+        
+        Returns:
+            list: [{'column': 列名, 'op': 运算符, 'value': 比较值}]
+        """
+        ops = {'包含': 'contains', '属于': 'in', '不属于': 'not_in', '为空': 'empty', '不为空': 'not_empty', '期间': 'period'}
+        periods = {'今天': 'today', '本周': 'this_week', '本月': 'this_month', '上月': 'last_month', '本年': 'this_year'}
+        pattern = re.compile(r'^(.+?)\s*(==|!=|>=|<=|>|<|\s不属于|\s属于|\s包含|\s不为空|\s为空|\s期间)\s*(.*)$')
+        filters = []
+        for item in re.split(r'[;；]', text):
+            item = item.strip()
+            if not item:
+                continue
+            match = pattern.match(item)
+            if not match:
+                raise ValueError(f"无法解析筛选条件：{item}")
+            column, op, value = match.group(1).strip(), match.group(2).strip(), match.group(3).strip().strip('"\'')
+            op = ops.get(op, op)
+            if op in ('in', 'not_in'):
+                value = [v.strip() for v in value.split('|') if v.strip()]
+            elif op == 'period':
+                value = periods.get(value, value)
+            elif op in ('empty', 'not_empty'):
+                value = None
+            filters.append({'column': column, 'op': op, 'value': value})
+        return filters
+        
+    def get_output_formats(self):
+        """获取选中的附加输出格式"""
+        formats = []
+        if self.output_parquet.get():
+            formats.append('parquet')
+        if self.output_feather.get():
+            formats.append('feather')
+        if self.output_csv.get():
+            formats.append('csv')
+        return formats 
\ No newline at end of file
@@ -4,8 +4,10 @@
 """
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
 import os
+import re
+
+from ...excel.reader_engine import SUPPORTED_PATTERNS
 
 class FileHandler:
     def __init__(self, app):
@@ -13,21 +15,20 @@ class FileHandler:
         self.app = app
         self.input_files = []
         self.file_sheets = {}  # {文件路径: [sheet名称列表]}
-        self.selected_sheets = {}  # {文件路径: 选中的sheet名称}
+        self.selected_sheets = {}  # {文件路径: sheet名称 / [sheet名称列表] / {'regex': 正则表达式}}
         
     def add_files(self):
         """添加Excel文件"""
         files = filedialog.askopenfilenames(
             title="选择Excel文件",
-            filetypes=[("Excel files", "*.xlsx *.xls")]
+            filetypes=[("Excel files", SUPPORTED_PATTERNS)]
         )
         
         for file in files:
             if file not in self.input_files:
                 try:
                     # 读取文件的sheet列表
-                    xl = pd.ExcelFile(file)
-                    sheets = xl.sheet_names
+                    sheets = self.app.excel_merger.get_sheet_names(file)
                     
                     # 检查是否为空文件
                     if not sheets:
@@ -71,38 +72,60 @@ class FileHandler:
         # 创建Sheet选择窗口
         sheet_window = tk.Toplevel(self.app.root)
         sheet_window.title("选择Sheet")
-        sheet_window.geometry("300x200")
+        sheet_window.geometry("300x280")
         sheet_window.transient(self.app.root)
         sheet_window.grab_set()
         
-        # 创建Sheet列表
-        sheet_list = tk.Listbox(sheet_window, width=40, height=10)
+        # 创建Sheet列表（按住Ctrl/Shift可多选）
+        sheet_list = tk.Listbox(sheet_window, width=40, height=10, selectmode=tk.EXTENDED)
         sheet_list.pack(pady=10)
         
         # 添加Sheet选项
         for sheet in self.file_sheets[file_path]:
             sheet_list.insert(tk.END, sheet)
             
-        # 如果已经选择了Sheet，选中它
-        if file_path in self.selected_sheets:
-            try:
-                index = self.file_sheets[file_path].index(self.selected_sheets[file_path])
-                sheet_list.selection_set(index)
-            except ValueError:
-                pass
+        # 正则匹配输入框
+        regex_frame = tk.Frame(sheet_window)
+        regex_frame.pack(fill=tk.X, padx=10)
+        tk.Label(regex_frame, text="按正则匹配：").pack(side=tk.LEFT)
+        regex_var = tk.StringVar()
+        tk.Entry(regex_frame, textvariable=regex_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # 恢复已有的选择
+        current = self.selected_sheets.get(file_path)
+        if isinstance(current, dict):
+            regex_var.set(current['regex'])
+        elif current is not None:
+            for sheet in self.resolve_sheets(current, self.file_sheets[file_path]):
+                sheet_list.selection_set(self.file_sheets[file_path].index(sheet))
                 
         def confirm_selection():
+            pattern = regex_var.get().strip()
             selection = sheet_list.curselection()
-            if selection:
-                selected_sheet = sheet_list.get(selection[0])
-                self.selected_sheets[file_path] = selected_sheet
-                self.app.file_selector.file_tree.set(item, "选择Sheet", selected_sheet)
-                # 如果当前是使用原sheet名模式，更新sheet名称
-                if self.app.merge_config.sheet_name_mode.get() == "original":
-                    self.app.file_selector.file_tree.set(item, "自定义Sheet名", selected_sheet)
-                sheet_window.destroy()
+            if pattern:
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    messagebox.showerror("错误", f"正则表达式无效：{str(e)}")
+                    return
+                selected = {'regex': pattern}
+                if not self.resolve_sheets(selected, self.file_sheets[file_path]):
+                    messagebox.showwarning("警告", "没有匹配该正则表达式的Sheet！")
+                    return
+            elif len(selection) == 1:
+                selected = sheet_list.get(selection[0])
+            elif selection:
+                selected = [sheet_list.get(i) for i in selection]
             else:
                 messagebox.showwarning("警告", "请先选择一个Sheet！")
+                return
+                
+            self.selected_sheets[file_path] = selected
+            self.app.file_selector.file_tree.set(item, "选择Sheet", self.format_sheet_selection(selected))
+            # 如果当前是使用原sheet名模式，更新sheet名称
+            if self.app.merge_config.sheet_name_mode.get() == "original":
+                self.app.file_selector.file_tree.set(item, "自定义Sheet名", self.primary_sheet(file_path))
+            sheet_window.destroy()
                 
         def cancel_selection():
             sheet_window.destroy()
@@ -122,6 +145,26 @@ class FileHandler:
         sheet_window.focus_set()
         self.app.root.wait_window(sheet_window)
         
+    @staticmethod
+    def resolve_sheets(selection, sheets):
+        """按sheet选择解析出sheet名称列表（合并模块依赖pandas，首次使用时才导入）"""
+        from ...excel.merger import ExcelMerger
+        return ExcelMerger.resolve_sheets(selection, sheets)
+        
+    @staticmethod
+    def format_sheet_selection(selection):
+        """将sheet选择格式化为列表中显示的文本"""
+        if isinstance(selection, dict):
+            return f"正则: {selection['regex']}"
+        if isinstance(selection, (list, tuple)):
+            return ", ".join(selection)
+        return selection
+        
+    def primary_sheet(self, file_path):
+        """获取文件选中的第一个sheet名称"""
+        sheets = self.resolve_sheets(self.selected_sheets[file_path], self.file_sheets[file_path])
+        return sheets[0] if sheets else ""
+        
     def change_sheet_name(self, item):
         """修改选中文件的Sheet名称"""
         if self.app.merge_config.merge_mode.get() != "multiple" or \
@@ -174,9 +217,12 @@ class FileHandler:
         
     def on_merge_mode_change(self):
         """当合并模式改变时的处理"""
-        if self.app.merge_config.merge_mode.get() == "single":
+        self.app.merge_settings.join_frame.pack_forget()
+        if self.app.merge_config.merge_mode.get() in ("single", "join"):
             self.app.merge_settings.multiple_sheet_frame.pack_forget()
             self.app.merge_settings.single_sheet_frame.pack(fill=tk.X, padx=5, pady=5)
+            if self.app.merge_config.merge_mode.get() == "join":
+                self.app.merge_settings.join_frame.pack(fill=tk.X, padx=5, pady=5)
             # 隐藏自定义Sheet名列
             self.app.file_selector.file_tree.column("自定义Sheet名", width=0)
         else:
@@ -192,7 +238,7 @@ class FileHandler:
             for item in self.app.file_selector.file_tree.get_children():
                 file_name = self.app.file_selector.file_tree.item(item)['values'][0]
                 file_path = self.get_file_path_from_item(item)
-                current_sheet = self.app.file_selector.file_tree.item(item)['values'][1]
+                current_sheet = self.primary_sheet(file_path)
                 
                 if self.app.merge_config.sheet_name_mode.get() == "auto":
                     # 使用文件名作为sheet名
@@ -56,12 +56,30 @@ class MergeHandler:
                 output_file,
                 self.app.file_handler.selected_sheets,
                 self.app.file_handler.file_sheets,
-                merge_config
+                merge_config,
+                progress_callback=self.show_progress
             )
             
             if result['success']:
                 self.app.status_var.set(f"合并完成！输出文件：{output_file}")
-                messagebox.showinfo("成功", f"文件合并完成！\n共合并了 {len(self.app.file_handler.input_files)} 个文件的数据")
+                message = f"文件合并完成！\n共合并了 {len(self.app.file_handler.input_files)} 个文件的数据"
+                if result.get('skipped_files'):
+                    message += f"\n跳过内容重复的文件 {len(result['skipped_files'])} 个"
+                if result.get('duplicates_removed'):
+                    message += f"\n去除重复行 {result['duplicates_removed']} 行"
+                if result.get('spilled'):
+                    message += "\n数据量超出内存预算，已使用磁盘暂存"
+                if result.get('package_parts'):
+                    message += "\nxlsx部件大小（压缩后）：\n" + "\n".join(
+                        f"{part['part']}: {part['compressed'] / 1024:.1f} KB" for part in result['package_parts'][:5]
+                    )
+                if result.get('outputs'):
+                    message += "\n附加输出：\n" + "\n".join(os.path.basename(p) for p in result['outputs'])
+                if result.get('latest'):
+                    message += f"\n已更新latest副本：{os.path.basename(result['latest'])}"
+                if result.get('profile'):
+                    message += f"\n\n性能分析（{os.path.dirname(result['profile']['prof_file'])}）：\n{result['profile']['summary']}"
+                messagebox.showinfo("成功", message)
             else:
                 raise Exception(result['error'])
                 
@@ -69,6 +87,32 @@ class MergeHandler:
             self.app.status_var.set(f"错误：{str(e)}")
             messagebox.showerror("错误", f"合并过程中出现错误：{str(e)}")
             
+    def show_progress(self, progress):
+        """在状态栏显示合并进度"""
+        text = (f"{progress['stage_name']}：文件 {progress['files_done']}/{progress['files_total']}，"
+                f"已读取 {progress['rows_read']} 行，已写出 {progress['rows_written']} 行")
+        if progress['eta'] is not None and progress['stage'] != "done":
+            text += f"，预计剩余 {progress['eta']:.0f} 秒"
+        self.app.status_var.set(text)
+        self.app.root.update_idletasks()
+            
+    def merge_files_with_config(self, task, progress_callback=None, cancel_token=None, upstream_inputs=()):
+        """
+        按任务配置执行合并（供定时任务调用，不弹出对话框）
+        
+        Args:
+            task: TaskConfig对象
+            progress_callback: 进度回调
+            cancel_token: CancellationToken，用于取消正在执行的任务
+            upstream_inputs: 上游任务的输出 [(文件路径, 选中的sheet)]，作为额外的输入文件
+            
+        Returns:
+            dict: 合并结果，包含输出文件路径 output_file
+        """
+        return self.app.task_manager.merge_task(
+            task, progress_callback=progress_callback, cancel_token=cancel_token, upstream_inputs=upstream_inputs
+        )
+            
     def preview_data(self):
         """预览选中的文件"""
         selection = self.app.file_selector.file_tree.selection()
@@ -82,7 +126,7 @@ class MergeHandler:
             return
             
         try:
-            df = self.app.excel_merger.read_excel_range(
+            df = self.app.excel_merger.read_excel_sheets(
                 file_path,
                 self.app.file_handler.selected_sheets[file_path],
                 self.app.merge_config.header_row.get(),
@@ -105,6 +149,10 @@ class MergeHandler:
             return
             
         try:
+            # pandas相关模块在首次预览时才导入，避免拖慢启动
+            from ...excel.joiner import KeyJoiner
+            from ...excel.row_filter import RowFilter
+            
             # 准备合并参数
             merge_config = self.app.merge_config.get_merge_config()
             
@@ -112,7 +160,7 @@ class MergeHandler:
             all_data = []
             for file in self.app.file_handler.input_files:
                 if file in self.app.file_handler.selected_sheets:
-                    df = self.app.excel_merger.read_excel_range(
+                    df = self.app.excel_merger.read_excel_sheets(
                         file,
                         self.app.file_handler.selected_sheets[file],
                         merge_config['header_row'],
@@ -120,7 +168,10 @@ class MergeHandler:
                         merge_config['end_row'],
                         merge_config['start_col'],
                         merge_config['end_col'],
-                        add_source=(merge_config['merge_mode'] == 'single')
+                        add_source=(merge_config['merge_mode'] == 'single'),
+                        row_filter=RowFilter.from_config(merge_config),
+                        select_columns=merge_config['select_columns'],
+                        column_order=merge_config['select_columns_order']
                     )
                     if not df.empty:
                         all_data.append((file, df))
@@ -128,7 +179,11 @@ class MergeHandler:
             if not all_data:
                 raise ValueError("没有有效的数据可以合并！")
                 
-            if merge_config['merge_mode'] == "single":
+            if merge_config['merge_mode'] == "join":
+                named_frames = [(os.path.splitext(os.path.basename(file))[0], df) for file, df in all_data]
+                merged_df = KeyJoiner.from_config(merge_config).join(named_frames)
+                self.app.preview_window.show_preview(merged_df, "预览: 横向合并结果")
+            elif merge_config['merge_mode'] == "single":
                 # 检查表头一致性
                 headers_consistent, message = self.app.excel_merger.check_headers_consistency(
                     [df for _, df in all_data]
@@ -25,8 +25,6 @@ from .handlers.path_manager import PathManager
 from .preview.preview_window import PreviewWindow
 
 from ..scheduler.task_manager import TaskManager
-from ..excel.merger import ExcelMerger
-from ..excel.style_manager import ExcelStyleManager
 
 class ExcelMergerApp:
     def __init__(self, root):
@@ -49,8 +47,8 @@ class ExcelMergerApp:
         # 创建界面
         self.create_gui()
         
-        # 启动任务管理器
-        self.task_manager.start()
+        # 窗口显示后再在后台加载任务配置，加载完成后启动任务管理器
+        self.root.after_idle(self.load_tasks)
         
         # 绑定窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -66,11 +64,9 @@ class ExcelMergerApp:
         # 创建路径管理器
         self.path_manager = PathManager()
         
-        # 创建Excel样式管理器
-        self.style_manager = ExcelStyleManager()
-        
-        # 创建Excel合并器
-        self.excel_merger = ExcelMerger(self.style_manager)
+        # Excel样式管理器和合并器依赖pandas和openpyxl，首次使用时才创建
+        self._style_manager = None
+        self._excel_merger = None
         
         # 创建处理器
         self.file_handler = FileHandler(self)
@@ -91,6 +87,35 @@ class ExcelMergerApp:
         self.appearance_mode_var = tk.StringVar(value="跟随系统")
         self.color_theme_var = tk.StringVar(value="blue")
         
+    @property
+    def style_manager(self):
+        """Excel样式管理器，首次使用时导入openpyxl"""
+        if self._style_manager is None:
+            from ..excel.style_manager import ExcelStyleManager
+            self._style_manager = ExcelStyleManager()
+        return self._style_manager
+        
+    @property
+    def excel_merger(self):
+        """Excel合并器，首次使用时导入pandas和openpyxl"""
+        if self._excel_merger is None:
+            from ..excel.merger import ExcelMerger
+            self._excel_merger = ExcelMerger(self.style_manager)
+        return self._excel_merger
+        
+    def load_tasks(self):
+        """在后台线程中加载任务配置"""
+        self.task_manager.load_tasks_in_background()
+        self._wait_for_tasks()
+        
+    def _wait_for_tasks(self):
+        """等待任务配置加载完成，然后刷新任务列表并启动任务管理器"""
+        if not self.task_manager.loaded.is_set():
+            self.root.after(50, self._wait_for_tasks)
+            return
+        self.schedule_settings.refresh_task_list()
+        self.task_manager.start()
+        
     def create_gui(self):
         """创建图形界面"""
         # 创建主框架
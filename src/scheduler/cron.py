@@ -0,0 +1,128 @@
+"""
+Cron表达式模块
+解析五段式cron表达式（分 时 日 月 周）并计算下次触发时间
+"""
+from datetime import timedelta
+
+# 各字段的取值范围
+FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 6),  # 0为周日，7也表示周日
+)
+
+MONTH_NAMES = {name: i for i, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+WEEKDAY_NAMES = {name: i for i, name in enumerate(('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'))}
+
+# 常用别名
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+# 查找下次触发时间时最多向后查找的天数（覆盖闰年的2月29日）
+MAX_SEARCH_DAYS = 366 * 8
+
+
+class CronExpression:
+    def __init__(self, expression):
+        """
+        解析cron表达式
+
+        每段支持 *、数字、范围（1-5）、步长（*/15、1-10/2）、逗号分隔的列表，月份和星期可以用英文缩写（jan、mon）；
+        日和星期都不是 * 时，满足其一即触发（与常见的cron实现一致）
+
+        Args:
+            expression: 如 "30 8 * * 1-5"（工作日8:30），也支持 @daily、@hourly 等别名
+
+        Raises:
+            ValueError: 表达式无效
+        """
+        self.expression = expression.strip()
+        parts = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(parts) != 5:
+            raise ValueError(f"cron表达式应包含5段（分 时 日 月 周）：{expression}")
+
+        values = {}
+        for part, (name, low, high) in zip(parts, FIELDS):
+            names = MONTH_NAMES if name == 'month' else WEEKDAY_NAMES if name == 'weekday' else {}
+            values[name] = self._parse_field(part.lower(), low, 7 if name == 'weekday' else high, names)
+        values['weekday'] = {0 if d == 7 else d for d in values['weekday']}
+
+        self.minutes = sorted(values['minute'])
+        self.hours = sorted(values['hour'])
+        self.days = values['day']
+        self.months = values['month']
+        self.weekdays = values['weekday']
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(field, low, high, names):
+        """解析一段，返回允许的取值集合"""
+        result = set()
+        for item in field.split(','):
+            item, _, step = item.partition('/')
+            try:
+                step = int(step) if step else 1
+                if item == '*':
+                    start, end = low, high
+                else:
+                    start, _, end = item.partition('-')
+                    start = names[start] if start in names else int(start)
+                    end = (names[end] if end in names else int(end)) if end else (high if step > 1 else start)
+            except (KeyError, ValueError):
+                raise ValueError(f"cron表达式中的无效字段：{field}")
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"cron表达式中的字段超出范围（{low}-{high}）：{field}")
+            result.update(range(start, end + 1, step))
+        return result
+
+    def _day_matches(self, day):
+        """日期是否满足日、月、星期的条件"""
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        weekday_ok = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after):
+        """
+        严格晚于 after 的下一个触发时间（精确到分钟）
+
+        逐日查找满足条件的日期，再取当天第一个满足条件的时和分，不逐分钟遍历
+
+        Raises:
+            ValueError: 表达式永远不会触发（如2月30日）
+        """
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(MAX_SEARCH_DAYS):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"cron表达式永远不会触发：{self.expression}")
+
+    def upcoming(self, after, count=5):
+        """after 之后的 count 个触发时间"""
+        times = []
+        for _ in range(count):
+            after = self.next_after(after)
+            times.append(after)
+        return times
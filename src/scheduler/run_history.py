@@ -0,0 +1,237 @@
+"""
+运行历史模块
+把每次定时任务的执行记录到本地SQLite数据库，并按任务统计耗时趋势，找出耗时逐渐变长的任务
+"""
+import ctypes
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+
+# 运行历史数据库的默认路径
+HISTORY_DB = os.path.expanduser("~/.excel_merger/history.db")
+
+# 执行结果
+STATUSES = {
+    'success': '成功',
+    'failed': '失败',
+    'cancelled': '已取消',
+    'skipped': '已跳过',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    task_name TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    duration REAL NOT NULL,
+    rows INTEGER,
+    input_bytes INTEGER,
+    output_bytes INTEGER,
+    peak_memory INTEGER,
+    status TEXT NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_task_started ON runs (task_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_status_task_started ON runs (status, task_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at);
+"""
+
+
+class RunHistory:
+    def __init__(self, db_path=None):
+        """
+        初始化运行历史
+
+        每次操作单独打开连接，任务检查线程和界面线程可以同时使用
+
+        Args:
+            db_path: 数据库文件路径，None表示 ~/.excel_merger/history.db
+        """
+        self.db_path = db_path or HISTORY_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """打开数据库连接，查询结果按列名访问"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(self, task_id, task_name, started_at, finished_at, duration, status,
+               rows=None, input_bytes=None, output_bytes=None, peak_memory=None, error=None):
+        """
+        记录一次执行
+
+        Args:
+            started_at / finished_at: 开始 / 结束时间（datetime）
+            duration: 耗时（秒）
+            status: success/failed/cancelled
+            rows: 写出的数据行数
+            input_bytes / output_bytes: 输入文件 / 输出文件的总字节数
+            peak_memory: 执行期间整个进程的峰值内存（字节），同时运行的其他任务占用的内存也计算在内
+            error: 失败原因
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO runs (task_id, task_name, started_at, finished_at, duration, rows, "
+                "input_bytes, output_bytes, peak_memory, status, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, task_name, started_at.strftime("%Y-%m-%d %H:%M:%S"),
+                 finished_at.strftime("%Y-%m-%d %H:%M:%S"), duration, rows,
+                 input_bytes, output_bytes, peak_memory, status, error)
+            )
+
+    def recent_runs(self, task_id=None, limit=50):
+        """
+        最近的执行记录，按开始时间倒序
+
+        Returns:
+            list: 每条记录一个字典，键同数据表的列，另有 overlapped 表示执行期间是否有其他执行记录
+                （峰值内存是进程的峰值，这时包含了同时运行的任务）
+        """
+        query = """
+            SELECT r.*, EXISTS (
+                SELECT 1 FROM runs o
+                WHERE o.id != r.id AND o.started_at < r.finished_at AND o.finished_at > r.started_at
+            ) AS overlapped
+            FROM runs r {where} ORDER BY r.started_at DESC LIMIT ?
+        """
+        with closing(self._connect()) as conn:
+            if task_id is None:
+                rows = conn.execute(query.format(where=""), (limit,))
+            else:
+                rows = conn.execute(query.format(where="WHERE r.task_id = ?"), (task_id, limit))
+            return [dict(row, overlapped=bool(row['overlapped'])) for row in rows]
+
+    def duration_trends(self, window=5, threshold=1.2, min_increase=1.0):
+        """
+        按任务比较最近几次成功执行和此前几次的平均耗时
+
+        最近 window 次成功执行的平均耗时超过此前 2*window 次的 threshold 倍，
+        且至少多出 min_increase 秒时，认为该任务的耗时在逐渐变长。
+
+        Returns:
+            list: 每个任务一个字典，按耗时变化倍数从大到小排列
+                - task_id / task_name: 任务ID / 最近一次执行时的任务名称
+                - runs: 参与统计的成功执行次数
+                - recent_duration / baseline_duration: 最近 / 此前的平均耗时（秒），此前没有记录时为None
+                - recent_rows / baseline_rows: 最近 / 此前的平均行数
+                - ratio: 耗时变化倍数，无法比较时为None
+                - creeping: 耗时是否在逐渐变长
+                - failures: 全部记录中失败的次数
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                WITH ranked AS (
+                    SELECT task_id, task_name, duration, rows,
+                           ROW_NUMBER() OVER (PARTITION BY task_id ORDER BY started_at DESC) AS n
+                    FROM runs WHERE status = 'success'
+                )
+                SELECT task_id,
+                       MAX(CASE WHEN n = 1 THEN task_name END) AS task_name,
+                       COUNT(*) AS runs,
+                       AVG(CASE WHEN n <= :window THEN duration END) AS recent_duration,
+                       AVG(CASE WHEN n > :window THEN duration END) AS baseline_duration,
+                       AVG(CASE WHEN n <= :window THEN rows END) AS recent_rows,
+                       AVG(CASE WHEN n > :window THEN rows END) AS baseline_rows
+                FROM ranked WHERE n <= :window * 3
+                GROUP BY task_id
+                """,
+                {'window': window}
+            ).fetchall()
+            failures = dict(conn.execute(
+                "SELECT task_id, COUNT(*) FROM runs WHERE status = 'failed' GROUP BY task_id"
+            ).fetchall())
+
+        trends = []
+        for row in rows:
+            trend = dict(row)
+            recent, baseline = trend['recent_duration'], trend['baseline_duration']
+            trend['ratio'] = recent / baseline if baseline else None
+            trend['creeping'] = bool(
+                trend['ratio'] and trend['ratio'] >= threshold and recent - baseline >= min_increase
+            )
+            trend['failures'] = failures.get(trend['task_id'], 0)
+            trends.append(trend)
+        trends.sort(key=lambda t: t['ratio'] or 0, reverse=True)
+        return trends
+
+
+def current_memory():
+    """
+    当前进程占用的物理内存（字节）
+
+    Linux读取 /proc/self/statm，Windows调用 GetProcessMemoryInfo；
+    其他系统只能取得进程启动以来的峰值，无法取得时返回None
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        import resource
+        # macOS的 ru_maxrss 单位为字节
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+class PeakMemorySampler:
+    def __init__(self, interval=0.2):
+        """
+        在后台线程中定期采样进程内存，记录执行期间的峰值
+
+        采样的是整个进程，多个任务并行执行时（依赖图中的独立分支）得到的是这段时间内进程的峰值，
+        不是单个任务占用的内存
+
+        Args:
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        """采样一次并更新峰值"""
+        memory = current_memory()
+        if memory is not None and (self.peak is None or memory > self.peak):
+            self.peak = memory
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
@@ -0,0 +1,68 @@
+"""
+错峰调度模块
+给任务的触发时间加上随机延迟，并把使用同一存储（同一盘符、网络共享或挂载点）的任务错开执行，避免同时读写造成I/O高峰
+"""
+import os
+import random
+from datetime import timedelta
+
+
+def storage_key(path):
+    """
+    路径所在的存储
+
+    Windows下为盘符（c:）或网络共享（\\\\server\\share），其他系统为所在挂载点
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    drive, _ = os.path.splitdrive(path)
+    if drive:
+        return drive.lower()
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def jitter_offset(seed, nominal, jitter_minutes):
+    """
+    随机延迟（分钟）
+
+    由任务ID和计划触发时间决定，同一次触发重复计算的结果相同，不同任务、不同次触发的延迟各不相同
+    """
+    if jitter_minutes <= 0:
+        return 0
+    return random.Random(f"{seed}|{nominal:%Y%m%d%H%M}").randint(0, jitter_minutes)
+
+
+def staggered_time(nominal, seed, jitter_minutes=0, stagger_minutes=0, taken=(), max_delay=60):
+    """
+    计算实际触发时间
+
+    先加上随机延迟；再逐分钟后移，直到与 taken 中的每个时间都至少相隔 stagger_minutes 分钟。
+    后移超过 max_delay 分钟仍找不到空档时，使用加上随机延迟后的时间。
+
+    Args:
+        nominal: 计划触发时间
+        seed: 随机延迟的种子（任务ID）
+        jitter_minutes: 最大随机延迟（分钟）
+        stagger_minutes: 使用同一存储的任务之间的最小间隔（分钟）
+        taken: 使用同一存储的其他任务的触发时间
+        max_delay: 最多延迟的分钟数
+
+    Returns:
+        datetime: 实际触发时间
+    """
+    max_delay = max(max_delay, 0)
+    jittered = nominal + timedelta(minutes=min(jitter_offset(seed, nominal, jitter_minutes), max_delay))
+    if stagger_minutes <= 0 or not taken:
+        return jittered
+
+    gap = timedelta(minutes=stagger_minutes)
+    candidate = jittered
+    while candidate - nominal <= timedelta(minutes=max_delay):
+        if all(abs(candidate - other) >= gap for other in taken):
+            return candidate
+        candidate += timedelta(minutes=1)
+    return jittered
@@ -2,22 +2,39 @@
 定时任务配置模块
 处理定时任务的配置信息
 """
+import glob
 import json
 import os
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
+
+from .cron import CronExpression
+from .stagger import storage_key, staggered_time
+
+# 调度方式
+SCHEDULE_TYPES = ('daily', 'cron', 'interval', 'dependency')
+
+# 固定间隔调度的起点，触发时间为该时间加上间隔的整数倍，不随执行时间漂移
+INTERVAL_EPOCH = datetime(2000, 1, 1)
 
 class TaskConfig:
     def __init__(self, task_id=None):
         """初始化任务配置"""
         self.task_id = task_id or datetime.now().strftime("%Y%m%d_%H%M%S")
         self.task_name = ""
+        self.schedule_type = "daily"  # daily: 每天 schedule_time, cron: cron表达式, interval: 固定间隔, dependency: 只在上游任务完成后执行
         self.schedule_time = "00:00"  # 24小时制
+        self.cron = ""  # cron表达式（分 时 日 月 周）
+        self.interval_minutes = 60  # 固定间隔（分钟）
+        self.jitter_minutes = 2  # 最大随机延迟（分钟）
+        self.stagger_minutes = 3  # 与使用同一存储的其他任务至少相隔的分钟数
+        self.depends_on = []  # 上游任务ID，上游任务的输出作为本任务的输入，上游任务完成后立即执行本任务
         self.enabled = False
         self.last_run = None
         self.next_run = None
         
         # 文件相关配置
-        self.input_files = []  # [(文件路径, 选中的sheet)]
+        self.input_files = []  # [(文件路径, 选中的sheet：名称 / 名称列表 / {'regex': 正则表达式})]
         self.output_path = ""
         self.output_filename = ""
         
@@ -26,16 +43,45 @@ class TaskConfig:
             'merge_mode': "single",
             'sheet_name_mode': "auto",
             'custom_sheet_name': "Sheet1",
+            'join_keys': [],  # 横向合并的关键列
+            'join_how': "inner",  # inner/left/outer
             'start_row': "1",
             'end_row': "",
             'start_col': "A",
             'end_col': "",
+            'select_columns': [],  # 按表头名称选择的列，为空时读取列范围内所有列
+            'select_columns_order': "list",  # list: 按选择顺序输出, file: 按文件中的顺序输出
             'header_row': "1",
             'keep_header': True,
             'keep_styles': True,
             'keep_column_width': True,
             'keep_cell_format': True,
-            'keep_colors': True
+            'keep_colors': True,
+            'style_mode': "column",  # column: 按列设置样式, cell: 逐个单元格设置样式
+            'reader_engine': "auto",
+            'output_formats': [],  # 附加输出格式：parquet/feather/csv
+            'parquet_compression': "zstd",
+            'csv_chunksize': 100000,
+            'xlsx_compression': "default",  # default/fast/max/stored
+            'xlsx_minimal_styles': False,
+            'xlsx_shared_strings': "none",  # none: 不使用, lineage: 来源列, all: 所有文本
+            'xlsx_size_report': False,
+            'stage_output': False,  # 先写到本地临时目录，完成后原子地发布到输出目录
+            'latest_alias': False,  # 发布后更新 *_latest.xlsx 副本
+            'dedup_mode': "none",  # none: 不去重, row: 整行去重, key: 按关键列去重
+            'dedup_keys': [],
+            'dedup_keep': "first",  # first: 保留第一次出现, last: 保留最后一次出现
+            'filters': [],  # [{'column': 列名, 'op': 运算符, 'value': 比较值}]
+            'filter_combine': "and",  # and: 满足所有条件, or: 满足任一条件
+            'sort_keys': [],  # [{'column': 列名, 'ascending': 是否升序}]
+            'summary_mode': "none",  # none: 不汇总, sheet: 单独的sheet, file: 单独的文件
+            'summary_groups': ["数据来源"],
+            'summary_values': [],  # 为空时统计所有数值列
+            'summary_stats': ["count", "sum", "min", "max", "mean"],
+            'execution_mode': "auto",  # auto/memory/spill/pipeline
+            'memory_budget_mb': 1024,
+            'prefetch_files': 2,  # 解析当前文件时预读的后续文件数，0表示不预读
+            'profile': False  # 在cProfile和tracemalloc下执行，结果保存到 ~/.excel_merger/profiles/
         }
         
     def to_dict(self):
@@ -43,7 +89,13 @@ class TaskConfig:
         return {
             'task_id': self.task_id,
             'task_name': self.task_name,
+            'schedule_type': self.schedule_type,
             'schedule_time': self.schedule_time,
+            'cron': self.cron,
+            'interval_minutes': self.interval_minutes,
+            'jitter_minutes': self.jitter_minutes,
+            'stagger_minutes': self.stagger_minutes,
+            'depends_on': self.depends_on,
             'enabled': self.enabled,
             'last_run': self.last_run,
             'next_run': self.next_run,
@@ -58,7 +110,13 @@ class TaskConfig:
         """从字典创建配置"""
         task = cls(data.get('task_id'))
         task.task_name = data.get('task_name', '')
+        task.schedule_type = data.get('schedule_type', 'daily')
         task.schedule_time = data.get('schedule_time', '00:00')
+        task.cron = data.get('cron', '')
+        task.interval_minutes = data.get('interval_minutes', 60)
+        task.jitter_minutes = data.get('jitter_minutes', 2)
+        task.stagger_minutes = data.get('stagger_minutes', 3)
+        task.depends_on = data.get('depends_on', [])
         task.enabled = data.get('enabled', False)
         task.last_run = data.get('last_run')
         task.next_run = data.get('next_run')
@@ -89,6 +147,48 @@ class TaskConfig:
             print(f"加载任务配置失败：{str(e)}")
             return None
             
+    def merge_inputs(self, upstream_inputs=()):
+        """
+        合并参数
+        
+        Args:
+            upstream_inputs: 上游任务的输出 [(文件路径, 选中的sheet)]，排在任务自身的输入文件之后
+            
+        Returns:
+            tuple: (输入文件列表, 选中的sheet {文件路径: sheet}, 文件的sheet信息 {文件路径: {}})
+        """
+        inputs = list(self.input_files) + list(upstream_inputs)
+        input_files = [file_path for file_path, _ in inputs]
+        selected_sheets = {file_path: sheet for file_path, sheet in inputs}
+        file_sheets = {file_path: {} for file_path in input_files}
+        return input_files, selected_sheets, file_sheets
+        
+    def output_sheets(self):
+        """下游任务读取本任务输出时选择的sheet：合并结果所在的sheet，多Sheet模式下为汇总以外的所有sheet"""
+        mode = self.merge_config.get('merge_mode', "single")
+        if mode == "multiple":
+            summary_name = self.merge_config.get('summary_sheet_name') or "汇总"
+            return {'regex': f"^(?!{re.escape(summary_name)}$)"}
+        if self.merge_config.get('sheet_name_mode') == "custom":
+            return self.merge_config.get('custom_sheet_name') or "Sheet1"
+        return "合并结果"
+        
+    def latest_output(self):
+        """输出目录中本任务最近一次生成的输出文件，没有时返回None"""
+        if not self.output_path or not self.output_filename:
+            return None
+        pattern = os.path.join(glob.escape(self.output_path), f"{glob.escape(self.output_filename)}_*.xlsx")
+        # 只取带时间戳的输出文件，不包括latest副本和汇总文件
+        files = [path for path in glob.glob(pattern)
+                 if re.fullmatch(r"_\d{8}_\d{6}", os.path.basename(path)[len(self.output_filename):-len(".xlsx")])]
+        return max(files, key=os.path.getmtime) if files else None
+        
+    def new_output_file(self):
+        """按输出目录和文件名生成带时间戳的输出文件路径（目录不存在时创建）"""
+        os.makedirs(self.output_path, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.output_path, f"{self.output_filename}_{timestamp}.xlsx")
+        
     def validate_files(self):
         """验证文件是否有效"""
         valid_files = []
@@ -98,19 +198,90 @@ class TaskConfig:
         self.input_files = valid_files
         return len(valid_files) > 0
         
-    def update_next_run(self):
-        """更新下次运行时间"""
-        now = datetime.now()
-        time_parts = self.schedule_time.split(':')
-        next_run = now.replace(
-            hour=int(time_parts[0]),
-            minute=int(time_parts[1]),
-            second=0,
-            microsecond=0
-        )
+    def validate_schedule(self):
+        """
+        检查调度设置
         
-        # 如果当前时间已经过了今天的执行时间，设置为明天
-        if next_run <= now:
-            next_run = next_run.replace(day=next_run.day + 1)
+        Raises:
+            ValueError: 调度设置无效
+        """
+        if self.schedule_type not in SCHEDULE_TYPES:
+            raise ValueError(f"不支持的调度方式：{self.schedule_type}")
+        if self.schedule_type == "daily":
+            datetime.strptime(self.schedule_time, "%H:%M")
+        elif self.schedule_type == "dependency":
+            if not self.depends_on:
+                raise ValueError("上游完成后执行的任务必须设置上游任务")
+        elif self.schedule_type == "cron":
+            CronExpression(self.cron)
+        elif int(self.interval_minutes) < 1:
+            raise ValueError("执行间隔至少为1分钟")
+        if int(self.jitter_minutes) < 0 or int(self.stagger_minutes) < 0:
+            raise ValueError("随机延迟和错峰间隔不能为负数")
             
-        self.next_run = next_run.strftime("%Y-%m-%d %H:%M:00") 
\ No newline at end of file
+    def next_fire_time(self, after=None):
+        """严格晚于 after（默认为当前时间）的下一个计划触发时间，不含随机延迟和错峰；只在上游完成后执行的任务返回None"""
+        after = after or datetime.now()
+        if self.schedule_type == "dependency":
+            return None
+        if self.schedule_type == "cron":
+            return CronExpression(self.cron).next_after(after)
+        if self.schedule_type == "interval":
+            interval = timedelta(minutes=int(self.interval_minutes))
+            return INTERVAL_EPOCH + ((after - INTERVAL_EPOCH) // interval + 1) * interval
+        hour, minute = map(int, self.schedule_time.split(':'))
+        next_run = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        # 如果已经过了今天的执行时间，设置为明天
+        if next_run <= after:
+            next_run += timedelta(days=1)
+        return next_run
+        
+    def upcoming_runs(self, count=3, after=None):
+        """之后的 count 个计划触发时间"""
+        times = []
+        for _ in range(count):
+            after = self.next_fire_time(after)
+            if after is None:
+                break
+            times.append(after)
+        return times
+        
+    def schedule_description(self):
+        """调度方式的简短说明，用于任务列表"""
+        if self.schedule_type == "cron":
+            return f"cron: {self.cron}"
+        if self.schedule_type == "interval":
+            return f"每 {self.interval_minutes} 分钟"
+        if self.schedule_type == "dependency":
+            return "上游完成后"
+        return f"每天 {self.schedule_time}"
+        
+    def storage_keys(self):
+        """任务读写的存储（输入文件和输出目录所在的盘符、网络共享或挂载点）"""
+        paths = [file_path for file_path, _ in self.input_files]
+        if self.output_path:
+            paths.append(self.output_path)
+        return {storage_key(path) for path in paths}
+        
+    def update_next_run(self, taken=(), now=None):
+        """
+        更新下次运行时间
+        
+        在计划触发时间上加上随机延迟，并与 taken 中使用同一存储的其他任务的触发时间错开
+        
+        Args:
+            taken: 使用同一存储的其他任务的下次运行时间（datetime列表）
+            now: 当前时间，默认为 datetime.now()
+        """
+        nominal = self.next_fire_time(now)
+        if nominal is None:
+            self.next_run = None
+            return
+        max_delay = 60
+        if self.schedule_type == "interval":
+            # 延迟不超过间隔的一半，避免越过下一次触发
+            max_delay = min(max_delay, int(self.interval_minutes) // 2)
+        next_run = staggered_time(
+            nominal, self.task_id, int(self.jitter_minutes), int(self.stagger_minutes), taken, max_delay
+        )
+        self.next_run = next_run.strftime("%Y-%m-%d %H:%M:00")
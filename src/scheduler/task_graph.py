@@ -0,0 +1,155 @@
+"""
+任务依赖图模块
+按任务之间的依赖关系（下游任务以上游任务的输出作为输入）构建有向无环图，
+并行执行互不依赖的任务，上游任务的输出写出后立即启动下游任务
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 同时执行的任务数上限
+MAX_PARALLEL_TASKS = 4
+
+
+class TaskGraph:
+    def __init__(self, dependencies):
+        """
+        初始化任务依赖图
+
+        Args:
+            dependencies: {任务ID: [上游任务ID]}，没有依赖的任务可以不列出
+        """
+        self.dependencies = {task_id: list(dict.fromkeys(deps)) for task_id, deps in dependencies.items()}
+        self.dependents = {}  # {任务ID: [下游任务ID]}
+        for task_id, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents.setdefault(dep, []).append(task_id)
+
+    def upstream(self, task_id):
+        """任务的直接上游任务"""
+        return self.dependencies.get(task_id, [])
+
+    def downstream(self, task_id):
+        """任务的直接下游任务"""
+        return self.dependents.get(task_id, [])
+
+    def descendants(self, task_ids):
+        """给定任务及其所有（直接或间接）下游任务"""
+        result = set(task_ids)
+        queue = deque(task_ids)
+        while queue:
+            for dependent in self.downstream(queue.popleft()):
+                if dependent not in result:
+                    result.add(dependent)
+                    queue.append(dependent)
+        return result
+
+    def find_cycle(self):
+        """
+        查找依赖循环
+
+        Returns:
+            list: 构成循环的任务ID（首尾相同），没有循环时返回None
+        """
+        visiting, done = set(), set()
+        path = []
+
+        def visit(task_id):
+            visiting.add(task_id)
+            path.append(task_id)
+            for dep in self.upstream(task_id):
+                if dep in visiting:
+                    return path[path.index(dep):] + [dep]
+                if dep not in done:
+                    cycle = visit(dep)
+                    if cycle:
+                        return cycle
+            visiting.discard(task_id)
+            done.add(task_id)
+            path.pop()
+            return None
+
+        for task_id in list(self.dependencies):
+            if task_id not in done:
+                cycle = visit(task_id)
+                if cycle:
+                    return cycle
+        return None
+
+
+class DagRunner:
+    def __init__(self, graph, execute, max_workers=MAX_PARALLEL_TASKS, cancel_token=None):
+        """
+        初始化依赖图执行器
+
+        Args:
+            graph: TaskGraph
+            execute: 执行单个任务的函数 execute(任务ID, {上游任务ID: 上游任务的执行结果})，
+                返回执行结果，返回假值或抛出异常表示失败
+            max_workers: 同时执行的任务数上限
+            cancel_token: CancellationToken，取消后不再启动新的任务
+        """
+        self.graph = graph
+        self.execute = execute
+        self.max_workers = max_workers
+        self.cancel_token = cancel_token
+
+    def run(self, task_ids):
+        """
+        执行给定的任务
+
+        一个任务在本次执行的所有上游任务都成功后立即启动；上游任务失败时，其所有下游任务被跳过。
+        不在 task_ids 中的上游任务视为已完成（由 execute 使用其最近一次的输出）。
+
+        Returns:
+            dict: {任务ID: {'status': success/failed/skipped, 'result': 执行结果, 'error': 错误信息}}
+        """
+        task_ids = set(task_ids)
+        waiting = {task_id: set(self.graph.upstream(task_id)) & task_ids for task_id in task_ids}
+        outcomes = {}
+
+        def skip_descendants(task_id, reason):
+            for dependent in self.graph.descendants([task_id]) - {task_id}:
+                if dependent in task_ids and dependent not in outcomes:
+                    outcomes[dependent] = {'status': 'skipped', 'result': None, 'error': reason}
+
+        def run_one(task_id):
+            upstream = {dep: outcomes[dep]['result'] for dep in self.graph.upstream(task_id) if dep in outcomes}
+            return self.execute(task_id, upstream)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+
+            def submit_ready():
+                for task_id in sorted(task_ids):
+                    if task_id in outcomes or task_id in running.values() or waiting[task_id]:
+                        continue
+                    if self.cancel_token is not None and self.cancel_token.cancelled:
+                        outcomes[task_id] = {'status': 'skipped', 'result': None, 'error': "已取消"}
+                        skip_descendants(task_id, "已取消")
+                        continue
+                    running[pool.submit(run_one, task_id)] = task_id
+
+            submit_ready()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task_id = running.pop(future)
+                    try:
+                        result = future.result()
+                        error = None if result else "任务执行失败"
+                    except Exception as e:
+                        result, error = None, str(e)
+                    if error:
+                        outcomes[task_id] = {'status': 'failed', 'result': None, 'error': error}
+                        skip_descendants(task_id, f"上游任务 {task_id} 失败")
+                    else:
+                        outcomes[task_id] = {'status': 'success', 'result': result, 'error': None}
+                        for dependent in self.graph.downstream(task_id):
+                            if dependent in waiting:
+                                waiting[dependent].discard(task_id)
+                submit_ready()
+
+        # 剩下的任务的上游永远不会完成（依赖循环）
+        for task_id in task_ids - set(outcomes):
+            outcomes[task_id] = {'status': 'skipped', 'result': None, 'error': "任务依赖存在循环"}
+        return outcomes
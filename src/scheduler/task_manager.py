@@ -3,78 +3,157 @@
 处理定时任务的管理和执行
 """
 import os
-import json
 import threading
 import time
 from datetime import datetime
-from .task_config import TaskConfig
+from .task_store import TaskStore
+from .run_history import RunHistory, PeakMemorySampler
+from .task_graph import TaskGraph, DagRunner
+from ..excel.progress import CancellationToken
+from ..excel.parse_cache import PARSE_CACHE
 
 class TaskManager:
     def __init__(self, app):
         """初始化任务管理器"""
         self.app = app
-        self.tasks = {}  # {task_id: TaskConfig}
+        self.tasks = {}  # 已加载完整配置的任务 {task_id: TaskConfig}
         self.running = False
         self.thread = None
-        self.config_dir = os.path.expanduser("~/.excel_merger/tasks")
-        self.load_tasks()
+        self.cancel_token = None  # 正在执行的任务的取消令牌
+        self.config_dir = os.path.expanduser("~/.excel_merger/tasks")  # 旧版本的JSON任务目录
+        self.loaded = threading.Event()  # 任务存储是否已就绪
+        self.store = TaskStore()  # 任务存储（SQLite）
+        self.history = RunHistory()  # 每次执行的运行历史
+        self._schedule_lock = threading.Lock()  # 并行执行的任务依次计算下次运行时间，避免错峰时选中同一时间
+        self.queue = None  # 共享工作队列（WorkQueue），设置后到期的任务写入队列，由工作进程执行
+        self._merger = None  # 没有界面时使用的合并器
         
     def load_tasks(self):
-        """加载所有任务配置"""
+        """首次启动时把旧版本的JSON任务文件迁移到任务存储，任务配置在使用时才加载"""
         try:
-            # 确保配置目录存在
-            os.makedirs(self.config_dir, exist_ok=True)
-            
-            # 加载所有任务文件
-            for filename in os.listdir(self.config_dir):
-                if filename.endswith('.json'):
-                    file_path = os.path.join(self.config_dir, filename)
-                    task = TaskConfig.load_from_file(file_path)
-                    if task:
-                        self.tasks[task.task_id] = task
+            migrated = self.store.migrate_json(self.config_dir)
+            if migrated:
+                print(f"已将 {migrated} 个任务迁移到任务数据库")
         except Exception as e:
-            print(f"加载任务配置失败：{str(e)}")
+            print(f"迁移任务配置失败：{str(e)}")
+        finally:
+            self.loaded.set()
             
-    def save_tasks(self):
-        """保存所有任务配置"""
+    def load_tasks_in_background(self):
+        """在后台线程中加载任务配置，完成后设置 loaded"""
+        threading.Thread(target=self.load_tasks, daemon=True).start()
+        
+    def save_task(self, task):
+        """保存一个任务"""
         try:
-            os.makedirs(self.config_dir, exist_ok=True)
-            for task_id, task in self.tasks.items():
-                file_path = os.path.join(self.config_dir, f"{task_id}.json")
-                task.save_to_file(file_path)
+            self.store.save(task)
         except Exception as e:
             print(f"保存任务配置失败：{str(e)}")
             
     def add_task(self, task):
         """添加新任务"""
         self.tasks[task.task_id] = task
-        self.save_tasks()
+        self.save_task(task)
         
     def remove_task(self, task_id):
         """删除任务"""
-        if task_id in self.tasks:
-            del self.tasks[task_id]
-            # 删除配置文件
-            file_path = os.path.join(self.config_dir, f"{task_id}.json")
-            try:
-                os.remove(file_path)
-            except:
-                pass
-            self.save_tasks()
+        self.tasks.pop(task_id, None)
+        try:
+            self.store.delete(task_id)
+        except Exception as e:
+            print(f"删除任务配置失败：{str(e)}")
+        # 删除旧版本遗留的配置文件
+        file_path = os.path.join(self.config_dir, f"{task_id}.json")
+        try:
+            os.remove(file_path)
+        except:
+            pass
             
     def update_task(self, task):
         """更新任务"""
-        if task.task_id in self.tasks:
+        if self.get_task(task.task_id) is not None:
             self.tasks[task.task_id] = task
-            self.save_tasks()
+            self.save_task(task)
             
     def get_task(self, task_id):
-        """获取任务"""
-        return self.tasks.get(task_id)
+        """获取任务，首次获取时从任务存储加载完整配置"""
+        task = self.tasks.get(task_id)
+        if task is None:
+            try:
+                task = self.store.load(task_id)
+            except Exception as e:
+                print(f"加载任务配置失败：{str(e)}")
+            if task is not None:
+                task = self.tasks.setdefault(task_id, task)
+        return task
+        
+    def schedule_next_run(self, task, now=None):
+        """计算任务的下次运行时间，与使用同一存储的其他已启用任务错开"""
+        keys = task.storage_keys()
+        try:
+            taken = [
+                datetime.strptime(next_run, "%Y-%m-%d %H:%M:00")
+                for next_run, other_keys in self.store.scheduled_runs(task.task_id) if keys & other_keys
+            ]
+        except Exception as e:
+            print(f"读取任务列表失败：{str(e)}")
+            taken = []
+        task.update_next_run(taken, now)
+        
+    @property
+    def merger(self):
+        """合并器：有界面时使用界面的合并器，工作进程中首次使用时创建"""
+        if self.app is not None:
+            return self.app.excel_merger
+        if self._merger is None:
+            from ..excel.merger import ExcelMerger
+            from ..excel.style_manager import ExcelStyleManager
+            self._merger = ExcelMerger(ExcelStyleManager())
+        return self._merger
+        
+    def merge_task(self, task, progress_callback=None, cancel_token=None, upstream_inputs=()):
+        """
+        按任务配置执行合并
+        
+        Args:
+            task: TaskConfig对象
+            progress_callback: 进度回调
+            cancel_token: CancellationToken，用于取消正在执行的任务
+            upstream_inputs: 上游任务的输出 [(文件路径, 选中的sheet)]，作为额外的输入文件
+            
+        Returns:
+            dict: 合并结果，包含输出文件路径 output_file
+        """
+        input_files, selected_sheets, file_sheets = task.merge_inputs(upstream_inputs)
+        output_file = task.new_output_file()
+        
+        result = self.merger.merge_files(
+            input_files,
+            output_file,
+            selected_sheets,
+            file_sheets,
+            task.merge_config,
+            progress_callback=progress_callback,
+            cancel_token=cancel_token
+        )
+        if not result['success']:
+            raise Exception(result['error'])
+            
+        result['output_file'] = output_file
+        return result
+        
+    def get_task_summaries(self):
+        """获取所有任务的概要（名称、执行时间、状态、上次和下次执行时间），不加载完整配置"""
+        try:
+            return self.store.summaries()
+        except Exception as e:
+            print(f"读取任务列表失败：{str(e)}")
+            return []
         
     def get_all_tasks(self):
         """获取所有任务"""
-        return list(self.tasks.values())
+        tasks = (self.get_task(summary['task_id']) for summary in self.get_task_summaries())
+        return [task for task in tasks if task is not None]
         
     def start(self):
         """启动任务管理器"""
@@ -89,6 +168,9 @@ class TaskManager:
             return
             
         self.running = False
+        # 取消正在执行的合并，已写出的部分文件会被删除
+        if self.cancel_token:
+            self.cancel_token.cancel()
         if self.thread:
             try:
                 # 给线程最多3秒的时间来结束
@@ -107,31 +189,211 @@ class TaskManager:
         while self.running:
             now = datetime.now()
             
-            # 检查每个任务
-            for task in self.tasks.values():
-                if task.enabled and task.next_run:
-                    next_run = datetime.strptime(task.next_run, "%Y-%m-%d %H:%M:00")
-                    if now >= next_run:
-                        self._execute_task(task)
+            # 检查到了执行时间的任务（按索引查询，不加载其他任务）
+            try:
+                due_task_ids = self.store.due_task_ids(now)
+            except Exception as e:
+                print(f"读取任务列表失败：{str(e)}")
+                due_task_ids = []
+            if due_task_ids and self.queue is not None:
+                self._enqueue_pipeline(due_task_ids)
+            elif due_task_ids:
+                self._run_pipeline(due_task_ids)
                         
             # 每分钟检查一次
             time.sleep(60)
             
-    def _execute_task(self, task):
-        """执行任务"""
+    def _pipeline_tasks(self, task_ids):
+        """
+        到期的任务及其所有已启用的下游任务
+        
+        Returns:
+            tuple: (TaskGraph, {任务ID: TaskConfig})
+        """
+        try:
+            graph = TaskGraph(self.store.dependencies())
+        except Exception as e:
+            print(f"读取任务依赖失败：{str(e)}")
+            graph = TaskGraph({})
+            
+        tasks = {}
+        for task_id in graph.descendants(task_ids):
+            task = self.get_task(task_id)
+            # 到期的任务已由查询确认启用；下游任务只执行已启用的
+            if task and task.enabled:
+                tasks[task_id] = task
+        return graph, tasks
+        
+    def _enqueue_pipeline(self, task_ids):
+        """
+        把到期的任务及其所有已启用的下游任务写入共享工作队列，并计算到期任务的下次运行时间
+        
+        同一批次中的依赖关系随任务一起写入，由工作进程按依赖顺序执行
+        """
+        graph, tasks = self._pipeline_tasks(task_ids)
+        due = [tasks[task_id] for task_id in task_ids if task_id in tasks]
+        if not due:
+            return
+        upstream_tasks = {}
+        for task in tasks.values():
+            for dep_id in task.depends_on:
+                dep = tasks.get(dep_id) or self.get_task(dep_id)
+                if dep is not None:
+                    upstream_tasks[dep_id] = dep
         try:
-            # 验证文件
-            if not task.validate_files():
-                raise Exception("任务包含的文件不存在")
+            self.queue.enqueue(tasks, graph, upstream_tasks, min(task.next_run for task in due))
+        except Exception as e:
+            print(f"写入工作队列失败：{str(e)}")
+            return
+        print(f"已将 {len(tasks)} 个任务写入工作队列")
+        for task in due:
+            with self._schedule_lock:
+                self.schedule_next_run(task)
+                self.save_task(task)
+            
+    def _run_pipeline(self, task_ids):
+        """
+        执行到期的任务及其所有已启用的下游任务
+        
+        按依赖关系并行执行：互不依赖的任务同时执行，下游任务在本次执行的上游任务全部成功后立即启动，
+        上游任务失败时跳过其下游任务
+        """
+        graph, tasks = self._pipeline_tasks(task_ids)
+        shared = self._retain_shared_inputs(tasks)
+        
+        def execute(task_id, upstream):
+            try:
+                return self._execute_task(tasks[task_id], upstream, self.cancel_token)
+            finally:
+                PARSE_CACHE.release(shared.pop(task_id, ()))
                 
-            # 执行合并
-            self.app.merge_handler.merge_files_with_config(task)
+        self.cancel_token = CancellationToken()
+        try:
+            runner = DagRunner(graph, execute, cancel_token=self.cancel_token)
+            outcomes = runner.run(tasks)
+        finally:
+            self.cancel_token = None
+            # 被跳过的任务不会执行，释放其登记的文件
+            for files in shared.values():
+                PARSE_CACHE.release(files)
+            
+        # 被跳过的任务也记录到运行历史
+        for task_id, outcome in outcomes.items():
+            if outcome['status'] == 'skipped':
+                now = datetime.now()
+                try:
+                    self.history.record(task_id, tasks[task_id].task_name, now, now, 0.0, 'skipped',
+                                        error=outcome['error'])
+                except Exception as e:
+                    print(f"记录运行历史失败：{str(e)}")
+                    
+    @staticmethod
+    def _retain_shared_inputs(tasks):
+        """
+        在解析缓存中登记被多个任务读取的输入文件，这些任务共用每个sheet的一次解析结果
+        
+        只被一个任务读取的文件不缓存，解析结果在读取后即可释放
+        
+        Returns:
+            dict: {任务ID: 登记的文件列表}，任务结束后逐个释放
+        """
+        users = {}
+        for task_id, task in tasks.items():
+            for file_path in dict.fromkeys(file_path for file_path, _ in task.input_files):
+                users.setdefault(os.path.normcase(os.path.abspath(file_path)), []).append((task_id, file_path))
+        shared = {}
+        for entries in users.values():
+            if len(entries) > 1:
+                for task_id, file_path in entries:
+                    shared.setdefault(task_id, []).append(file_path)
+        for files in shared.values():
+            PARSE_CACHE.retain(files)
+        return shared
+        
+    def upstream_inputs(self, task, upstream_results=None, upstream_tasks=None):
+        """
+        上游任务的输出文件，作为任务的额外输入
+        
+        Args:
+            upstream_results: 本次执行中已完成的上游任务的合并结果 {任务ID: 结果}，
+                其余上游任务使用其输出目录中最近一次的输出文件
+            upstream_tasks: 上游任务的配置 {任务ID: TaskConfig}，None表示从任务存储加载
+                
+        Returns:
+            list: [(文件路径, 选中的sheet)]
+        """
+        upstream_results = upstream_results or {}
+        inputs = []
+        for dep_id in task.depends_on:
+            dep = self.get_task(dep_id) if upstream_tasks is None else upstream_tasks.get(dep_id)
+            if dep is None:
+                raise Exception(f"上游任务不存在：{dep_id}")
+            result = upstream_results.get(dep_id)
+            output_file = result['output_file'] if result else dep.latest_output()
+            if not output_file or not os.path.exists(output_file):
+                raise Exception(f"上游任务 {dep.task_name or dep_id} 还没有输出文件")
+            inputs.append((output_file, dep.output_sheets()))
+        return inputs
+            
+    def _execute_task(self, task, upstream_results=None, cancel_token=None, upstream_tasks=None,
+                      update_schedule=True):
+        """
+        执行任务，并把耗时、行数、输入输出大小、进程峰值内存和执行结果记录到运行历史
+        
+        Args:
+            upstream_results: 本次执行中已完成的上游任务的合并结果 {任务ID: 结果}
+            cancel_token: CancellationToken
+            upstream_tasks: 上游任务的配置 {任务ID: TaskConfig}，None表示从任务存储加载
+            update_schedule: 是否更新任务的上次、下次运行时间并保存（工作进程执行队列中的任务时不更新）
+            
+        Returns:
+            dict: 合并结果
+            
+        Raises:
+            Exception: 执行失败或被取消
+        """
+        started_at = datetime.now()
+        started = time.perf_counter()
+        run = {'status': 'success', 'rows': None, 'input_bytes': None, 'output_bytes': None, 'error': None}
+        sampler = PeakMemorySampler()
+        try:
+            with sampler:
+                # 验证文件
+                upstream = self.upstream_inputs(task, upstream_results, upstream_tasks)
+                if not task.validate_files() and not upstream:
+                    raise Exception("任务包含的文件不存在")
+                run['input_bytes'] = sum(
+                    os.path.getsize(file_path) for file_path, _ in list(task.input_files) + upstream
+                )
+                    
+                # 执行合并
+                result = self.merge_task(task, cancel_token=cancel_token, upstream_inputs=upstream)
+                run['rows'] = result.get('rows')
+                run['output_bytes'] = sum(
+                    os.path.getsize(path) for path in [result['output_file']] + result.get('outputs', [])
+                    if os.path.exists(path)
+                )
             
             # 更新任务状态
-            task.last_run = datetime.now().strftime("%Y-%m-%d %H:%M:00")
-            task.update_next_run()
-            self.save_tasks()
+            if update_schedule:
+                task.last_run = datetime.now().strftime("%Y-%m-%d %H:%M:00")
+                with self._schedule_lock:
+                    self.schedule_next_run(task)
+                    self.save_task(task)
             
         except Exception as e:
+            run['status'] = 'cancelled' if cancel_token and cancel_token.cancelled else 'failed'
+            run['error'] = str(e)
             print(f"执行任务失败：{str(e)}")
-            # 可以添加错误通知机制 
\ No newline at end of file
+            # 可以添加错误通知机制
+            raise
+            
+        finally:
+            try:
+                self.history.record(
+                    task.task_id, task.task_name, started_at, datetime.now(), time.perf_counter() - started,
+                    peak_memory=sampler.peak, **run
+                )
+            except Exception as e:
+                print(f"记录运行历史失败：{str(e)}")
+        return result
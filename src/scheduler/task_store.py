@@ -0,0 +1,219 @@
+"""
+任务存储模块
+把定时任务保存在SQLite数据库（WAL模式）中，每次只写一个任务，按需加载任务配置，
+并在首次启动时把旧版本的JSON任务文件迁移到数据库
+"""
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+from .task_config import TaskConfig
+
+# 任务数据库的默认路径
+TASK_DB = os.path.expanduser("~/.excel_merger/tasks.db")
+
+# 旧版本保存任务JSON文件的目录
+LEGACY_TASK_DIR = os.path.expanduser("~/.excel_merger/tasks")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    task_name TEXT,
+    schedule_time TEXT,
+    enabled INTEGER NOT NULL DEFAULT 0,
+    last_run TEXT,
+    next_run TEXT,
+    data TEXT NOT NULL,
+    schedule_text TEXT,
+    storage_keys TEXT,
+    depends_on TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_enabled_next_run ON tasks (enabled, next_run);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 后来增加的列 {列名: 从任务配置计算列值的函数}，打开旧数据库时补齐
+ADDED_COLUMNS = {
+    'schedule_text': lambda task: task.schedule_description(),
+    'storage_keys': lambda task: "\n".join(sorted(task.storage_keys())),
+    'depends_on': lambda task: "\n".join(task.depends_on),
+}
+
+# 任务数据行的列，顺序与 _row() 一致
+ROW_COLUMNS = (
+    "task_id", "task_name", "schedule_time", "enabled", "last_run", "next_run", "data", *ADDED_COLUMNS
+)
+
+# 任务列表显示用的列，不需要解析完整配置
+SUMMARY_COLUMNS = ("task_id", "task_name", "schedule_time", "schedule_text", "enabled", "last_run", "next_run")
+
+
+class TaskStore:
+    def __init__(self, db_path=None):
+        """
+        初始化任务存储
+
+        每次操作单独打开连接并在一个事务中完成；WAL模式下读取不会被写入阻塞，多个进程同时写入时排队等待
+
+        Args:
+            db_path: 数据库文件路径，None表示 ~/.excel_merger/tasks.db
+        """
+        self.db_path = db_path or TASK_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._add_columns(conn)
+            
+    @staticmethod
+    def _add_columns(conn):
+        """给旧数据库补齐后来增加的列，并按已保存的任务配置填充"""
+        existing = {row['name'] for row in conn.execute("PRAGMA table_info(tasks)")}
+        missing = [column for column in ADDED_COLUMNS if column not in existing]
+        if not missing:
+            return
+        with conn:
+            for column in missing:
+                conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} TEXT")
+            for row in conn.execute("SELECT task_id, data FROM tasks").fetchall():
+                task = TaskConfig.from_dict(json.loads(row['data']))
+                conn.execute(
+                    f"UPDATE tasks SET {', '.join(f'{column} = ?' for column in missing)} WHERE task_id = ?",
+                    [ADDED_COLUMNS[column](task) for column in missing] + [row['task_id']]
+                )
+
+    def _connect(self):
+        """打开数据库连接，查询结果按列名访问"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _row(task):
+        """任务对应的数据行"""
+        return (
+            task.task_id, task.task_name, task.schedule_time, int(bool(task.enabled)),
+            task.last_run, task.next_run, json.dumps(task.to_dict(), ensure_ascii=False),
+            *(compute(task) for compute in ADDED_COLUMNS.values())
+        )
+
+    def save(self, task):
+        """新增或更新一个任务"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT INTO tasks ({', '.join(ROW_COLUMNS)}) VALUES ({', '.join('?' * len(ROW_COLUMNS))}) "
+                f"ON CONFLICT(task_id) DO UPDATE SET "
+                f"{', '.join(f'{column} = excluded.{column}' for column in ROW_COLUMNS[1:])}",
+                self._row(task)
+            )
+
+    def delete(self, task_id):
+        """删除任务"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def load(self, task_id):
+        """加载任务的完整配置，不存在时返回None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return TaskConfig.from_dict(json.loads(row['data'])) if row else None
+
+    def summaries(self):
+        """
+        所有任务的概要，按任务ID（创建时间）排列
+
+        Returns:
+            list: 每个任务一个字典，键为 task_id/task_name/schedule_time/schedule_text/enabled/last_run/next_run
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM tasks ORDER BY task_id").fetchall()
+        summaries = [dict(row) for row in rows]
+        for summary in summaries:
+            summary['enabled'] = bool(summary['enabled'])
+        return summaries
+
+    def due_task_ids(self, now):
+        """
+        已启用且到了执行时间的任务
+
+        Args:
+            now: 当前时间（datetime）
+
+        Returns:
+            list: 任务ID列表
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT task_id FROM tasks WHERE enabled = 1 AND next_run IS NOT NULL AND next_run <= ?",
+                (now.strftime("%Y-%m-%d %H:%M:%S"),)
+            ).fetchall()
+        return [row['task_id'] for row in rows]
+
+    def scheduled_runs(self, exclude_task_id=None):
+        """
+        已启用任务的下次运行时间和使用的存储，用于错开使用同一存储的任务
+
+        Returns:
+            list: [(下次运行时间字符串, 存储集合)]
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT next_run, storage_keys FROM tasks "
+                "WHERE enabled = 1 AND next_run IS NOT NULL AND task_id IS NOT ?",
+                (exclude_task_id,)
+            ).fetchall()
+        return [(row['next_run'], set(filter(None, (row['storage_keys'] or "").split("\n")))) for row in rows]
+        
+    def dependencies(self):
+        """
+        所有设置了上游任务的任务
+
+        Returns:
+            dict: {任务ID: [上游任务ID]}
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT task_id, depends_on FROM tasks WHERE depends_on IS NOT NULL AND depends_on != ''"
+            ).fetchall()
+        return {row['task_id']: row['depends_on'].split("\n") for row in rows}
+        
+    def migrate_json(self, task_dir=None):
+        """
+        把旧版本的JSON任务文件导入数据库，只在首次启动时执行一次
+
+        迁移在一个写事务中完成，多个进程同时启动时只有一个会执行；原JSON文件保留作为备份
+
+        Returns:
+            int: 迁移的任务数
+        """
+        task_dir = task_dir or LEGACY_TASK_DIR
+        with closing(self._connect()) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                    conn.execute("COMMIT")
+                    return 0
+                migrated = 0
+                if os.path.isdir(task_dir):
+                    for filename in sorted(os.listdir(task_dir)):
+                        if not filename.endswith('.json'):
+                            continue
+                        task = TaskConfig.load_from_file(os.path.join(task_dir, filename))
+                        if task:
+                            cursor = conn.execute(
+                                f"INSERT OR IGNORE INTO tasks ({', '.join(ROW_COLUMNS)}) "
+                                f"VALUES ({', '.join('?' * len(ROW_COLUMNS))})",
+                                self._row(task)
+                            )
+                            migrated += cursor.rowcount
+                conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(migrated),))
+                conn.execute("COMMIT")
+                return migrated
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
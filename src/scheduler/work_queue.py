@@ -0,0 +1,353 @@
+"""
+工作队列模块
+把到期的任务写入共享存储上的SQLite队列，由一台或多台主机上的多个工作进程领取执行；
+工作进程以租约持有任务并定期续约，进程退出或失去响应后租约过期，任务由其他工作进程接管
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+
+from .task_config import TaskConfig
+from ..excel.progress import CancellationToken
+
+# 租约时长（秒），工作进程每隔三分之一租约续约一次
+LEASE_SECONDS = 120
+
+# 同一任务因工作进程失去响应被接管的次数上限，超过后标记为失败（避免反复拖垮工作进程的任务无限重试）
+MAX_ATTEMPTS = 3
+
+# 队列为空时工作进程检查新任务的间隔（秒）
+POLL_INTERVAL = 5
+
+# 任务状态
+JOB_STATUSES = {
+    'queued': '等待中',
+    'running': '执行中',
+    'done': '已完成',
+    'failed': '失败',
+    'skipped': '已跳过',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_key TEXT NOT NULL UNIQUE,
+    task_id TEXT NOT NULL,
+    task_name TEXT,
+    data TEXT NOT NULL,
+    upstream TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    output_file TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_expires);
+CREATE TABLE IF NOT EXISTS job_deps (
+    job_id INTEGER NOT NULL,
+    dep_job_id INTEGER NOT NULL,
+    PRIMARY KEY (job_id, dep_job_id)
+);
+CREATE INDEX IF NOT EXISTS idx_job_deps_dep ON job_deps (dep_job_id);
+"""
+
+# 可领取的任务：等待中或租约已过期，且同一批次中的上游任务都已完成
+CLAIMABLE = """
+SELECT * FROM jobs
+WHERE (status = 'queued' OR (status = 'running' AND lease_expires < ?))
+  AND NOT EXISTS (
+      SELECT 1 FROM job_deps d JOIN jobs u ON u.job_id = d.dep_job_id
+      WHERE d.job_id = jobs.job_id AND u.status != 'done'
+  )
+ORDER BY job_id LIMIT 1
+"""
+
+# 把任务的所有（直接或间接）下游任务标记为跳过
+SKIP_DEPENDENTS = """
+WITH RECURSIVE below(job_id) AS (
+    SELECT job_id FROM job_deps WHERE dep_job_id = ?
+    UNION
+    SELECT d.job_id FROM job_deps d JOIN below b ON d.dep_job_id = b.job_id
+)
+UPDATE jobs SET status = 'skipped', error = ?, finished_at = ?
+WHERE job_id IN (SELECT job_id FROM below) AND status = 'queued'
+"""
+
+
+def default_worker_id():
+    """工作进程的默认名称：主机名-进程号"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, db_path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        """
+        初始化工作队列
+
+        队列文件通常位于多台主机都能访问的共享存储上。网络文件系统不支持WAL模式需要的共享内存，
+        因此使用默认的回滚日志模式；领取任务在 BEGIN IMMEDIATE 事务中完成，同一任务只会被一个工作进程领取。
+        租约按各主机的系统时间计算，主机之间的时钟偏差应远小于租约时长。
+
+        Args:
+            db_path: 队列数据库文件路径
+            lease_seconds: 租约时长（秒）
+            max_attempts: 同一任务最多被领取的次数
+        """
+        self.db_path = os.path.abspath(os.path.expanduser(db_path))
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """打开数据库连接，查询结果按列名访问"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _now_text():
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def enqueue(self, tasks, graph, upstream_tasks, batch_key):
+        """
+        把一批任务写入队列
+
+        同一批次中的依赖关系保存为任务之间的依赖，下游任务在上游任务完成后才能被领取；
+        不在本批次中的上游任务随任务一起保存其配置，执行时使用其最近一次的输出。
+        任务以"任务ID@批次"为唯一键，多个调度进程重复写入同一批次时只保留一份。
+
+        Args:
+            tasks: {任务ID: TaskConfig}
+            graph: TaskGraph
+            upstream_tasks: {上游任务ID: TaskConfig}
+            batch_key: 批次标识（到期任务的计划执行时间）
+
+        Returns:
+            dict: {任务ID: 队列中的任务编号}
+        """
+        now = self._now_text()
+        with closing(self._connect()) as conn, conn:
+            job_ids = {}
+            for task_id, task in tasks.items():
+                run_key = f"{task_id}@{batch_key}"
+                upstream = [upstream_tasks[dep].to_dict() for dep in task.depends_on if dep in upstream_tasks]
+                conn.execute(
+                    "INSERT OR IGNORE INTO jobs (run_key, task_id, task_name, data, upstream, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_key, task_id, task.task_name, json.dumps(task.to_dict(), ensure_ascii=False),
+                     json.dumps(upstream, ensure_ascii=False), now)
+                )
+                job_ids[task_id] = conn.execute(
+                    "SELECT job_id FROM jobs WHERE run_key = ?", (run_key,)
+                ).fetchone()['job_id']
+            for task_id in tasks:
+                for dep in graph.upstream(task_id):
+                    if dep in job_ids:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO job_deps (job_id, dep_job_id) VALUES (?, ?)",
+                            (job_ids[task_id], job_ids[dep])
+                        )
+        return job_ids
+
+    def claim(self, worker_id):
+        """
+        领取一个可以执行的任务
+
+        租约过期的任务由本进程接管；已被领取 max_attempts 次的任务不再接管，标记为失败并跳过其下游任务
+
+        Returns:
+            dict: 任务（data为任务配置，upstream为上游任务配置列表，attempts为本次领取的序号），没有可执行的任务时返回None
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = conn.execute(CLAIMABLE, (now,)).fetchone()
+                    if row is None or row['attempts'] < self.max_attempts:
+                        break
+                    error = f"工作进程 {row['worker']} 失去响应，已执行 {row['attempts']} 次"
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_expires = NULL "
+                        "WHERE job_id = ?",
+                        (error, self._now_text(), row['job_id'])
+                    )
+                    conn.execute(SKIP_DEPENDENTS, (row['job_id'], f"上游任务 {row['task_name']} 失败", self._now_text()))
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, "
+                        "attempts = attempts + 1, started_at = ? WHERE job_id = ?",
+                        (worker_id, now + self.lease_seconds, self._now_text(), row['job_id'])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job.update(
+            worker=worker_id, attempts=row['attempts'] + 1,
+            data=json.loads(row['data']), upstream=json.loads(row['upstream'])
+        )
+        return job
+
+    def _update_lease(self, job, assignments, params, skip_dependents=False):
+        """只在本进程仍持有租约时更新任务，返回是否更新成功"""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments} "
+                f"WHERE job_id = ? AND worker = ? AND attempts = ? AND status = 'running'",
+                (*params, job['job_id'], job['worker'], job['attempts'])
+            )
+            if cursor.rowcount and skip_dependents:
+                conn.execute(SKIP_DEPENDENTS, (job['job_id'], f"上游任务 {job['task_name']} 失败", self._now_text()))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job):
+        """续约，租约已被其他工作进程接管时返回False"""
+        return self._update_lease(job, "lease_expires = ?", (time.time() + self.lease_seconds,))
+
+    def complete(self, job, output_file):
+        """标记任务完成，租约已被接管时返回False（结果以接管的进程为准）"""
+        return self._update_lease(
+            job, "status = 'done', output_file = ?, finished_at = ?, lease_expires = NULL",
+            (output_file, self._now_text())
+        )
+
+    def fail(self, job, error):
+        """标记任务失败并跳过其下游任务"""
+        return self._update_lease(
+            job, "status = 'failed', error = ?, finished_at = ?, lease_expires = NULL",
+            (error, self._now_text()), skip_dependents=True
+        )
+
+    def release(self, job):
+        """放弃执行（工作进程退出时），任务立即回到队列由其他工作进程领取"""
+        return self._update_lease(
+            job, "status = 'queued', worker = NULL, lease_expires = NULL, attempts = attempts - 1", ()
+        )
+
+    def upstream_outputs(self, job_id):
+        """
+        同一批次中已完成的上游任务的输出文件
+
+        Returns:
+            dict: {上游任务ID: 输出文件路径}
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT u.task_id, u.output_file FROM job_deps d JOIN jobs u ON u.job_id = d.dep_job_id "
+                "WHERE d.job_id = ? AND u.status = 'done'",
+                (job_id,)
+            ).fetchall()
+        return {row['task_id']: row['output_file'] for row in rows}
+
+    def status_counts(self):
+        """各状态的任务数 {状态: 数量}"""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class QueueWorker:
+    def __init__(self, task_manager, queue, worker_id=None, poll_interval=POLL_INTERVAL):
+        """
+        初始化工作进程
+
+        Args:
+            task_manager: TaskManager，用于执行合并并记录运行历史（不需要界面）
+            queue: WorkQueue
+            worker_id: 工作进程名称，None表示 主机名-进程号
+            poll_interval: 队列为空时检查新任务的间隔（秒）
+        """
+        self.task_manager = task_manager
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+        self.cancel_token = None  # 正在执行的任务的取消令牌
+
+    def stop(self):
+        """停止领取新任务，并取消正在执行的任务（任务回到队列）"""
+        self.stopped.set()
+        if self.cancel_token:
+            self.cancel_token.cancel()
+
+    def run(self):
+        """领取并执行任务，直到调用 stop()"""
+        print(f"工作进程 {self.worker_id} 已启动，队列：{self.queue.db_path}")
+        while not self.stopped.is_set():
+            try:
+                job = self.queue.claim(self.worker_id)
+            except Exception as e:
+                print(f"领取任务失败：{str(e)}")
+                job = None
+            if job is None:
+                self.stopped.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def _keep_lease(self, job, done, lease_lost):
+        """定期续约，租约被接管时取消正在执行的合并"""
+        while not done.wait(self.queue.lease_seconds / 3):
+            try:
+                if self.queue.heartbeat(job):
+                    continue
+            except Exception as e:
+                # 暂时无法访问共享存储时继续执行，租约过期前恢复即可
+                print(f"续约失败：{str(e)}")
+                continue
+            lease_lost.set()
+            self.cancel_token.cancel()
+            return
+
+    def run_job(self, job):
+        """执行领取的任务，并把结果写回队列"""
+        task = TaskConfig.from_dict(job['data'])
+        print(f"开始执行任务：{task.task_name or task.task_id}（第 {job['attempts']} 次）")
+        self.cancel_token = CancellationToken()
+        done, lease_lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._keep_lease, args=(job, done, lease_lost), daemon=True)
+        heartbeat.start()
+        try:
+            upstream_tasks = {data['task_id']: TaskConfig.from_dict(data) for data in job['upstream']}
+            upstream_results = {
+                task_id: {'output_file': output_file}
+                for task_id, output_file in self.queue.upstream_outputs(job['job_id']).items()
+            }
+            result = self.task_manager._execute_task(
+                task, upstream_results, self.cancel_token,
+                upstream_tasks=upstream_tasks, update_schedule=False
+            )
+        except Exception as e:
+            result, error = None, str(e)
+        finally:
+            done.set()
+            heartbeat.join()
+            self.cancel_token = None
+
+        try:
+            if lease_lost.is_set():
+                print(f"任务 {task.task_name or task.task_id} 的租约已被其他工作进程接管，放弃本次结果")
+            elif result is not None:
+                self.queue.complete(job, result['output_file'])
+                print(f"任务完成：{task.task_name or task.task_id}，输出文件：{result['output_file']}")
+            elif self.stopped.is_set():
+                self.queue.release(job)
+            else:
+                self.queue.fail(job, error)
+        except Exception as e:
+            print(f"更新队列失败：{str(e)}")
@@ -0,0 +1,196 @@
+"""
+性能分析模块
+用cProfile和tracemalloc包裹一次合并，保存.prof文件和各阶段的内存分配情况，便于在不复现数据的情况下排查慢合并
+"""
+import contextvars
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# 分析结果的默认保存目录
+PROFILE_DIR = os.path.expanduser("~/.excel_merger/profiles")
+
+# 当前线程所属的、正在进行性能分析的合并；合并启动的工作线程通过 profile_thread 继承
+_ACTIVE_PROFILER = contextvars.ContextVar('active_merge_profiler', default=None)
+# tracemalloc 是进程级的，同一时间只允许一个合并进行性能分析
+_SESSION_LOCK = threading.Lock()
+
+
+def profile_thread(target):
+    """
+    包装工作线程的入口函数，线程中的调用同样记入所属合并的性能分析结果
+
+    在创建线程的线程中调用；所在的合并没有进行性能分析时原样返回 target
+    """
+    profiler = _ACTIVE_PROFILER.get()
+    if profiler is None:
+        return target
+
+    def run(*args, **kwargs):
+        _ACTIVE_PROFILER.set(profiler)
+        profile = profiler.thread_profile()
+        try:
+            return target(*args, **kwargs)
+        finally:
+            if profile:
+                profile.disable()
+    return run
+
+
+class MergeProfiler:
+    def __init__(self, profile_dir=None, top=10):
+        """
+        初始化性能分析器
+
+        Args:
+            profile_dir: 分析结果保存目录，None表示 ~/.excel_merger/profiles
+            top: 热点函数和内存分配各列出的条数
+        """
+        self.profile_dir = profile_dir or PROFILE_DIR
+        self.top = top
+        self.stages = []  # [{'stage': 阶段名称, 'elapsed': 耗时, 'peak': 峰值内存, 'allocations': 新增内存最多的位置}]
+        self._profile = None
+        self._thread_profiles = []  # 工作线程各自的cProfile
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stage = None
+        self._stage_started = None
+
+    @classmethod
+    def from_config(cls, merge_config):
+        """根据合并配置创建分析器，未启用性能分析时返回None"""
+        if not merge_config.get('profile'):
+            return None
+        return cls(merge_config.get('profile_dir') or None)
+
+    def run(self, func, *args, progress_callback=None, **kwargs):
+        """
+        在性能分析下执行 func(*args, progress_callback=..., **kwargs)
+
+        func 的进度回调被包裹一层，阶段切换时记录上一阶段的耗时、峰值内存和新增内存最多的位置。
+        func 中用 profile_thread 包装的工作线程（流水线各阶段、预读等）各自记录，保存时合并到同一个.prof文件。
+        同一时间只有一个合并进行性能分析：已有合并正在分析时（如并行执行的依赖任务），直接执行 func，不做分析。
+
+        Returns:
+            tuple: (func的返回值, 分析结果字典 {'prof_file', 'memory_file', 'summary'}，未做分析时为None)
+        """
+        if not _SESSION_LOCK.acquire(blocking=False):
+            print("另一个合并正在进行性能分析，本次合并不做性能分析")
+            return func(*args, progress_callback=progress_callback, **kwargs), None
+        try:
+            return self._run(func, *args, progress_callback=progress_callback, **kwargs)
+        finally:
+            _SESSION_LOCK.release()
+
+    def _run(self, func, *args, progress_callback=None, **kwargs):
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        self._snapshot = tracemalloc.take_snapshot()
+        self._profile = cProfile.Profile()
+
+        def on_progress(progress):
+            if progress['stage_name'] != self._stage:
+                self._end_stage()
+                self._stage = progress['stage_name']
+                self._stage_started = time.perf_counter()
+            if progress_callback:
+                progress_callback(progress)
+
+        self._stage = "准备"
+        self._stage_started = time.perf_counter()
+        token = _ACTIVE_PROFILER.set(self)
+        self._profile.enable()
+        try:
+            result = func(*args, progress_callback=on_progress, **kwargs)
+        finally:
+            self._end_stage()
+            self._profile.disable()
+            _ACTIVE_PROFILER.reset(token)
+            if started_tracing:
+                tracemalloc.stop()
+        return result, self.save()
+
+    def thread_profile(self):
+        """
+        在当前工作线程中启动一个cProfile，返回该cProfile
+
+        Python 3.12起cProfile基于 sys.monitoring，合并线程的cProfile已记录所有线程，不能再启动第二个，此时返回None
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        with self._lock:
+            self._thread_profiles.append(profile)
+        return profile
+
+    def stats(self):
+        """合并线程和各工作线程的调用统计"""
+        stats = pstats.Stats(self._profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        return stats
+
+    def _end_stage(self):
+        """结束当前阶段，记录耗时、峰值内存和相对上一阶段新增内存最多的位置"""
+        if self._stage is None:
+            return
+        elapsed = time.perf_counter() - self._stage_started
+        self._profile.disable()
+        try:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            allocations = [
+                stat for stat in snapshot.compare_to(self._snapshot, 'lineno') if stat.size_diff > 0
+            ][:self.top]
+            self._snapshot = snapshot
+        finally:
+            self._profile.enable()
+        self.stages.append({'stage': self._stage, 'elapsed': elapsed, 'peak': peak, 'allocations': allocations})
+        self._stage = None
+
+    def save(self):
+        """
+        保存.prof文件和内存报告
+
+        Returns:
+            dict: prof_file: .prof文件路径, memory_file: 内存报告路径, summary: 简短的热点摘要
+        """
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, datetime.now().strftime("merge_%Y%m%d_%H%M%S"))
+        prof_file = base + ".prof"
+        memory_file = base + "_memory.txt"
+        self.stats().dump_stats(prof_file)
+
+        lines = []
+        for stage in self.stages:
+            lines.append(f"[{stage['stage']}] 耗时 {stage['elapsed']:.2f} 秒，峰值内存 {stage['peak'] / 1024 / 1024:.1f} MB")
+            lines.extend(f"  {stat}" for stat in stage['allocations'])
+        with open(memory_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+        return {'prof_file': prof_file, 'memory_file': memory_file, 'summary': self.summary()}
+
+    def summary(self, count=5):
+        """各阶段耗时与峰值内存，以及自身耗时最多的几个函数"""
+        lines = [
+            f"{stage['stage']}：{stage['elapsed']:.2f} 秒，峰值 {stage['peak'] / 1024 / 1024:.1f} MB"
+            for stage in self.stages if stage['elapsed'] >= 0.01
+        ]
+        stats = self.stats().stats
+        hot = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:count]
+        lines.append("热点函数（自身耗时 / 累计耗时）：")
+        for (file_name, line, name), (_, _, own, cumulative, _) in hot:
+            lines.append(f"  {own:.2f}s / {cumulative:.2f}s  {os.path.basename(file_name)}:{line}({name})")
+        return "\n".join(lines)
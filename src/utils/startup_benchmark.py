@@ -0,0 +1,120 @@
+"""
+启动导入耗时基准模块
+在新的解释器中用 -X importtime 导入界面模块，统计导入耗时并检查是否超出预算、是否提前导入了pandas等重量级模块
+
+用法：python -m src.utils.startup_benchmark [--budget 秒] [--runs 次数] [模块 ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# 启动界面时导入的模块
+STARTUP_MODULES = ("src.gui.main_window",)
+
+# 启动时不应导入的重量级模块（在首次合并、预览或添加文件时才导入）
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow")
+
+# 默认导入耗时预算（秒）
+DEFAULT_BUDGET = 1.0
+
+# 项目根目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure_import(module):
+    """
+    在新的解释器中导入模块一次
+
+    Returns:
+        dict:
+            - seconds: 导入耗时（秒），不含解释器自身的启动时间
+            - heavy: 导入后已加载的重量级模块
+            - slowest: 累计耗时最多的被导入模块 [(模块名, 秒)]
+            - error: 导入失败时的错误信息，成功时为None
+    """
+    code = (
+        "import sys\n"
+        f"import {module}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+    )
+
+    # -X importtime 输出到标准错误：import time: self [us] | cumulative | imported package
+    imports = []
+    errors = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        # 竖线后固定有一个空格，其后的缩进表示嵌套导入
+        imports.append((parts[2][1:].rstrip(), int(parts[1]) / 1e6))
+
+    if completed.returncode != 0:
+        return {'seconds': None, 'heavy': [], 'slowest': [], 'error': "\n".join(errors[-3:]) or "导入失败"}
+
+    # 顶层（无缩进）的目标模块及其父包的累计耗时之和即为导入耗时，site等解释器启动时的导入不计入
+    own = [
+        seconds for name, seconds in imports
+        if not name.startswith(" ") and (name == module or module.startswith(name + "."))
+    ]
+    nested = [(name.strip(), seconds) for name, seconds in imports if name.startswith(" ")]
+    heavy = completed.stdout.strip()
+    return {
+        'seconds': sum(own),
+        'heavy': heavy.split(",") if heavy else [],
+        'slowest': sorted(nested, key=lambda item: item[1], reverse=True)[:5],
+        'error': None,
+    }
+
+
+def run_benchmark(modules=STARTUP_MODULES, budget=DEFAULT_BUDGET, runs=3):
+    """
+    多次测量各模块的导入耗时，取中位数与预算比较
+
+    Returns:
+        tuple: (是否通过, 报告文本)
+    """
+    passed = True
+    lines = []
+    for module in modules:
+        results = [measure_import(module) for _ in range(runs)]
+        failed = next((r for r in results if r['error']), None)
+        if failed:
+            passed = False
+            lines.append(f"{module}：导入失败\n  {failed['error']}")
+            continue
+
+        seconds = statistics.median(r['seconds'] for r in results)
+        heavy = sorted({m for r in results for m in r['heavy']})
+        ok = seconds <= budget and not heavy
+        passed = passed and ok
+        lines.append(f"{module}：{seconds:.3f} 秒（预算 {budget:.3f} 秒）{'通过' if ok else '未通过'}")
+        if heavy:
+            lines.append(f"  启动时导入了重量级模块：{', '.join(heavy)}")
+        lines.extend(f"  {seconds:.3f}s  {name}" for name, seconds in results[0]['slowest'])
+    return passed, "\n".join(lines)
+
+
+def main(argv=None):
+    """命令行入口，未通过时返回1"""
+    parser = argparse.ArgumentParser(description="测量启动时的模块导入耗时")
+    parser.add_argument("modules", nargs="*", default=list(STARTUP_MODULES), help="要测量的模块")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="导入耗时预算（秒）")
+    parser.add_argument("--runs", type=int, default=3, help="测量次数，取中位数")
+    args = parser.parse_args(argv)
+
+    passed, report = run_benchmark(args.modules, args.budget, args.runs)
+    print(report)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
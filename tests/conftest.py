@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# 从仓库根目录导入 src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def input_files(tmp_path):
+    """三个结构相同的输入文件，工号在文件之间有重复，第二个文件内也有重复"""
+    import pandas as pd
+
+    frames = [
+        pd.DataFrame({'工号': range(0, 20), '姓名': [f"员工{i}" for i in range(20)], '金额': [i * 1.5 for i in range(20)]}),
+        pd.DataFrame({'工号': [15, 16, 17, 20, 21, 21], '姓名': ["员工15", "改名16", "员工17", "员工20", "员工21", "员工21"],
+                      '金额': [22.5, 99.0, 25.5, 30.0, 31.5, 31.5]}),
+        pd.DataFrame({'工号': range(18, 30), '姓名': [f"员工{i}" for i in range(18, 30)], '金额': [i * 1.5 for i in range(18, 30)]}),
+    ]
+    files = []
+    for i, df in enumerate(frames):
+        path = str(tmp_path / f"输入{i}.xlsx")
+        df.to_excel(path, index=False)
+        files.append(path)
+    return files
+
+
+@pytest.fixture
+def run_merge(tmp_path):
+    """
+    以任务的默认合并配置（数据从表头下一行开始）合并文件
+
+    run_merge(files, name, **配置) 返回 (结果, 输出文件路径)；progress_callback / cancel_token 传给 merge_files
+    """
+    from src.excel.merger import ExcelMerger
+    from src.scheduler.task_config import TaskConfig
+
+    def run(files, name, selected_sheets=None, progress_callback=None, cancel_token=None, **overrides):
+        merge_config = dict(TaskConfig("test").merge_config, start_row="", **overrides)
+        output = str(tmp_path / f"{name}.xlsx")
+        sheets = selected_sheets or {file: "Sheet1" for file in files}
+        result = ExcelMerger().merge_files(
+            files, output, sheets, {file: {} for file in files}, merge_config, progress_callback, cancel_token
+        )
+        return result, output
+    return run
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.excel.dedup import HashSet, RowDeduplicator, file_digest
+from src.excel.lineage import SOURCE_COLUMN
+
+
+def frames():
+    a = pd.DataFrame({'工号': [1, 2, 2], '金额': [10, 20, 20], SOURCE_COLUMN: "a.xlsx"})
+    b = pd.DataFrame({'工号': [2, 3, 1], '金额': [20, 30, 11], SOURCE_COLUMN: "b.xlsx"})
+    return [a, b]
+
+
+def test_row_dedup_keep_first_ignores_lineage():
+    deduplicator = RowDeduplicator()
+    a, b = deduplicator.dedup_frames(frames())
+
+    assert a['工号'].tolist() == [1, 2]
+    # 第二个文件中的 (2, 20) 与第一个文件重复，数据来源不同也算重复
+    assert b['工号'].tolist() == [3, 1]
+    assert deduplicator.removed_rows == 2
+
+
+def test_row_dedup_keep_last():
+    deduplicator = RowDeduplicator(keep="last")
+    a, b = deduplicator.dedup_frames(frames())
+
+    assert a['工号'].tolist() == [1]
+    assert b['工号'].tolist() == [2, 3, 1]
+    assert deduplicator.removed_rows == 2
+
+
+def test_key_dedup():
+    deduplicator = RowDeduplicator(mode="key", key_columns=['工号'])
+    a, b = deduplicator.dedup_frames(frames())
+
+    assert a['工号'].tolist() == [1, 2]
+    assert b['工号'].tolist() == [3]
+
+
+def test_key_dedup_missing_column():
+    deduplicator = RowDeduplicator(mode="key", key_columns=['编号'])
+    with pytest.raises(ValueError):
+        deduplicator.dedup_frames(frames())
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        RowDeduplicator(mode="key")
+    with pytest.raises(ValueError):
+        RowDeduplicator(keep="middle")
+    assert RowDeduplicator.from_config({'dedup_mode': "none"}) is None
+
+
+def test_hash_set_spills_to_disk():
+    hashes = HashSet(max_memory_items=3)
+    try:
+        assert hashes.add_new(np.array([1, 2, 3, 4], dtype=np.uint64)).all()
+        assert hashes.spilled
+        assert hashes.add_new(np.array([4, 5, 2**63 + 1], dtype=np.uint64)).tolist() == [False, True, True]
+        assert hashes.add_new(np.array([2**63 + 1], dtype=np.uint64)).tolist() == [False]
+    finally:
+        hashes.close()
+
+
+def test_spilled_dedup_matches_in_memory():
+    data = [pd.DataFrame({'v': np.arange(i, i + 50) % 70}) for i in range(0, 200, 40)]
+    expected = [df['v'].tolist() for df in RowDeduplicator().dedup_frames(data)]
+    spilled = [df['v'].tolist() for df in RowDeduplicator(max_memory_items=10).dedup_frames(data)]
+    assert spilled == expected
+    assert sum(len(v) for v in expected) == 70
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"x" * 10)
+    assert file_digest(str(path), chunk_size=3) == file_digest(str(path), content=b"x" * 10)
+
+
+def test_hash_set_spills_to_configured_dir(tmp_path, monkeypatch):
+    deduplicator = RowDeduplicator.from_config(
+        {'dedup_mode': "row", 'dedup_memory_items': 5, 'spill_dir': str(tmp_path)}
+    )
+    spilled_dirs = []
+    spill = HashSet._spill
+
+    def record(self):
+        spill(self)
+        spilled_dirs.append(os.path.dirname(self._tmp_dir))
+    monkeypatch.setattr(HashSet, '_spill', record)
+
+    data = [pd.DataFrame({'v': range(i, i + 10)}) for i in (0, 5)]
+    assert [len(df) for df in deduplicator.dedup_frames(data)] == [10, 5]
+    assert spilled_dirs == [str(tmp_path)]
+    # 去重结束后删除溢出文件
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.excel.joiner import KeyJoiner
+from src.excel.spill import SpillStore
+
+
+def sort_result(df, keys):
+    return df.sort_values(keys, kind="stable", na_position="last").reset_index(drop=True)
+
+
+def sort_merge_join(joiner, named_frames, chunk_rows):
+    """把各输入按 chunk_rows 行一块暂存后做外部排序归并连接"""
+    with SpillStore(chunk_rows=chunk_rows) as store:
+        for name, df in named_frames:
+            store.add(name, df)
+        columns, chunks = joiner.sort_merge_join([
+            (name, store.columns(name), store.column_kind_sets([name]), store.iter_chunks(name))
+            for name, _ in named_frames
+        ])
+        parts = list(chunks)
+    return columns, parts
+
+
+def make_frames():
+    left = pd.DataFrame({
+        '部门': ["A", "A", "B", "B", "C", None],
+        '工号': [1, 2, 1, 3, 1, 9],
+        '姓名': ["甲", "乙", "丙", "丁", "戊", "己"],
+    })
+    right = pd.DataFrame({
+        '部门': ["A", "B", "B", "D", None],
+        '工号': [2, 1, 1, 4, 9],
+        '金额': [10.0, 20.0, 21.0, 40.0, 90.0],
+    })
+    return [("人员", left), ("工资", right)]
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "outer"])
+def test_batched_join_matches_hash_join(how):
+    joiner = KeyJoiner(["部门", "工号"], how=how, batch_rows=2)
+    frames = joiner.prepare(make_frames())
+    expected = joiner.hash_join(frames)
+    batched = pd.concat(list(joiner.iter_batched_join(frames)), ignore_index=True)
+
+    keys = ["部门", "工号"]
+    pd.testing.assert_frame_equal(sort_result(batched, keys), sort_result(expected, keys), check_dtype=False)
+
+
+def test_multi_key_outer_join_rows():
+    joiner = KeyJoiner(["部门", "工号"], how="outer", memory_limit_mb=0)
+    result = joiner.join(make_frames())
+
+    assert list(result.columns[:2]) == ["部门", "工号"]
+    # (B, 1) 在右表中出现两次；(A, 1)、(B, 3)、(C, 1) 只在左表，(D, 4) 只在右表
+    assert len(result) == 8
+    b1 = result[(result['部门'] == "B") & (result['工号'] == 1)]
+    assert sorted(b1['金额']) == [20.0, 21.0]
+    d4 = result[result['部门'] == "D"].iloc[0]
+    assert pd.isna(d4['姓名']) and d4['金额'] == 40.0
+
+
+def test_inner_join_renames_duplicated_columns():
+    left = pd.DataFrame({'工号': [1, 2], '备注': ["x", "y"]})
+    right = pd.DataFrame({'工号': [2.0, 3.0], '备注': ["z", "w"]})
+    result = KeyJoiner(["工号"]).join([("a", left), ("b", right)])
+
+    assert list(result.columns) == ["工号", "备注_a", "备注_b"]
+    # 数字和浮点工号统一为文本后再连接
+    assert result.to_dict("records") == [{'工号': "2", '备注_a': "y", '备注_b': "z"}]
+
+
+def test_missing_key_column():
+    with pytest.raises(ValueError):
+        KeyJoiner(["工号"]).join([("a", pd.DataFrame({'编号': [1]}))])
+
+
+def test_encode_keys_high_cardinality_has_no_collisions():
+    # 五个关键列各有 2**16 个取值，各列编码的乘积为 2**80，超出int64；
+    # 最后一行与第一行只有第一列不同，按乘积组合编码时两者的编码相同
+    n = 2 ** 16
+    keys = [f"k{i}" for i in range(5)]
+    frame = pd.DataFrame({key: np.arange(n) for key in keys})
+    frame = pd.concat([frame, pd.DataFrame([[1, 0, 0, 0, 0]], columns=keys)], ignore_index=True)
+    other = frame.iloc[::-1].reset_index(drop=True)
+    codes, key_table = KeyJoiner(keys)._encode_keys([frame, other])
+
+    assert len(np.unique(codes[0])) == len(frame)
+    assert codes[0][0] != codes[0][-1]
+    pd.testing.assert_frame_equal(key_table.iloc[codes[0]].reset_index(drop=True), frame)
+    pd.testing.assert_frame_equal(key_table.iloc[codes[1]].reset_index(drop=True), other)
+
+
+def test_batched_join_does_not_match_distinct_wide_keys():
+    n = 2 ** 16
+    keys = [f"k{i}" for i in range(5)]
+    left = pd.DataFrame({key: np.arange(n) for key in keys})
+    left['左'] = 1
+    right = pd.DataFrame([[1, 0, 0, 0, 0, 2]], columns=keys + ['右'])
+    assert list(KeyJoiner(keys).iter_batched_join([left, right])) == []
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "outer"])
+@pytest.mark.parametrize("chunk_rows", [1, 2, 100])
+def test_sort_merge_join_matches_hash_join(how, chunk_rows):
+    named_frames = make_frames() + [("考勤", pd.DataFrame({
+        '部门': ["B", "A", None, "B"], '工号': [1, 2, 9, 1], '天数': [20, 21, 22, 23],
+    }))]
+    # 内存预算极小，每个数据块单独成为一个有序段，覆盖有序段的多路归并
+    joiner = KeyJoiner(["部门", "工号"], how=how, memory_limit_mb=0.0001)
+    expected = joiner.hash_join(joiner.prepare(named_frames))
+    columns, parts = sort_merge_join(joiner, named_frames, chunk_rows)
+    result = pd.concat(parts, ignore_index=True)
+
+    keys = ["部门", "工号"]
+    assert columns == list(expected.columns) == list(result.columns)
+    # 结果按关键列排序，空值排在最后
+    pd.testing.assert_frame_equal(result, sort_result(result, keys))
+    pd.testing.assert_frame_equal(
+        result.astype(object).fillna(-1), sort_result(expected, keys).astype(object).fillna(-1), check_dtype=False
+    )
+
+
+def test_sort_merge_join_normalizes_mixed_key_types():
+    left = pd.DataFrame({'工号': [1, 2, 3], '姓名': ["甲", "乙", "丙"]})
+    right = pd.DataFrame({'工号': ["3", "1", "4"], '金额': [30.0, 10.0, 40.0]})
+    columns, parts = sort_merge_join(KeyJoiner(["工号"], how="outer"), [("a", left), ("b", right)], 2)
+    result = pd.concat(parts, ignore_index=True)
+
+    assert columns == ["工号", "姓名", "金额"]
+    assert list(result['工号']) == ["1", "2", "3", "4"]
+    assert list(result['金额'].fillna(0)) == [10.0, 0, 30.0, 40.0]
+
+
+def test_sort_merge_join_empty_result():
+    left = pd.DataFrame({'工号': [1, 2], '姓名': ["甲", "乙"]})
+    right = pd.DataFrame({'工号': [3], '金额': [30.0]})
+    columns, parts = sort_merge_join(KeyJoiner(["工号"]), [("a", left), ("b", right)], 1)
+
+    assert columns == ["工号", "姓名", "金额"]
+    assert parts == []
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "outer"])
+def test_spilled_join_matches_memory(run_merge, input_files, how):
+    config = dict(merge_mode="join", join_keys=['工号'], join_how=how)
+    memory_result, memory_output = run_merge(input_files, "memory", execution_mode="memory", **config)
+    spill_result, spill_output = run_merge(input_files, "spill", execution_mode="spill", **config)
+    assert memory_result['success'] and spill_result['success'], spill_result.get('error')
+    assert spill_result['spilled']
+
+    memory = pd.read_excel(memory_output)
+    spilled = pd.read_excel(spill_output)
+    # 三个文件的姓名、金额列重名，加上文件名后缀
+    assert list(spilled.columns) == list(memory.columns) == [
+        '工号', '姓名_输入0', '金额_输入0', '姓名_输入1', '金额_输入1', '姓名_输入2', '金额_输入2'
+    ]
+    assert spill_result['rows'] == memory_result['rows'] == len(memory)
+    pd.testing.assert_frame_equal(spilled, sort_result(memory, ['工号']))
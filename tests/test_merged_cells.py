@@ -0,0 +1,84 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.worksheet.cell_range import CellRange
+
+from src.excel.merger import ExcelMerger
+from src.excel.style_manager import ExcelStyleManager
+from src.scheduler.task_config import TaskConfig
+
+
+def ranges(*coords):
+    return [CellRange(coord) for coord in coords]
+
+
+def test_plan_repeats_data_ranges_per_block():
+    planned = ExcelStyleManager().plan_merged_cells(ranges("A1:B1", "C2:C3"), 1, [4, 3])
+    # 表头区域原样保留，数据区域在每个数据块中按相对位置重复
+    assert planned == [(1, 1, 1, 2), (2, 3, 3, 3), (6, 3, 7, 3)]
+
+
+def test_plan_skips_ranges_beyond_block():
+    planned = ExcelStyleManager().plan_merged_cells(ranges("C3:C4"), 1, [3, 2, 4])
+    assert planned == [(3, 3, 4, 3), (8, 3, 9, 3)]
+
+
+def test_plan_skips_overlapping_ranges():
+    planned = ExcelStyleManager().plan_merged_cells(ranges("A2:B3", "B3:C4"), 1, [4])
+    assert planned == [(2, 1, 3, 2)]
+
+
+def test_plan_without_blocks_keeps_header_only():
+    planned = ExcelStyleManager().plan_merged_cells(ranges("A1:B1", "C2:C3"), 1, [])
+    assert planned == [(1, 1, 1, 2)]
+
+
+@pytest.fixture
+def merged_inputs(tmp_path):
+    """两个文件：表头 + 4行数据，备注列的前两行数据合并；第二个文件的前两个工号与第一个文件重复"""
+    files = []
+    for i in range(2):
+        wb = Workbook()
+        sheet = wb.active
+        sheet.title = "Sheet1"
+        sheet.append(["工号", "金额", "备注"])
+        for row in range(4):
+            sheet.append([i * 2 + row, float(row), f"备注{row}"])
+        sheet.merge_cells("C2:C3")
+        path = str(tmp_path / f"合并{i}.xlsx")
+        wb.save(path)
+        files.append(path)
+    return files
+
+
+@pytest.fixture
+def merge_styled(tmp_path):
+    """保留样式合并文件，返回 (结果, 输出中数据区域的合并单元格)"""
+    def run(files, name, **overrides):
+        merge_config = dict(TaskConfig("test").merge_config, start_row="", **overrides)
+        output = str(tmp_path / f"{name}.xlsx")
+        result = ExcelMerger(ExcelStyleManager()).merge_files(
+            files, output, {file: "Sheet1" for file in files}, {file: {} for file in files}, merge_config
+        )
+        assert result['success'], result.get('error')
+        sheet = load_workbook(output)["合并结果"]
+        return result, sorted(str(r) for r in sheet.merged_cells.ranges if r.min_row > 1)
+    return run
+
+
+def test_merge_rebuilds_data_ranges_per_file(merged_inputs, merge_styled):
+    _, merged = merge_styled(merged_inputs, "merged")
+    assert merged == ["C2:C3", "C6:C7"]
+
+
+def test_merge_skips_data_ranges_after_filter(merged_inputs, merge_styled):
+    result, merged = merge_styled(merged_inputs, "filtered", filters=[{'column': '金额', 'op': '!=', 'value': 0}])
+    assert result['rows'] == 6
+    # 每个文件的第一行被筛选掉后，数据块的前两行不再是模板中合并的两行
+    assert merged == []
+
+
+def test_merge_skips_data_ranges_after_dedup(merged_inputs, merge_styled):
+    result, merged = merge_styled(merged_inputs, "deduped", dedup_mode="key", dedup_keys=['工号'])
+    assert result['duplicates_removed'] == 2
+    # 第二个文件剩下的两行在模板中不属于同一个合并区域
+    assert merged == []
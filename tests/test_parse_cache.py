@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.excel.parse_cache import PARSE_CACHE, CachedWorkbook, ParseCache
+
+
+class CountingLoad:
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return object()
+
+
+def test_unshared_file_is_not_cached(input_files):
+    cache = ParseCache()
+    load = CountingLoad()
+    cache.get(input_files[0], "Sheet1", "openpyxl", load)
+    cache.get(input_files[0], "Sheet1", "openpyxl", load)
+    assert load.calls == 2
+
+
+def test_concurrent_requests_parse_once(input_files):
+    cache = ParseCache()
+    cache.retain(input_files[:1])
+    load = CountingLoad(delay=0.05)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get(input_files[0], "Sheet1", "openpyxl", load)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert load.calls == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
+    # sheet和引擎不同时分别解析
+    cache.get(input_files[0], "Sheet2", "openpyxl", load)
+    cache.get(input_files[0], "Sheet1", "calamine", load)
+    assert load.calls == 3
+
+
+def test_release_after_last_user(input_files):
+    cache = ParseCache()
+    cache.retain(input_files[:1])
+    cache.retain(input_files[:1])
+    load = CountingLoad()
+    first = cache.get(input_files[0], "Sheet1", "openpyxl", load)
+
+    cache.release(input_files[:1])
+    assert cache.get(input_files[0], "Sheet1", "openpyxl", load) is first
+    cache.release(input_files[:1])
+    assert not cache.is_shared(input_files[0])
+    cache.retain(input_files[:1])
+    assert cache.get(input_files[0], "Sheet1", "openpyxl", load) is not first
+    assert load.calls == 2
+
+
+def test_modified_file_is_parsed_again(input_files):
+    cache = ParseCache()
+    cache.retain(input_files[:1])
+    load = CountingLoad()
+    cache.get(input_files[0], "Sheet1", "openpyxl", load)
+    stat = os.stat(input_files[0])
+    os.utime(input_files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache.get(input_files[0], "Sheet1", "openpyxl", load)
+    assert load.calls == 2
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    """统计实际打开文件解析sheet的次数"""
+    calls = []
+    original = pd.ExcelFile.parse
+
+    def parse(self, sheet_name=0, *args, **kwargs):
+        calls.append(sheet_name)
+        return original(self, sheet_name, *args, **kwargs)
+
+    monkeypatch.setattr(pd.ExcelFile, "parse", parse)
+    return calls
+
+
+def test_cached_workbook_slices_shared_result(input_files, parse_calls):
+    cache = ParseCache()
+    cache.retain(input_files[:1])
+    with CachedWorkbook(input_files[0], "openpyxl", cache=cache) as xl:
+        full = xl.parse("Sheet1", header=None)
+        assert xl.sheet_names == ["Sheet1"]
+    with CachedWorkbook(input_files[0], "openpyxl", cache=cache) as xl:
+        head = xl.parse("Sheet1", header=None, nrows=1, usecols=[0, 2])
+
+    assert parse_calls == ["Sheet1"]
+    assert len(full) == 21
+    assert head.values.tolist() == [["工号", "金额"]]
+
+
+def test_tasks_sharing_inputs_parse_each_file_once(run_merge, input_files, parse_calls):
+    PARSE_CACHE.retain(input_files)
+    PARSE_CACHE.retain(input_files)
+    try:
+        first, first_output = run_merge(input_files, "first", execution_mode="memory")
+        second, second_output = run_merge(input_files, "second", execution_mode="memory", dedup_mode="row")
+    finally:
+        PARSE_CACHE.release(input_files)
+        PARSE_CACHE.release(input_files)
+
+    assert first['success'] and second['success']
+    assert len(parse_calls) == len(input_files)
+    assert second['duplicates_removed'] == 7
+    assert len(pd.read_excel(first_output)) == 38
+    assert not any(PARSE_CACHE.is_shared(file) for file in input_files)
@@ -0,0 +1,72 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from src.excel.pipeline import StagePipeline
+from src.excel.progress import CancellationToken
+
+
+def merged(run_merge, files, name, **config):
+    result, output = run_merge(files, name, **config)
+    assert result['success'], result.get('error')
+    return result, pd.read_excel(output, sheet_name=None)
+
+
+@pytest.mark.parametrize("config", [
+    {},
+    {'dedup_mode': "row"},
+    {'dedup_mode': "key", 'dedup_keys': ['工号']},
+    {'merge_mode': "multiple"},
+    {'summary_mode': "sheet"},
+], ids=["base", "row_dedup", "key_dedup", "multiple", "summary"])
+def test_pipeline_matches_memory(run_merge, input_files, config):
+    memory_result, memory = merged(run_merge, input_files, "memory", execution_mode="memory", **config)
+    pipeline_result, pipeline = merged(run_merge, input_files, "pipeline", execution_mode="pipeline", **config)
+
+    assert pipeline_result['rows'] == memory_result['rows']
+    assert pipeline_result['duplicates_removed'] == memory_result['duplicates_removed']
+    assert list(pipeline) == list(memory)
+    for sheet_name in memory:
+        pd.testing.assert_frame_equal(pipeline[sheet_name], memory[sheet_name])
+
+
+def test_unsupported_pipeline_falls_back(run_merge, input_files):
+    config = dict(sort_keys=[{'column': '工号', 'ascending': False}])
+    _, memory = merged(run_merge, input_files, "memory", execution_mode="memory", **config)
+    result, pipeline = merged(run_merge, input_files, "pipeline", execution_mode="pipeline", **config)
+
+    assert not result['spilled']
+    pd.testing.assert_frame_equal(pipeline['合并结果'], memory['合并结果'])
+    assert pipeline['合并结果']['工号'].is_monotonic_decreasing
+
+
+def test_pipeline_cancel_leaves_no_output(run_merge, input_files):
+    token = CancellationToken()
+    threads = threading.active_count()
+
+    def on_progress(progress):
+        # 进入流水线阶段时请求取消，之后在读取线程和写出的数据块之间检查
+        if progress['stage'] == 'pipeline':
+            token.cancel()
+
+    result, output = run_merge(input_files, "cancelled", execution_mode="pipeline",
+                               progress_callback=on_progress, cancel_token=token)
+
+    assert result.get('cancelled')
+    assert not os.path.exists(output)
+    # 读取和转换线程都已结束
+    assert threading.active_count() == threads
+
+
+def test_stage_pipeline_propagates_stage_error():
+    def fail(items):
+        for item in items:
+            if item == 3:
+                raise ValueError("第3项出错")
+            yield item * 10
+
+    with pytest.raises(ValueError, match="第3项出错"):
+        with StagePipeline(iter(range(100)), [fail]) as pipeline:
+            assert list(pipeline)
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.excel.prefetch import Prefetcher
+
+
+def content(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """记录后台线程读取的文件"""
+    paths = []
+    original = Prefetcher._read
+
+    def read(file_path):
+        paths.append(file_path)
+        return original(file_path)
+
+    monkeypatch.setattr(Prefetcher, "_read", staticmethod(read))
+    return paths
+
+
+def test_take_returns_contents_in_order(input_files):
+    with Prefetcher(input_files) as prefetcher:
+        assert [prefetcher.take(file) for file in input_files] == [content(file) for file in input_files]
+
+
+def test_reads_at_most_depth_ahead(input_files, reads):
+    with Prefetcher(input_files, depth=1) as prefetcher:
+        assert wait_until(lambda: reads == input_files[:1])
+        time.sleep(0.05)
+        assert reads == input_files[:1]
+        prefetcher.take(input_files[0])
+        assert wait_until(lambda: reads == input_files[:2])
+
+
+def test_skipped_files_are_dropped(input_files):
+    with Prefetcher(input_files) as prefetcher:
+        assert prefetcher.take(input_files[1]) == content(input_files[1])
+        # 已跳过的文件不再返回预读内容，解析时直接读取文件
+        assert prefetcher.take(input_files[0]) is None
+        assert prefetcher.take(input_files[2]) == content(input_files[2])
+
+
+def test_files_over_limit_are_not_prefetched(input_files, reads):
+    with Prefetcher(input_files, max_bytes=10) as prefetcher:
+        assert prefetcher.take(input_files[0]) is None
+    assert reads == []
+
+
+def test_close_stops_thread(input_files):
+    threads = threading.active_count()
+    prefetcher = Prefetcher(input_files, depth=1).start()
+    prefetcher.close()
+
+    assert threading.active_count() == threads
+    assert prefetcher.take(input_files[0]) is None
+
+
+def test_merge_without_prefetch_matches(run_merge, input_files):
+    with_prefetch, output = run_merge(input_files, "prefetch", execution_mode="memory")
+    without, plain_output = run_merge(input_files, "plain", execution_mode="memory", prefetch_files=0)
+
+    assert with_prefetch['success'] and without['success']
+    assert with_prefetch['rows'] == without['rows'] == 38
+    pd.testing.assert_frame_equal(pd.read_excel(output), pd.read_excel(plain_output))
@@ -0,0 +1,65 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from src.excel.merger import ExcelMerger
+from src.scheduler.task_config import TaskConfig
+from src.utils.profiler import MergeProfiler, profile_thread
+
+
+def function_names(prof_file):
+    import pstats
+    return {name for _, _, name in pstats.Stats(prof_file).stats}
+
+
+def reader_work():
+    return sum(range(1000))
+
+
+def test_worker_threads_are_profiled(tmp_path):
+    def merge(progress_callback=None):
+        thread = threading.Thread(target=profile_thread(reader_work))
+        thread.start()
+        thread.join()
+        return {'success': True}
+
+    result, profile = MergeProfiler(str(tmp_path)).run(merge)
+    assert result == {'success': True}
+    assert 'reader_work' in function_names(profile['prof_file'])
+    assert os.path.exists(profile['memory_file'])
+
+
+def test_profile_thread_outside_profiling_returns_target():
+    assert profile_thread(reader_work) is reader_work
+
+
+def test_concurrent_runs_are_not_profiled(tmp_path):
+    inner = {}
+
+    def merge(progress_callback=None):
+        inner['result'] = MergeProfiler(str(tmp_path)).run(lambda progress_callback=None: {'success': True})
+        return {'success': True}
+
+    _, profile = MergeProfiler(str(tmp_path)).run(merge)
+    assert profile is not None
+    assert inner['result'] == ({'success': True}, None)
+
+
+@pytest.mark.parametrize("execution_mode", ["memory", "pipeline"])
+def test_merge_profile_includes_reader(tmp_path, execution_mode):
+    files = []
+    for i in range(3):
+        path = str(tmp_path / f"f{i}.xlsx")
+        pd.DataFrame({'工号': range(i * 10, i * 10 + 10), '金额': 1.5}).to_excel(path, index=False)
+        files.append(path)
+    merge_config = dict(
+        TaskConfig("x").merge_config,
+        execution_mode=execution_mode, profile=True, profile_dir=str(tmp_path / "profiles")
+    )
+    result = ExcelMerger().merge_files(
+        files, str(tmp_path / "out.xlsx"), {file: "Sheet1" for file in files}, {}, merge_config
+    )
+    assert result['success'], result.get('error')
+    assert 'read_excel_sheets' in function_names(result['profile']['prof_file'])
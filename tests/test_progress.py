@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from src.excel.progress import CancellationToken, MergeCancelled, MergeProgress
+
+
+def test_fraction_counts_read_and_write_halves():
+    progress = MergeProgress(files_total=4)
+    progress.file_done(10)
+    progress.file_done(10)
+    assert progress.fraction() == pytest.approx(0.25)
+    progress.rows_done(10)
+    assert progress.fraction() == pytest.approx(0.5)
+    progress.set_stage('done')
+    assert progress.snapshot()['eta'] == 0
+
+
+def test_report_is_throttled_except_stage_changes():
+    snapshots = []
+    progress = MergeProgress(snapshots.append, files_total=3, min_interval=60)
+    progress.set_stage('read')
+    progress.file_done(5)
+    progress.file_done(5)
+    progress.set_stage('write')
+
+    assert [s['stage'] for s in snapshots] == ['read', 'write']
+    assert snapshots[-1]['rows_read'] == 10
+
+
+def test_callback_errors_do_not_stop_merge():
+    def broken(progress):
+        raise RuntimeError("界面已关闭")
+
+    progress = MergeProgress(broken)
+    progress.set_stage('write')
+
+    def cancel(progress):
+        raise MergeCancelled("合并已取消")
+
+    with pytest.raises(MergeCancelled):
+        MergeProgress(cancel).set_stage('write')
+
+
+def test_iter_checked_stops_after_cancel():
+    token = CancellationToken()
+    progress = MergeProgress(cancel_token=token)
+    seen = []
+    with pytest.raises(MergeCancelled):
+        for chunk in progress.iter_checked(range(5)):
+            seen.append(chunk)
+            if chunk == 1:
+                token.cancel()
+    assert seen == [0, 1]
+
+
+def test_merge_reports_stages_in_order(run_merge, input_files):
+    snapshots = []
+    result, _ = run_merge(input_files, "progress", execution_mode="memory", progress_callback=snapshots.append)
+
+    assert result['success']
+    stages = [s['stage'] for s in snapshots]
+    assert stages[0] == 'read' and stages[-1] == 'done'
+    assert stages.index('merge') < stages.index('write') < stages.index('package')
+    assert snapshots[-1]['files_done'] == snapshots[-1]['files_total'] == 3
+    assert snapshots[-1]['rows_written'] == result['rows'] == 38
+
+
+@pytest.mark.parametrize("execution_mode, stage", [("memory", 'read'), ("memory", 'write'), ("spill", 'write')])
+def test_cancel_removes_partial_output(run_merge, input_files, execution_mode, stage):
+    token = CancellationToken()
+
+    def on_progress(progress):
+        if progress['stage'] == stage:
+            token.cancel()
+
+    result, output = run_merge(input_files, "cancelled", execution_mode=execution_mode,
+                               progress_callback=on_progress, cancel_token=token)
+
+    assert result == {'success': False, 'cancelled': True, 'error': "合并已取消"}
+    assert not os.path.exists(output)
@@ -0,0 +1,46 @@
+import os
+
+from src.excel.publisher import OutputPublisher
+
+
+def test_staging_is_opt_in(tmp_path):
+    output = str(tmp_path / "out.xlsx")
+    assert OutputPublisher.from_config({}, output) is None
+    assert OutputPublisher.from_config({'stage_output': False}, output) is None
+    publisher = OutputPublisher.from_config({'stage_output': True}, output)
+    try:
+        assert publisher is not None
+        assert os.path.dirname(publisher.staged_file) == publisher.staging_dir
+    finally:
+        publisher.cleanup()
+
+
+def test_publish_moves_staged_file_and_copies_alias_from_staging(tmp_path, monkeypatch):
+    output = str(tmp_path / "share" / "结果_20261019_080000.xlsx")
+    publisher = OutputPublisher(output, latest_alias=True, staging_root=str(tmp_path))
+    with open(publisher.staged_file, 'wb') as f:
+        f.write(b"data")
+
+    sources = []
+    replace = OutputPublisher._replace
+    monkeypatch.setattr(OutputPublisher, '_replace', staticmethod(
+        lambda source, target, move=False: (sources.append(source), replace(source, target, move))[1]
+    ))
+    result = publisher.publish({'success': True, 'outputs': []})
+
+    assert result['success']
+    assert result['latest'] == str(tmp_path / "share" / "结果_latest.xlsx")
+    # 两次复制的来源都是本地暂存文件，不从输出目录读回
+    assert sources == [publisher.staged_file, publisher.staged_file]
+    with open(output, 'rb') as f:
+        assert f.read() == b"data"
+    with open(result['latest'], 'rb') as f:
+        assert f.read() == b"data"
+    assert not os.path.exists(publisher.staging_dir)
+
+
+def test_publish_keeps_failed_result(tmp_path):
+    publisher = OutputPublisher(str(tmp_path / "out.xlsx"), staging_root=str(tmp_path))
+    result = publisher.publish({'success': False, 'error': "x"})
+    assert result == {'success': False, 'error': "x"}
+    assert not os.path.exists(publisher.staging_dir)
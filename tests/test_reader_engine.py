@@ -0,0 +1,56 @@
+import pytest
+
+from src.excel.reader_engine import ReaderEngine
+
+
+def engine_with(*installed):
+    """只有 installed 中的引擎可用的选择器"""
+    engine = ReaderEngine()
+    engine.is_available = lambda name: name in installed
+    return engine
+
+
+def test_prefers_calamine_for_values():
+    engine = engine_with('calamine', 'openpyxl', 'pyxlsb', 'xlrd')
+    assert engine.select("a.xlsx") == 'calamine'
+    assert engine.select("a.XLSB") == 'calamine'
+    assert engine.select("a.xls") == 'calamine'
+
+
+def test_falls_back_by_format():
+    engine = engine_with('openpyxl', 'pyxlsb', 'xlrd')
+    assert engine.select("a.xlsx") == 'openpyxl'
+    assert engine.select("a.xlsm") == 'openpyxl'
+    assert engine.select("a.xlsb") == 'pyxlsb'
+    assert engine.select("a.xls") == 'xlrd'
+
+
+def test_styles_need_openpyxl():
+    engine = engine_with('calamine', 'openpyxl', 'pyxlsb')
+    assert engine.select("a.xlsx", need_styles=True) == 'openpyxl'
+    assert engine.select("a.xlsb", need_styles=True) is None
+    assert engine_with('calamine').select("a.xlsx", need_styles=True) is None
+
+
+def test_preferred_engine():
+    engine = engine_with('calamine', 'openpyxl', 'xlrd')
+    assert engine.select("a.xlsx", preferred='openpyxl') == 'openpyxl'
+    # 首选引擎不支持该格式或未安装时按格式自动选择
+    assert engine.select("a.xlsx", preferred='xlrd') == 'calamine'
+    assert engine.select("a.xlsb", preferred='pyxlsb') == 'calamine'
+    preferring = engine_with('calamine', 'openpyxl')
+    preferring.preferred = 'openpyxl'
+    assert preferring.select("a.xlsx") == 'openpyxl'
+
+
+def test_missing_engine_reports_dependencies():
+    with pytest.raises(ValueError, match="pyxlsb"):
+        engine_with('openpyxl').select("a.xlsb")
+
+
+def test_installed_engines_are_detected():
+    engine = ReaderEngine()
+    assert engine.is_available('openpyxl')
+    assert not engine.is_available('no_such_engine')
+    assert ReaderEngine.supports_styles("a.XLSM")
+    assert not ReaderEngine.supports_styles("a.xls")
@@ -0,0 +1,65 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from src.excel.row_filter import RowFilter
+
+
+def sample():
+    return pd.DataFrame({
+        '部门': ["销售", "研发", None, " 销售 ", "财务"],
+        '金额': pd.Series([100, "N/A", 300, 50, None], dtype=object),
+        '日期': pd.Series([datetime.datetime(2026, 9, 30), datetime.datetime(2026, 10, 1),
+                         datetime.datetime(2026, 10, 19), None, datetime.datetime(2025, 12, 31)], dtype=object),
+    })
+
+
+def rows(conditions, combine="and"):
+    return RowFilter(conditions, combine).apply(sample()).index.tolist()
+
+
+def test_numeric_comparison_skips_text_and_empty():
+    assert rows([{'column': '金额', 'op': '>=', 'value': "100"}]) == [0, 2]
+    assert rows([{'column': '金额', 'op': '!=', 'value': 100}]) == [1, 2, 3]
+
+
+def test_text_comparison_strips_whitespace():
+    assert rows([{'column': '部门', 'op': '==', 'value': "销售"}]) == [0, 3]
+    assert rows([{'column': '部门', 'op': 'contains', 'value': "研"}]) == [1]
+
+
+def test_in_and_not_in():
+    assert rows([{'column': '部门', 'op': 'in', 'value': ["研发", "财务"]}]) == [1, 4]
+    # 数字列中夹杂的文本不等于任何数字，空值不满足条件
+    assert rows([{'column': '金额', 'op': 'not_in', 'value': [100, 50]}]) == [1, 2]
+
+
+def test_empty_and_combination():
+    assert rows([{'column': '部门', 'op': 'empty'}]) == [2]
+    assert rows([{'column': '部门', 'op': 'empty'}, {'column': '金额', 'op': '<', 'value': 60}], combine="or") == [2, 3]
+    assert rows([{'column': '部门', 'op': 'not_empty'}, {'column': '金额', 'op': '<', 'value': 200}]) == [0, 3]
+
+
+def test_date_comparison():
+    assert rows([{'column': '日期', 'op': '>=', 'value': "2026-10-01"}]) == [1, 2]
+
+
+def test_period_range():
+    today = datetime.date(2026, 10, 19)
+    assert RowFilter.period_range('today', today) == (pd.Timestamp("2026-10-19"), pd.Timestamp("2026-10-20"))
+    assert RowFilter.period_range('this_week', today) == (pd.Timestamp("2026-10-19"), pd.Timestamp("2026-10-26"))
+    assert RowFilter.period_range('last_month', today) == (pd.Timestamp("2026-09-01"), pd.Timestamp("2026-10-01"))
+    assert RowFilter.period_range('this_year', today) == (pd.Timestamp("2026-01-01"), pd.Timestamp("2027-01-01"))
+
+
+def test_invalid_conditions():
+    with pytest.raises(ValueError):
+        RowFilter([])
+    with pytest.raises(ValueError):
+        RowFilter([{'column': '金额', 'op': 'like', 'value': 1}])
+    with pytest.raises(ValueError):
+        RowFilter([{'column': '日期', 'op': 'period', 'value': "next_month"}])
+    with pytest.raises(ValueError, match="筛选列不存在"):
+        RowFilter([{'column': '编号', 'op': 'empty'}]).apply(sample())
+    assert RowFilter.from_config({}) is None
@@ -0,0 +1,67 @@
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.scheduler.run_history import PeakMemorySampler, RunHistory
+
+START = datetime(2026, 10, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return RunHistory(str(tmp_path / "history.db"))
+
+
+def record(history, task_id, start_minute, duration, status="success", **kwargs):
+    started_at = START + timedelta(minutes=start_minute)
+    history.record(task_id, f"任务{task_id}", started_at, started_at + timedelta(seconds=duration),
+                   duration, status, **kwargs)
+
+
+def test_recent_runs_newest_first(history):
+    record(history, "a", 0, 10, rows=5, peak_memory=1024)
+    record(history, "b", 1, 10, status="failed", error="读取失败")
+    record(history, "a", 2, 10, rows=6)
+
+    runs = history.recent_runs()
+    assert [(r['task_id'], r['rows']) for r in runs] == [("a", 6), ("b", None), ("a", 5)]
+    assert runs[1]['error'] == "读取失败"
+    assert runs[2]['peak_memory'] == 1024
+    assert [r['rows'] for r in history.recent_runs("a", limit=1)] == [6]
+
+
+def test_recent_runs_marks_overlapping_runs(history):
+    # a和b的执行时间重叠，c在两者结束之后开始
+    record(history, "a", 0, 90)
+    record(history, "b", 1, 60)
+    record(history, "c", 3, 10)
+
+    overlapped = {r['task_id']: r['overlapped'] for r in history.recent_runs()}
+    assert overlapped == {'a': True, 'b': True, 'c': False}
+
+
+def test_duration_trends_flags_creeping_task(history):
+    for i in range(10):
+        record(history, "slow", i * 10, 10)
+        record(history, "stable", i * 10 + 1, 10)
+    for i in range(10, 15):
+        record(history, "slow", i * 10, 20)
+        record(history, "stable", i * 10 + 1, 10.5)
+    record(history, "stable", 200, 5, status="failed")
+
+    trends = {t['task_id']: t for t in history.duration_trends()}
+    assert trends['slow']['creeping']
+    assert trends['slow']['ratio'] == pytest.approx(2.0)
+    assert trends['slow']['runs'] == 15
+    assert not trends['stable']['creeping']
+    assert trends['stable']['failures'] == 1
+
+
+@pytest.mark.skipif(sys.platform not in ("linux", "win32"), reason="只能取得进程启动以来的峰值")
+def test_peak_memory_sampler_sees_allocation():
+    with PeakMemorySampler(interval=0.01) as sampler:
+        before = sampler.peak
+        block = bytearray(64 * 1024 * 1024)
+        block[::4096] = b"\x01" * len(block[::4096])
+    assert sampler.peak >= before + 32 * 1024 * 1024
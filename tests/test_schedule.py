@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.scheduler.cron import CronExpression
+from src.scheduler.stagger import jitter_offset, staggered_time
+from src.scheduler.task_config import TaskConfig
+
+
+def test_weekday_cron():
+    cron = CronExpression("30 8 * * mon-fri")
+    # 2026-10-16 是周五
+    assert cron.next_after(datetime(2026, 10, 16, 8, 29, 59)) == datetime(2026, 10, 16, 8, 30)
+    assert cron.next_after(datetime(2026, 10, 16, 8, 30)) == datetime(2026, 10, 19, 8, 30)
+
+
+def test_steps_lists_and_aliases():
+    assert CronExpression("*/20 9-10 * * *").upcoming(datetime(2026, 10, 19, 9, 45), 4) == [
+        datetime(2026, 10, 19, 10, 0), datetime(2026, 10, 19, 10, 20),
+        datetime(2026, 10, 19, 10, 40), datetime(2026, 10, 20, 9, 0),
+    ]
+    assert CronExpression("@monthly").next_after(datetime(2026, 10, 19)) == datetime(2026, 11, 1)
+    # 7 也表示周日
+    assert CronExpression("0 0 * * 7").weekdays == {0}
+
+
+def test_day_or_weekday():
+    # 日和星期都指定时满足其一即可：每月13日或周五
+    cron = CronExpression("0 12 13 * 5")
+    assert cron.upcoming(datetime(2026, 11, 1), 3) == [
+        datetime(2026, 11, 6, 12), datetime(2026, 11, 13, 12), datetime(2026, 11, 20, 12),
+    ]
+
+
+def test_leap_day_and_never():
+    assert CronExpression("0 0 29 2 *").next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29)
+    with pytest.raises(ValueError, match="永远不会触发"):
+        CronExpression("0 0 30 2 *").next_after(datetime(2026, 1, 1))
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "0 0 0 * *", "*/0 * * * *", "0 0 * foo *"])
+def test_invalid_cron(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_jitter_is_deterministic_and_bounded():
+    nominal = datetime(2026, 10, 19, 8, 0)
+    offsets = {jitter_offset(f"task{i}", nominal, 5) for i in range(50)}
+    assert offsets <= set(range(6)) and len(offsets) > 1
+    assert jitter_offset("task1", nominal, 5) == jitter_offset("task1", nominal, 5)
+    assert jitter_offset("task1", nominal, 0) == 0
+
+
+def test_stagger_moves_away_from_taken_times():
+    nominal = datetime(2026, 10, 19, 8, 0)
+    taken = [nominal, nominal + timedelta(minutes=3)]
+    assert staggered_time(nominal, "a", stagger_minutes=3, taken=taken) == nominal + timedelta(minutes=6)
+    # 找不到空档时不后移
+    crowded = [nominal + timedelta(minutes=i) for i in range(0, 20)]
+    assert staggered_time(nominal, "a", stagger_minutes=3, taken=crowded, max_delay=10) == nominal
+
+
+def test_interval_schedule_is_anchored_and_delay_capped():
+    task = TaskConfig("t1")
+    task.schedule_type = "interval"
+    task.interval_minutes = 15
+    task.jitter_minutes = 60
+    task.stagger_minutes = 0
+    assert task.next_fire_time(datetime(2026, 10, 19, 8, 7, 30)) == datetime(2026, 10, 19, 8, 15)
+    task.update_next_run(now=datetime(2026, 10, 19, 8, 7, 30))
+    delay = datetime.strptime(task.next_run, "%Y-%m-%d %H:%M:%S") - datetime(2026, 10, 19, 8, 15)
+    # 随机延迟不超过间隔的一半
+    assert timedelta(0) <= delay <= timedelta(minutes=7)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.excel.sorter import ExternalSorter
+
+
+def sample(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        '部门': rng.choice(["A", "B", "C"], n),
+        '金额': rng.integers(0, 50, n).astype(float),
+        '序号': np.arange(n),
+    })
+    df.loc[rng.choice(n, 20, replace=False), '金额'] = np.nan
+    return df
+
+
+KEYS = [{'column': '部门', 'ascending': True}, {'column': '金额', 'ascending': False}]
+
+
+def expected(df):
+    return df.sort_values(['部门', '金额'], ascending=[True, False], kind="stable", na_position="last").reset_index(drop=True)
+
+
+def test_in_memory_sort_is_stable_multi_key():
+    df = sample()
+    pd.testing.assert_frame_equal(ExternalSorter(KEYS).sort(df), expected(df))
+
+
+def test_external_sort_matches_in_memory():
+    df = sample()
+    sorter = ExternalSorter(KEYS, memory_limit_mb=0.05, merge_chunk_rows=97)
+    chunks = [df.iloc[i:i + 150] for i in range(0, len(df), 150)]
+    kind_sets = {col: ExternalSorter._kinds(df[col]) for col in df.columns}
+    result = pd.concat(list(sorter.iter_sorted(chunks, list(df.columns), kind_sets)), ignore_index=True)
+
+    pd.testing.assert_frame_equal(result, expected(df))
+
+
+def test_mixed_types_sort_as_text():
+    df = pd.DataFrame({'编号': pd.Series([10, "9", 2, None, "a"], dtype=object)})
+    result = ExternalSorter([{'column': '编号'}]).sort(df)
+    assert result['编号'].tolist()[:4] == [10, 2, "9", "a"]
+    assert pd.isna(result['编号'].iloc[-1])
+
+
+def test_missing_sort_column():
+    with pytest.raises(ValueError, match="排序列不存在"):
+        ExternalSorter([{'column': '日期'}]).sort(sample(100))
+    with pytest.raises(ValueError):
+        ExternalSorter([])
+    assert ExternalSorter.from_config({}) is None
@@ -0,0 +1,65 @@
+import gc
+import os
+
+import pandas as pd
+import pytest
+
+
+def merged(run_merge, files, name, **config):
+    result, output = run_merge(files, name, **config)
+    assert result['success'], result.get('error')
+    return result, pd.read_excel(output, sheet_name=None)
+
+
+@pytest.mark.parametrize("keep", ["first", "last"])
+def test_spill_key_dedup_matches_memory(run_merge, input_files, keep):
+    config = dict(dedup_mode="key", dedup_keys=['工号'], dedup_keep=keep)
+    memory_result, memory = merged(run_merge, input_files, "memory", execution_mode="memory", **config)
+    spill_result, spill = merged(run_merge, input_files, "spill", execution_mode="spill", **config)
+
+    assert spill_result['spilled']
+    assert spill_result['duplicates_removed'] == memory_result['duplicates_removed'] == 8
+    pd.testing.assert_frame_equal(spill['合并结果'], memory['合并结果'])
+    assert spill['合并结果']['工号'].is_unique
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_spill_error_leaves_no_partial_outputs(run_merge, input_files, tmp_path):
+    # 汇总分组列不存在，写出第一个数据块时出错（附加格式文件已打开）
+    result, output = run_merge(
+        input_files, "broken", execution_mode="spill", output_formats=['csv'],
+        summary_mode="sheet", summary_groups=['部门']
+    )
+    gc.collect()
+
+    assert not result['success']
+    assert "汇总分组列不存在" in result['error']
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        os.path.basename(file) for file in input_files
+    )
+
+
+@pytest.mark.parametrize("merge_mode", ["single", "multiple"])
+def test_spill_matches_memory(run_merge, input_files, merge_mode):
+    memory_result, memory = merged(run_merge, input_files, "memory", execution_mode="memory", merge_mode=merge_mode)
+    spill_result, spill = merged(run_merge, input_files, "spill", execution_mode="spill", merge_mode=merge_mode)
+
+    assert spill_result['spilled'] and not memory_result['spilled']
+    assert spill_result['rows'] == memory_result['rows'] == 38
+    assert list(spill) == list(memory)
+    for sheet_name in memory:
+        pd.testing.assert_frame_equal(spill[sheet_name], memory[sheet_name])
+
+
+def test_spill_row_dedup_and_summary_match_memory(run_merge, input_files):
+    config = dict(dedup_mode="row", summary_mode="sheet", sort_keys=[{'column': '金额', 'ascending': False}])
+    memory_result, memory = merged(run_merge, input_files, "memory", execution_mode="memory", **config)
+    spill_result, spill = merged(run_merge, input_files, "spill", execution_mode="spill", **config)
+
+    assert spill_result['duplicates_removed'] == memory_result['duplicates_removed'] == 7
+    pd.testing.assert_frame_equal(spill['合并结果'], memory['合并结果'])
+    # 内存模式在排序前按文件累加汇总，磁盘暂存模式按排序后的数据流累加，分组的先后顺序不同
+    summary = spill['汇总'].sort_values('数据来源', ignore_index=True)
+    pd.testing.assert_frame_equal(summary, memory['汇总'].sort_values('数据来源', ignore_index=True))
+    # 按数据来源分组：去重后各文件剩余的行数
+    assert list(summary['行数']) == [20, 3, 8]
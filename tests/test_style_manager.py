@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+from src.excel.stream_writer import StreamingWorkbookWriter
+from src.excel.style_manager import ExcelStyleManager
+
+
+def make_template():
+    """表头 + 两行数据：日期列、带千分位格式的金额列、文本列"""
+    wb = Workbook()
+    sheet = wb.active
+    sheet.append(["日期", "金额", "备注"])
+    sheet.append([datetime(2026, 1, 1), 1234.5, "甲"])
+    sheet.append([datetime(2026, 1, 2), 10, "乙"])
+    sheet["A2"].font = Font(bold=True)
+    sheet["B2"].number_format = "#,##0.00"
+    sheet["C2"].font = Font(italic=True)
+    return wb
+
+
+def template_styles():
+    return ExcelStyleManager().get_column_styles(make_template(), "Sheet", 1)
+
+
+def test_column_mode_keeps_date_format(tmp_path):
+    header_styles, data_styles, _ = template_styles()
+    output = tmp_path / "out.xlsx"
+    pd.DataFrame({
+        "日期": [datetime(2026, 10, 1), datetime(2026, 10, 2)], "金额": [1.5, 2], "备注": ["丙", None]
+    }).to_excel(output, index=False)
+    wb = load_workbook(output)
+    ExcelStyleManager().apply_column_styles(
+        wb, "Sheet1", header_styles, data_styles, {'keep_styles': True, 'header_row': 1, 'style_mode': "column"}
+    )
+    wb.save(output)
+
+    sheet = load_workbook(output)["Sheet1"]
+    assert sheet["A2"].value == datetime(2026, 10, 1)
+    assert sheet["A2"].is_date
+    assert sheet["A2"].font.bold
+    # 模板值为数字的列使用模板的数字格式
+    assert sheet["B2"].number_format == "#,##0.00"
+    # 文本列使用模板的字体和常规格式
+    assert sheet["C2"].value == "丙"
+    assert sheet["C2"].font.italic
+    assert sheet["C2"].number_format == "General"
+
+
+def test_cell_mode_keeps_date_format(tmp_path):
+    header_styles, data_styles, _ = template_styles()
+    output = tmp_path / "out.xlsx"
+    pd.DataFrame({"日期": [datetime(2026, 10, 1)], "金额": [1.5], "备注": ["丙"]}).to_excel(output, index=False)
+    wb = load_workbook(output)
+    ExcelStyleManager().apply_column_styles(
+        wb, "Sheet1", header_styles, data_styles, {'keep_styles': True, 'header_row': 1, 'style_mode': "cell"}
+    )
+    wb.save(output)
+
+    sheet = load_workbook(output)["Sheet1"]
+    assert sheet["A2"].value == datetime(2026, 10, 1)
+    assert sheet["B2"].number_format == "#,##0.00"
+    assert sheet["C2"].font.italic
+
+
+def test_streaming_writer_keeps_date_format(tmp_path):
+    header_styles, data_styles, _ = template_styles()
+    output = tmp_path / "out.xlsx"
+    writer = StreamingWorkbookWriter(str(output))
+    df = pd.DataFrame({
+        "日期": [datetime(2026, 10, 1), datetime(2026, 10, 2)], "金额": [1.5, 2.0], "备注": ["丙", None]
+    })
+    rows = writer.write_sheet("合并结果", list(df.columns), [df], header_styles=header_styles, data_styles=data_styles)
+    writer.save()
+
+    assert rows == 2
+    sheet = load_workbook(output)["合并结果"]
+    assert sheet["A3"].value == datetime(2026, 10, 2)
+    assert sheet["A3"].is_date
+    assert sheet["A2"].font.bold
+    assert sheet["B2"].number_format == "#,##0.00"
+    assert sheet["C2"].value == "丙"
+    assert sheet["C2"].font.italic
+    assert sheet["C2"].number_format == "General"
+
+
+def test_column_mode_on_unsaved_workbook(tmp_path):
+    """合并时在保存前对 pd.ExcelWriter 的工作簿应用样式，此时新写入的单元格还没有样式"""
+    header_styles, data_styles, _ = template_styles()
+    output = tmp_path / "out.xlsx"
+    df = pd.DataFrame({"日期": [datetime(2026, 10, 1)], "金额": [1.5], "备注": ["丙"]})
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="合并结果", index=False)
+        ExcelStyleManager().apply_column_styles(
+            writer.book, "合并结果", header_styles, data_styles,
+            {'keep_styles': True, 'header_row': 1, 'style_mode': "column"}
+        )
+
+    sheet = load_workbook(output)["合并结果"]
+    assert sheet["A2"].is_date
+    assert sheet["C2"].value == "丙"
+    assert sheet["C2"].font.italic
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from src.excel.lineage import SHEET_COLUMN, SOURCE_COLUMN
+from src.excel.summary import GroupSummary
+
+
+def test_chunked_summary_by_source():
+    summary = GroupSummary(stats=["count", "sum", "mean"])
+    summary.update(pd.DataFrame({'金额': [1, 2, "N/A"], SOURCE_COLUMN: "a.xlsx", SHEET_COLUMN: "S1"}))
+    summary.update(pd.DataFrame({'金额': [4, 6], SOURCE_COLUMN: ["a.xlsx", "b.xlsx"], SHEET_COLUMN: "S1"}))
+    result = summary.result().set_index(SOURCE_COLUMN)
+
+    # 血缘列不作为统计列
+    assert list(result.columns) == ['行数', '金额_计数', '金额_求和', '金额_平均值']
+    assert result.loc["a.xlsx", '行数'] == 4
+    assert result.loc["a.xlsx", '金额_计数'] == 3
+    assert result.loc["a.xlsx", '金额_求和'] == 7
+    assert result.loc["b.xlsx", '金额_平均值'] == 6
+
+
+def test_source_filled_from_file_name():
+    summary = GroupSummary()
+    summary.update(pd.DataFrame({'金额': [1, 2]}), source="c.xlsx")
+    result = summary.result()
+    assert result[SOURCE_COLUMN].tolist() == ["c.xlsx"]
+    assert result['行数'].tolist() == [2]
@@ -0,0 +1,99 @@
+import threading
+
+from src.excel.progress import CancellationToken
+from src.scheduler.task_graph import DagRunner, TaskGraph
+
+# a -> b -> d，a -> c，e 独立
+DEPENDENCIES = {'b': ['a'], 'c': ['a'], 'd': ['b'], 'e': []}
+
+
+def test_graph_relations():
+    graph = TaskGraph(DEPENDENCIES)
+    assert graph.upstream('d') == ['b']
+    assert sorted(graph.downstream('a')) == ['b', 'c']
+    assert graph.descendants(['a']) == {'a', 'b', 'c', 'd'}
+    assert graph.find_cycle() is None
+    assert TaskGraph({'a': ['c'], 'b': ['a'], 'c': ['b']}).find_cycle() in (
+        ['a', 'c', 'b', 'a'], ['b', 'a', 'c', 'b'], ['c', 'b', 'a', 'c']
+    )
+
+
+def test_downstream_receives_upstream_results():
+    calls = []
+
+    def execute(task_id, upstream):
+        calls.append((task_id, upstream))
+        return f"{task_id}.xlsx"
+
+    outcomes = DagRunner(TaskGraph(DEPENDENCIES), execute).run(['a', 'b', 'c', 'd'])
+
+    assert {task_id: o['status'] for task_id, o in outcomes.items()} == dict.fromkeys("abcd", 'success')
+    order = [task_id for task_id, _ in calls]
+    assert order.index('a') < order.index('b') < order.index('d')
+    assert dict(calls)['d'] == {'b': "b.xlsx"}
+    # 不在本次执行中的上游任务不传入结果
+    assert DagRunner(TaskGraph(DEPENDENCIES), execute).run(['d'])['d']['status'] == 'success'
+    assert calls[-1] == ('d', {})
+
+
+def test_independent_branches_run_in_parallel():
+    # b、c、e 只有同时执行时才能都通过屏障
+    barrier = threading.Barrier(3, timeout=5)
+
+    def execute(task_id, upstream):
+        if task_id in ('b', 'c', 'e'):
+            barrier.wait()
+        return True
+
+    outcomes = DagRunner(TaskGraph(DEPENDENCIES), execute, max_workers=3).run(['a', 'b', 'c', 'e'])
+    assert all(o['status'] == 'success' for o in outcomes.values())
+
+
+def test_max_workers_limits_concurrency():
+    lock = threading.Lock()
+    running = [0, 0]  # [当前, 最大]
+
+    def execute(task_id, upstream):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        threading.Event().wait(0.02)
+        with lock:
+            running[0] -= 1
+        return True
+
+    DagRunner(TaskGraph({}), execute, max_workers=2).run([f"t{i}" for i in range(6)])
+    assert running[1] == 2
+
+
+def test_failure_skips_descendants_only():
+    def execute(task_id, upstream):
+        if task_id == 'b':
+            raise RuntimeError("读取失败")
+        return task_id != 'e' or None
+
+    outcomes = DagRunner(TaskGraph(DEPENDENCIES), execute).run(list("abcde"))
+
+    assert outcomes['b'] == {'status': 'failed', 'result': None, 'error': "读取失败"}
+    assert outcomes['d'] == {'status': 'skipped', 'result': None, 'error': "上游任务 b 失败"}
+    assert outcomes['c']['status'] == 'success'
+    # 返回假值视为失败
+    assert outcomes['e'] == {'status': 'failed', 'result': None, 'error': "任务执行失败"}
+
+
+def test_cancel_skips_tasks_not_started():
+    token = CancellationToken()
+
+    def execute(task_id, upstream):
+        token.cancel()
+        return True
+
+    outcomes = DagRunner(TaskGraph(DEPENDENCIES), execute, cancel_token=token).run(['a', 'b', 'd'])
+    assert outcomes['a']['status'] == 'success'
+    assert outcomes['b'] == outcomes['d'] == {'status': 'skipped', 'result': None, 'error': "已取消"}
+
+
+def test_cycle_is_skipped():
+    outcomes = DagRunner(TaskGraph({'a': ['b'], 'b': ['a'], 'c': []}), lambda *args: True).run(['a', 'b', 'c'])
+    assert outcomes['c']['status'] == 'success'
+    assert outcomes['a']['error'] == outcomes['b']['error'] == "任务依赖存在循环"
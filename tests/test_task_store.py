@@ -0,0 +1,74 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+from src.scheduler.task_config import TaskConfig
+from src.scheduler.task_store import TaskStore
+
+
+def make_task(task_id, **attrs):
+    task = TaskConfig(task_id)
+    task.task_name = f"任务{task_id}"
+    for name, value in attrs.items():
+        setattr(task, name, value)
+    return task
+
+
+def test_migrate_json_once(tmp_path):
+    task_dir = tmp_path / "tasks"
+    task_dir.mkdir()
+    make_task("20260101_080000", enabled=True, next_run="2026-10-19 08:00:00").save_to_file(
+        str(task_dir / "20260101_080000.json"))
+    make_task("20260102_080000", schedule_type="cron", cron="0 9 * * 1").save_to_file(
+        str(task_dir / "20260102_080000.json"))
+    (task_dir / "broken.json").write_text("{", encoding="utf-8")
+    (task_dir / "notes.txt").write_text("x", encoding="utf-8")
+
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    assert store.migrate_json(str(task_dir)) == 2
+    # 只迁移一次，之后新增的JSON文件不再导入
+    make_task("20260103_080000").save_to_file(str(task_dir / "20260103_080000.json"))
+    assert store.migrate_json(str(task_dir)) == 0
+
+    summaries = {summary['task_id']: summary for summary in store.summaries()}
+    assert list(summaries) == ["20260101_080000", "20260102_080000"]
+    assert summaries["20260101_080000"]['enabled'] is True
+    assert summaries["20260102_080000"]['schedule_text'] == "cron: 0 9 * * 1"
+    assert store.load("20260102_080000").cron == "0 9 * * 1"
+    assert store.due_task_ids(datetime(2026, 10, 19, 8, 0)) == ["20260101_080000"]
+    # 原JSON文件保留作为备份
+    assert os.path.exists(task_dir / "20260101_080000.json")
+
+
+def test_old_database_gets_added_columns(tmp_path):
+    db_path = str(tmp_path / "tasks.db")
+    task = make_task("20260101_080000", depends_on=["20251231_080000"], output_path=str(tmp_path))
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.execute(
+            "CREATE TABLE tasks (task_id TEXT PRIMARY KEY, task_name TEXT, schedule_time TEXT, "
+            "enabled INTEGER NOT NULL DEFAULT 0, last_run TEXT, next_run TEXT, data TEXT NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO tasks VALUES (?, ?, ?, 0, NULL, NULL, ?)",
+            (task.task_id, task.task_name, task.schedule_time, json.dumps(task.to_dict(), ensure_ascii=False))
+        )
+
+    store = TaskStore(db_path)
+    assert store.summaries()[0]['schedule_text'] == "每天 00:00"
+    assert store.dependencies() == {"20260101_080000": ["20251231_080000"]}
+    with closing(sqlite3.connect(db_path)) as conn:
+        storage_keys = conn.execute("SELECT storage_keys FROM tasks").fetchone()[0]
+    assert storage_keys == "\n".join(sorted(task.storage_keys()))
+
+
+def test_save_updates_existing_task(tmp_path):
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    task = make_task("20260101_080000")
+    store.save(task)
+    task.task_name = "改名"
+    store.save(task)
+    assert [summary['task_name'] for summary in store.summaries()] == ["改名"]
+    store.delete(task.task_id)
+    assert store.load(task.task_id) is None
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from src.scheduler.task_config import TaskConfig
+from src.scheduler.task_graph import TaskGraph
+from src.scheduler.work_queue import WorkQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    """A、B 两个任务，B 依赖 A"""
+    queue = WorkQueue(str(tmp_path / "queue.db"), **kwargs)
+    a, b = TaskConfig("A"), TaskConfig("B")
+    b.depends_on = ["A"]
+    graph = TaskGraph({"B": ["A"]})
+    queue.enqueue({"A": a, "B": b}, graph, {}, "2026-10-19 08:00")
+    return queue
+
+
+def at(seconds):
+    """把队列使用的当前时间固定为 seconds"""
+    return mock.patch("src.scheduler.work_queue.time.time", return_value=seconds)
+
+
+def test_downstream_waits_for_upstream(tmp_path):
+    queue = make_queue(tmp_path)
+    with at(1000):
+        job = queue.claim("w1")
+        assert job['task_id'] == "A" and job['attempts'] == 1
+        assert queue.claim("w2") is None
+        assert queue.complete(job, "/out/a.xlsx")
+        downstream = queue.claim("w2")
+    assert downstream['task_id'] == "B"
+    assert queue.upstream_outputs(downstream['job_id']) == {"A": "/out/a.xlsx"}
+
+
+def test_duplicate_enqueue_is_ignored(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue({"A": TaskConfig("A")}, TaskGraph({}), {}, "2026-10-19 08:00")
+    assert queue.status_counts() == {'queued': 2}
+
+
+def test_expired_lease_is_taken_over_and_old_worker_fenced(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=60)
+    with at(1000):
+        first = queue.claim("w1")
+    # 租约未过期时不能接管
+    with at(1059):
+        assert queue.claim("w2") is None
+    with at(1061):
+        second = queue.claim("w2")
+    assert second['job_id'] == first['job_id']
+    assert second['worker'] == "w2" and second['attempts'] == 2
+
+    # 原工作进程失去租约后不能续约、完成或放弃
+    assert not queue.heartbeat(first)
+    assert not queue.complete(first, "/out/stale.xlsx")
+    assert not queue.release(first)
+    assert queue.heartbeat(second)
+    assert queue.complete(second, "/out/a.xlsx")
+    assert queue.status_counts() == {'done': 1, 'queued': 1}
+
+
+def test_max_attempts_fails_job_and_skips_dependents(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=10, max_attempts=2)
+    with at(1000):
+        queue.claim("w1")
+    with at(1011):
+        queue.claim("w2")
+    with at(1022):
+        assert queue.claim("w3") is None
+    assert queue.status_counts() == {'failed': 1, 'skipped': 1}
+
+
+def test_release_returns_job_without_counting_attempt(tmp_path):
+    queue = make_queue(tmp_path)
+    job = queue.claim("w1")
+    assert queue.release(job)
+    again = queue.claim("w2")
+    assert again['job_id'] == job['job_id'] and again['attempts'] == 1
+
+
+def test_fail_skips_dependents(tmp_path):
+    queue = make_queue(tmp_path)
+    job = queue.claim("w1")
+    assert queue.fail(job, "读取失败")
+    assert queue.claim("w2") is None
+    assert queue.status_counts() == {'failed': 1, 'skipped': 1}
@@ -0,0 +1,14 @@
+from src.excel.xlsx_package import XlsxPackager
+from src.scheduler.task_config import TaskConfig
+
+
+def test_packager_off_by_default():
+    assert XlsxPackager.from_config({}) is None
+    assert XlsxPackager.from_config(TaskConfig("x").merge_config) is None
+    assert not XlsxPackager().rewrites
+
+
+def test_packager_opt_in():
+    packager = XlsxPackager.from_config({'xlsx_minimal_styles': True, 'xlsx_shared_strings': "lineage"})
+    assert packager.rewrites
+    assert XlsxPackager.from_config({'xlsx_compression': "stored"}).rewrites is False